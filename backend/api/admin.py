@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Paper, PaperImportLog, PaperTopic, SearchJob, Topic
+from .models import (
+    Paper, PaperEmbedding, PaperImportLog, PaperTopic, QueryWatermark, RelatedPaper, SearchJob,
+    SearchJobAggregate, Topic,
+)
 
 
 @admin.register(Paper)
@@ -12,7 +15,7 @@ class PaperAdmin(admin.ModelAdmin):
 @admin.register(SearchJob)
 class SearchJobAdmin(admin.ModelAdmin):
     list_display = ('query', 'status', 'papers_matched', 'topics_found', 'outliers_found', 'processing_seconds', 'created_at')
-    search_fields = ('query', 'optional_keywords')
+    search_fields = ('query', 'optional_keywords', 'fingerprint')
     list_filter = ('status', 'created_at')
 
 
@@ -29,7 +32,32 @@ class PaperTopicAdmin(admin.ModelAdmin):
     list_filter = ('search_job', 'topic')
 
 
+@admin.register(RelatedPaper)
+class RelatedPaperAdmin(admin.ModelAdmin):
+    list_display = ('paper', 'related', 'search_job', 'rank', 'score')
+    raw_id_fields = ('paper', 'related', 'search_job')
+
+
+@admin.register(SearchJobAggregate)
+class SearchJobAggregateAdmin(admin.ModelAdmin):
+    list_display = ('search_job', 'total_papers', 'computed_at')
+    raw_id_fields = ('search_job',)
+
+
+@admin.register(QueryWatermark)
+class QueryWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('query', 'newest_submitted', 'last_fetched_at')
+    search_fields = ('query',)
+
+
+@admin.register(PaperEmbedding)
+class PaperEmbeddingAdmin(admin.ModelAdmin):
+    list_display = ('arxiv_id', 'model_name', 'dimensions', 'created_at')
+    search_fields = ('arxiv_id',)
+    list_filter = ('model_name',)
+
+
 @admin.register(PaperImportLog)
 class PaperImportLogAdmin(admin.ModelAdmin):
-    list_display = ('filename', 'row_count', 'status', 'imported_at')
+    list_display = ('filename', 'row_count', 'failed_rows', 'status', 'imported_at')
     list_filter = ('status', 'imported_at')
@@ -0,0 +1,159 @@
+"""
+Precomputed per-job aggregates for /api/papers/: totals, the publication
+timeline, the category distribution and cluster stats.
+
+store_job_aggregates() runs once when a SearchJob completes (the pipeline's
+persist step and import_latest_topics) and saves a SearchJobAggregate row: a
+small cube of paper counts per (year, month, cluster), the same cube split by
+arXiv category, and the Topic paper counts. Any year/month/cluster filter
+combination is answered by summing cube cells in memory, so the read path
+runs no COUNT, GROUP BY or per-row category parsing. Jobs completed before
+the table existed get their row the first time they are read.
+"""
+import calendar
+import re
+from collections import Counter
+
+from django.db.models import Count
+
+from .models import PaperTopic, SearchJobAggregate, Topic
+
+TOP_CATEGORIES = 10
+ANY = '*'
+# Matches arXiv category codes in both stored forms: "cs.AI; cs.LG" and "['cs.AI', 'cs.LG']".
+CATEGORY_PATTERN = re.compile(r"[A-Za-z][\w.\-]*")
+MONTH_NUMBERS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+
+
+def split_categories(value):
+    return CATEGORY_PATTERN.findall(value or '')
+
+
+def month_key(month):
+    return (month or '').strip().lower() or None
+
+
+def rollup_keys(year, month, cluster_id):
+    """The cell itself plus every key with some of its dimensions replaced by ANY."""
+    return [
+        (y, m, c)
+        for y in (year, ANY)
+        for m in (month, ANY)
+        for c in (cluster_id, ANY)
+    ]
+
+
+def store_job_aggregates(search_job_id):
+    """Compute and save the SearchJobAggregate of one job from its PaperTopic rows."""
+    assignments = PaperTopic.objects.filter(search_job_id=search_job_id).order_by()
+    cells = [
+        [year, month, cluster_id, count]
+        for year, month, cluster_id, count in assignments
+        .values('paper__year', 'paper__month', 'topic__cluster_id')
+        .annotate(count=Count('id'))
+        .values_list('paper__year', 'paper__month', 'topic__cluster_id', 'count')
+    ]
+
+    # Grouping by the raw categories string first leaves one split per distinct value, not per paper.
+    category_counts = Counter()
+    for year, month, cluster_id, categories, count in (
+        assignments
+        .values('paper__year', 'paper__month', 'topic__cluster_id', 'paper__categories')
+        .annotate(count=Count('id'))
+        .values_list('paper__year', 'paper__month', 'topic__cluster_id', 'paper__categories', 'count')
+    ):
+        for category in set(split_categories(categories)):
+            category_counts[(year, month, cluster_id, category)] += count
+
+    aggregate, _ = SearchJobAggregate.objects.update_or_create(
+        search_job_id=search_job_id,
+        defaults={
+            'total_papers': sum(cell[-1] for cell in cells),
+            'cells': cells,
+            'category_cells': [[*key, count] for key, count in category_counts.items()],
+            'clusters': [
+                list(row) for row in Topic.objects.filter(search_job_id=search_job_id)
+                .order_by('cluster_id').values_list('cluster_id', 'paper_count')
+            ],
+        },
+    )
+    return aggregate
+
+
+def job_aggregates(job):
+    """JobAggregates for a SearchJob, computing and saving its row if it has none yet."""
+    aggregate = SearchJobAggregate.objects.filter(search_job=job).first()
+    if aggregate is None:
+        aggregate = store_job_aggregates(job.id)
+    return JobAggregates(aggregate)
+
+
+class JobAggregates:
+    """In-memory view of one SearchJobAggregate answering filtered totals, timelines and categories."""
+
+    def __init__(self, aggregate):
+        self.total_papers = aggregate.total_papers
+        self.clusters = {cluster_id: count for cluster_id, count in aggregate.clusters}
+        self.cells = [(year, month_key(month), month, cluster_id, count)
+                      for year, month, cluster_id, count in aggregate.cells]
+        self.category_cells = [(year, month_key(month), cluster_id, category, count)
+                               for year, month, cluster_id, category, count in aggregate.category_cells]
+        self.totals = Counter()
+        for year, month, _, cluster_id, count in self.cells:
+            for key in rollup_keys(year, month, cluster_id):
+                self.totals[key] += count
+        self._categories = {}
+
+    @staticmethod
+    def key(year=None, month=None, cluster=None):
+        return (
+            ANY if year is None else int(year),
+            ANY if not month else month_key(month),
+            ANY if cluster is None else int(cluster),
+        )
+
+    @staticmethod
+    def matches(key, year, month, cluster_id):
+        return all(want == ANY or want == have for want, have in zip(key, (year, month, cluster_id)))
+
+    def count(self, year=None, month=None, cluster=None):
+        """Papers in the job matching the filters."""
+        return self.totals.get(self.key(year, month, cluster), 0)
+
+    def timeline(self, year=None, month=None, cluster=None):
+        """[{'year', 'month', 'count'}] in calendar order, for papers matching the filters."""
+        key = self.key(year, month, cluster)
+        counts = Counter()
+        for cell_year, cell_month, month_name, cluster_id, count in self.cells:
+            if (cell_year is not None or cell_month is not None) and self.matches(key, cell_year, cell_month, cluster_id):
+                counts[(cell_year, month_name)] += count
+        return [
+            {'year': cell_year, 'month': month_name, 'count': count}
+            for (cell_year, month_name), count in sorted(
+                counts.items(),
+                key=lambda item: (item[0][0] or 0, MONTH_NUMBERS.get(month_key(item[0][1]), 13), item[0][1] or ''),
+            )
+        ]
+
+    def categories(self, year=None, month=None, cluster=None):
+        """The TOP_CATEGORIES most frequent categories among papers matching the filters."""
+        key = self.key(year, month, cluster)
+        if key not in self._categories:
+            counts = Counter()
+            for cell_year, cell_month, cluster_id, category, count in self.category_cells:
+                if self.matches(key, cell_year, cell_month, cluster_id):
+                    counts[category] += count
+            self._categories[key] = [
+                {'category': category, 'count': count}
+                for category, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:TOP_CATEGORIES]
+            ]
+        return self._categories[key]
+
+    def cluster_stats(self):
+        """Per-cluster paper counts in the shape of the papers response's clustering stats."""
+        return {
+            'total_papers': sum(self.clusters.values()),
+            'num_clusters': len(set(self.clusters) - {-1}),
+            'papers_per_cluster': self.clusters,
+            'source_file': 'database'
+        }
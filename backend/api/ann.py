@@ -0,0 +1,140 @@
+"""
+Approximate nearest-neighbour search for normalized embeddings: an inverted
+file (IVF) over k-means centroids with int8 scalar-quantized vectors.
+
+Training clusters a sample of the vectors into `nlist` lists. Every vector is
+stored in the list of its nearest centroid as one byte per dimension, a
+quarter of its float32 size. A query scans only the `nprobe` lists whose
+centroids are closest to it, scores their int8 codes, and re-ranks the best
+candidates with the exact float32 vectors. nprobe is the recall/latency knob:
+more lists, higher recall, slower queries.
+
+New vectors are added by assigning them to the existing lists, so centroids
+only need retraining once the corpus has grown well past the training set.
+
+Like api/embeddings.py this module is free of Django imports, so
+scripts/ann_benchmark.py can use it on its own.
+"""
+import numpy as np
+
+CHUNK_ROWS = 65536
+MAX_TRAINING_SAMPLE = 262144
+
+
+def default_nlist(count):
+    """About 4 * sqrt(n) lists, the usual IVF sizing, between 16 and 16384."""
+    return int(min(16384, max(16, 4 * int(np.sqrt(max(count, 1))))))
+
+
+def top_k(scores, k):
+    """Indices of the k highest finite scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return top[np.isfinite(scores[top])]
+
+
+class IVFQuantizer:
+    """Coarse centroids plus the per-dimension int8 scale shared by every part of an index."""
+
+    def __init__(self, centroids, scale, trained_count=0):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float32)
+        self.trained_count = int(trained_count)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @classmethod
+    def train(cls, vectors, nlist=None, sample_size=None, iterations=10, seed=0):
+        """Fit centroids and the int8 range on a random sample of `vectors` (may be a memmap)."""
+        count = len(vectors)
+        nlist = min(nlist or default_nlist(count), count)
+        sample_size = min(count, sample_size or min(MAX_TRAINING_SAMPLE, max(64 * nlist, 50000)))
+        rng = np.random.default_rng(seed)
+        # Sorted rows read a memory-mapped matrix front to back.
+        sample = np.asarray(vectors[np.sort(rng.choice(count, sample_size, replace=False))], dtype=np.float32)
+
+        # Spherical k-means: a few Lloyd iterations are plenty for coarse lists.
+        quantizer = cls(sample[rng.choice(sample_size, nlist, replace=False)], np.ones(sample.shape[1]))
+        for _ in range(iterations):
+            labels = quantizer.assign(sample)
+            order, offsets = inverted_lists(labels, nlist)
+            filled = np.diff(offsets) > 0
+            # Empty lists are reseeded with random sample rows.
+            centroids = sample[rng.choice(sample_size, nlist)]
+            centroids[filled] = np.add.reduceat(sample[order], offsets[:-1][filled], axis=0)
+            quantizer.centroids = centroids / np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        scale = np.maximum(np.abs(sample).max(axis=0), 1e-6) / 127.0
+        return cls(quantizer.centroids, scale, trained_count=count)
+
+    def assign(self, vectors):
+        """Nearest centroid (by inner product) of every row."""
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), CHUNK_ROWS):
+            block = np.asarray(vectors[start:start + CHUNK_ROWS], dtype=np.float32)
+            labels[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return labels
+
+    def encode(self, vectors):
+        """int8 codes; values outside the trained range saturate at +/-127."""
+        return np.clip(np.rint(np.asarray(vectors, dtype=np.float32) / self.scale), -127, 127).astype(np.int8)
+
+    def probe(self, query, nprobe):
+        """The `nprobe` lists whose centroids are closest to `query`."""
+        nprobe = min(max(int(nprobe), 1), self.nlist)
+        if nprobe == self.nlist:
+            return np.arange(self.nlist)
+        return np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+    def save(self, fh):
+        np.savez(fh, centroids=self.centroids, scale=self.scale, trained_count=self.trained_count)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['centroids'], data['scale'], int(data['trained_count']))
+
+
+def inverted_lists(labels, nlist):
+    """Return (order, offsets): row order grouped by list, and where each list starts in it."""
+    order = np.argsort(labels, kind='stable')
+    offsets = np.searchsorted(labels[order], np.arange(nlist + 1), side='left')
+    return order, offsets.astype(np.int64)
+
+
+def list_labels(offsets):
+    """Inverse of inverted_lists for rows already in list order."""
+    return np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+
+
+def ivf_search(quantizer, codes, offsets, query, k, nprobe, vectors=None, rerank=4, mask=None):
+    """
+    Approximate top k of one set of inverted lists; returns (rows, scores), best first.
+
+    `codes`, `vectors` and `mask` are in list order as laid out by
+    inverted_lists; rows where `mask` is False are skipped. With `vectors`,
+    the best k * rerank int8 candidates are re-scored exactly and the scores
+    are true cosines, otherwise they are int8 approximations.
+    """
+    lists = np.sort(quantizer.probe(query, nprobe))
+    ranges = [(offsets[i], offsets[i + 1]) for i in lists if offsets[i + 1] > offsets[i]]
+    if not ranges:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+    scaled = query * quantizer.scale
+    approx = np.concatenate([np.asarray(codes[start:end]) @ scaled for start, end in ranges])
+    if mask is not None:
+        approx = np.where(mask[rows], approx, -np.inf)
+
+    if vectors is None:
+        top = top_k(approx, k)
+        return rows[top], approx[top]
+    candidates = np.sort(rows[top_k(approx, max(k * max(rerank, 1), k))])
+    exact = np.asarray(vectors[candidates]) @ query
+    top = top_k(exact, k)
+    return candidates[top], exact[top]
@@ -1,6 +1,25 @@
+import os
+import threading
+
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def enable_sqlite_wal(sender, connection, **kwargs):
+    """Let API readers keep reading while the pipeline writes result chunks."""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=WAL;")
 
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        connection_created.connect(enable_sqlite_wal)
+        if os.environ.get("LITE_SEMANTIC_WARM") == "1":
+            # Load the query model for /api/papers/semantic/ without delaying startup.
+            from .semantic import warm_up
+
+            threading.Thread(target=warm_up, name="semantic-warm-up", daemon=True).start()
@@ -0,0 +1,55 @@
+"""
+Embedding model settings shared by the pipeline script and the web process.
+
+The pipeline encodes papers with these models and stores the vectors in
+PaperEmbedding under embedding_cache_name(); the semantic search endpoint
+(api/semantic.py) encodes queries with the same model and backend so query
+and paper vectors are comparable.
+
+Like api/fingerprint.py this module must stay free of Django imports, and it
+imports sentence_transformers only when a model is loaded.
+"""
+import os
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "int8")
+
+
+def embedding_model_name() -> str:
+    """SentenceTransformer model chosen by LITE_EMBEDDING_MODEL."""
+    return os.environ.get("LITE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+
+def embedding_backend() -> str:
+    """Embedding backend chosen by LITE_EMBEDDING_BACKEND: torch (fp32), onnx or int8."""
+    backend = os.environ.get("LITE_EMBEDDING_BACKEND", "torch").lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"LITE_EMBEDDING_BACKEND must be one of {', '.join(EMBEDDING_BACKENDS)}, got {backend!r}")
+    return backend
+
+
+def embedding_cache_name(model_name: str, backend: str) -> str:
+    """Name stored on PaperEmbedding rows; quantized vectors never mix with fp32 ones."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def load_embedding_model(model_name: str, backend: str = "torch"):
+    """Load model_name for CPU inference with the requested backend.
+
+    onnx runs an exported ONNX graph through onnxruntime (sentence-transformers>=3.2
+    with optimum[onnxruntime]); LITE_ONNX_FILE selects a pre-quantized file such as
+    onnx/model_qint8_avx512_vnni.onnx. int8 applies PyTorch dynamic quantization to
+    the Linear layers of the fp32 model and needs no extra packages.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        onnx_file = os.environ.get("LITE_ONNX_FILE")
+        model_kwargs = {"file_name": onnx_file} if onnx_file else None
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(model_name, device="cpu" if backend == "int8" else None)
+    if backend == "int8":
+        import torch
+
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
@@ -0,0 +1,151 @@
+"""
+Search configuration and fingerprints shared by the API and the pipeline script.
+
+Every SearchJob stores its own configuration (search_config): the keywords, the
+date window and any per-search overrides of the tuning settings. The pipeline
+reads it back by job id, so concurrent searches never share state.
+
+A fingerprint hashes everything that decides a run's result: the normalized
+keywords, the date window, the embedding model and backend, and the clustering
+settings. Two searches with the same fingerprint produce the same topics, so
+the API can hand back a recent result or attach to a run already in flight.
+
+This module must stay free of Django imports; scripts/arxiv_kmeans_sbert_umap.py
+imports it before Django is configured.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+# Environment settings that change what a run produces, with the pipeline's defaults.
+FINGERPRINT_SETTINGS = {
+    'embedding_model': ('LITE_EMBEDDING_MODEL', 'all-MiniLM-L6-v2'),
+    'embedding_backend': ('LITE_EMBEDDING_BACKEND', 'torch'),
+    'clustering_mode': ('LITE_CLUSTERING_MODE', 'hdbscan'),
+    'max_papers': ('LITE_MAX_PAPERS', '100'),
+    'min_topic_size': ('LITE_MIN_TOPIC_SIZE', '5'),
+    'min_topic_samples': ('LITE_MIN_TOPIC_SAMPLES', '2'),
+    'disable_embeddings': ('LITE_DISABLE_EMBEDDINGS', '0'),
+}
+
+# Settings a single search may override; everything else comes from the worker's environment.
+SEARCH_PARAMETERS = ('clustering_mode', 'max_papers', 'min_topic_size', 'min_topic_samples')
+CLUSTERING_MODES = ('hdbscan', 'kmeans')
+
+
+def clean_keywords(keywords):
+    """Lower-case, collapse whitespace and drop empty or repeated keywords, keeping order."""
+    seen = set()
+    cleaned = []
+    for keyword in keywords:
+        keyword = re.sub(r"\s+", " ", str(keyword).strip().lower())
+        if keyword and keyword not in seen:
+            seen.add(keyword)
+            cleaned.append(keyword)
+    return cleaned
+
+
+def date_window(today=None):
+    """The pipeline's default search window: the year up to today, as YYYY-MM-DD strings."""
+    end_date = today or datetime.now()
+    start_date = end_date - timedelta(days=365)
+    return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+
+def max_papers_limit():
+    """Largest max_papers a search may ask for (LITE_MAX_PAPERS_LIMIT, default 500)."""
+    return max(1, int(os.environ.get('LITE_MAX_PAPERS_LIMIT', '500')))
+
+
+def clean_parameters(parameters):
+    """
+    Validate per-search overrides of SEARCH_PARAMETERS.
+
+    Returns a dict with only the given settings; raises ValueError for an
+    unknown name or a value the pipeline could not use. max_papers may not
+    exceed LITE_MAX_PAPERS_LIMIT (default 500), so one search cannot make a
+    worker harvest and embed an unbounded corpus.
+    """
+    if not parameters:
+        return {}
+    if not isinstance(parameters, dict):
+        raise ValueError('parameters must be an object')
+    unknown = sorted(set(parameters) - set(SEARCH_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+    cleaned = {}
+    for name, value in parameters.items():
+        if name == 'clustering_mode':
+            value = str(value).strip().lower()
+            if value not in CLUSTERING_MODES:
+                raise ValueError(f"clustering_mode must be one of {', '.join(CLUSTERING_MODES)}")
+        else:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'{name} must be an integer') from None
+            if value < 1:
+                raise ValueError(f'{name} must be at least 1')
+            if name == 'max_papers' and value > max_papers_limit():
+                raise ValueError(f'max_papers must be at most {max_papers_limit()}')
+        cleaned[name] = value
+    return cleaned
+
+
+def search_config(must_include, optional_keywords, start_date=None, end_date=None, parameters=None):
+    """
+    The configuration one SearchJob runs with, as stored in SearchJob.config.
+
+    Keywords are cleaned, the date window defaults to date_window() and dates
+    must be YYYY-MM-DD with start before end. Raises ValueError for bad input.
+    """
+    default_start, default_end = date_window()
+    start_date, end_date = start_date or default_start, end_date or default_end
+    try:
+        start, end = datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError('start_date and end_date must be YYYY-MM-DD dates') from None
+    if start > end:
+        raise ValueError('start_date must not be after end_date')
+    if isinstance(must_include, str):
+        must_include = [must_include]
+    if isinstance(optional_keywords, str):
+        optional_keywords = [optional_keywords]
+    return {
+        'must_include': clean_keywords(must_include or []),
+        'optional_keywords': clean_keywords(optional_keywords or []),
+        'start_date': start_date,
+        'end_date': end_date,
+        'parameters': clean_parameters(parameters),
+    }
+
+
+def fingerprint_settings(environ=None, overrides=None):
+    """Current values of the settings that take part in the fingerprint, with a search's overrides applied."""
+    environ = os.environ if environ is None else environ
+    settings = {
+        name: str(environ.get(variable, default)).strip()
+        for name, (variable, default) in FINGERPRINT_SETTINGS.items()
+    }
+    settings.update({name: str(value) for name, value in (overrides or {}).items()})
+    return settings
+
+
+def search_fingerprint(must_include, optional_keywords, start_date, end_date, settings=None):
+    """
+    Return (fingerprint, components) for one search configuration.
+
+    Keywords are normalized with clean_keywords and sorted, so the same terms
+    typed in a different order or case share a fingerprint.
+    """
+    components = {
+        'must_include': sorted(clean_keywords(must_include or [])),
+        'optional_keywords': sorted(clean_keywords(optional_keywords or [])),
+        'start_date': start_date,
+        'end_date': end_date,
+        'settings': settings if settings is not None else fingerprint_settings(),
+    }
+    canonical = json.dumps(components, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest(), components
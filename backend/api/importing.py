@@ -0,0 +1,115 @@
+"""Streaming, chunked CSV import engine shared by the import management commands."""
+import csv
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Paper
+
+MAX_LOGGED_ERRORS = 20
+
+
+def iter_csv_chunks(file_path, chunk_size):
+    """Yield lists of (row_number, row) without loading the whole CSV into memory."""
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        rows = enumerate(csv.DictReader(f), 1)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def parse_chunk(row_parser, chunk):
+    """Apply row_parser to every (row_number, row) pair; return (parsed, errors)."""
+    parsed = []
+    errors = []
+    for row_number, row in chunk:
+        try:
+            parsed.append(row_parser(row_number, row))
+        except Exception as e:
+            errors.append((row_number, str(e)))
+    return parsed, errors
+
+
+def parse_chunks(chunks, parser, workers=1):
+    """
+    Run parser over each chunk, in order, optionally on a process pool.
+
+    At most 2 * workers chunks are in flight, so memory stays bounded no
+    matter how large the input file is.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield parser(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(parser, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def upsert_papers(paper_fields, update_fields):
+    """
+    Insert or update Paper rows keyed on arxiv_id in a single statement.
+
+    Returns a mapping of arxiv_id to primary key for the upserted rows.
+    """
+    # Later rows win, and Postgres rejects an upsert touching one key twice.
+    by_id = {fields['arxiv_id']: fields for fields in paper_fields}
+    now = timezone.now()
+    Paper.objects.bulk_create(
+        [Paper(created_at=now, updated_at=now, **fields) for fields in by_id.values()],
+        update_conflicts=True,
+        unique_fields=['arxiv_id'],
+        update_fields=list(update_fields) + ['updated_at'],
+    )
+    return dict(Paper.objects.filter(arxiv_id__in=list(by_id)).values_list('arxiv_id', 'id'))
+
+
+def run_import(file_path, import_log, row_parser, handle_chunk, batch_size=1000, workers=1, stdout=None):
+    """
+    Stream file_path through row_parser and handle_chunk, one transaction per chunk.
+
+    row_parser(row_number, row) must be a module-level function so it can run
+    in worker processes. handle_chunk(parsed_rows) writes a parsed chunk and returns how many rows it
+    stored. Progress and per-row failures are saved on import_log after every
+    chunk, so an interrupted import leaves an accurate record behind.
+    """
+    import_log.status = 'processing'
+    import_log.save()
+
+    errors = []
+    chunks = iter_csv_chunks(file_path, batch_size)
+    for parsed, chunk_errors in parse_chunks(chunks, partial(parse_chunk, row_parser), workers):
+        if parsed:
+            with transaction.atomic():
+                import_log.row_count += handle_chunk(parsed)
+        import_log.failed_rows += len(chunk_errors)
+        errors.extend(chunk_errors[:max(0, MAX_LOGGED_ERRORS - len(errors))])
+        import_log.error_message = '\n'.join(f'Row {number}: {message}' for number, message in errors)
+        import_log.save(update_fields=['row_count', 'failed_rows', 'error_message'])
+        if stdout is not None:
+            stdout.write(
+                f'  Processed {import_log.row_count + import_log.failed_rows} rows '
+                f'({import_log.failed_rows} failed)...',
+                ending='\r',
+            )
+
+    if import_log.row_count and not import_log.failed_rows:
+        import_log.status = 'success'
+    elif import_log.row_count:
+        import_log.status = 'partial'
+    else:
+        import_log.status = 'failed'
+    import_log.save()
+    return import_log
@@ -0,0 +1,188 @@
+"""
+Database-backed search job queue.
+
+The API creates SearchJob rows in `queued` state; the pipeline worker pool
+(scripts/pipeline_worker.py) claims them oldest first and moves them through
+processing to completed or failed. Claiming is a conditional UPDATE, so any
+number of workers can poll the same table without running a job twice.
+
+The claiming worker records its id on the job and refreshes `heartbeat_at`
+while it runs it. A processing job is only failed as interrupted once its
+heartbeat is older than job_heartbeat_timeout(), so one pool starting never
+fails jobs that another live pool is running.
+"""
+import os
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import SearchJob, SearchJobEvent
+
+IN_FLIGHT_STATUSES = ('queued', 'processing')
+
+
+def job_heartbeat_seconds():
+    """How often a worker refreshes the heartbeat of the job it runs (LITE_JOB_HEARTBEAT_SECONDS, default 30)."""
+    return max(1, int(os.environ.get('LITE_JOB_HEARTBEAT_SECONDS', '30')))
+
+
+def job_heartbeat_timeout():
+    """Heartbeat age after which a processing job counts as abandoned: three missed beats."""
+    return timedelta(seconds=3 * job_heartbeat_seconds())
+
+
+def find_reusable_job(fingerprint):
+    """
+    Return (job, how) for a search that does not need a new run, or (None, None).
+
+    `how` is 'reused' for a completed job newer than LITE_RESULT_REUSE_SECONDS
+    (default one hour, 0 disables reuse) and 'attached' for a live in-flight
+    job: a queued job touched within LITE_JOB_STALE_SECONDS (default two hours),
+    or a processing job whose heartbeat (updated_at before its first beat) is
+    younger than job_heartbeat_timeout(). A crashed run cannot swallow later
+    searches, and a long run whose worker is alive is always attached to.
+    """
+    now = timezone.now()
+    jobs = SearchJob.objects.filter(fingerprint=fingerprint)
+
+    reuse_seconds = int(os.environ.get('LITE_RESULT_REUSE_SECONDS', '3600'))
+    if reuse_seconds > 0:
+        completed = (
+            jobs.filter(status='completed', updated_at__gte=now - timedelta(seconds=reuse_seconds))
+            .order_by('-updated_at')
+            .first()
+        )
+        if completed:
+            return completed, 'reused'
+
+    stale_seconds = int(os.environ.get('LITE_JOB_STALE_SECONDS', '7200'))
+    live = Q(status='queued', updated_at__gte=now - timedelta(seconds=stale_seconds)) | Q(
+        status='processing', last_seen__gte=now - job_heartbeat_timeout()
+    )
+    in_flight = (
+        jobs.annotate(last_seen=Coalesce('heartbeat_at', 'updated_at'))
+        .filter(live)
+        .order_by('id')
+        .first()
+    )
+    if in_flight:
+        return in_flight, 'attached'
+    return None, None
+
+
+def create_search_job(config, fingerprint, components):
+    """
+    Create a queued SearchJob for a new search, or attach to an identical one.
+
+    `config` is the search's api.fingerprint.search_config(); the pipeline
+    reads it back from the row, so concurrent searches never share state.
+
+    Two identical POSTs can both miss find_reusable_job; after inserting, the
+    oldest in-flight job with the fingerprint wins and the newer row is
+    dropped. The insert and the check share one transaction, so workers only
+    ever see the row once it has won: a duplicate is rolled back before any
+    worker could claim it. On SQLite the insert also takes the write lock, so
+    the second of two identical POSTs waits and then finds the first.
+    Returns (job, created).
+    """
+    with transaction.atomic():
+        job = SearchJob.objects.create(
+            query=', '.join(config['must_include']),
+            optional_keywords=', '.join(config['optional_keywords']),
+            fingerprint=fingerprint,
+            config=config,
+            status='queued',
+            metadata={'fingerprint': components},
+        )
+        oldest = (
+            SearchJob.objects.filter(fingerprint=fingerprint, status__in=IN_FLIGHT_STATUSES, id__lt=job.id)
+            .order_by('id')
+            .first()
+        )
+        if oldest is not None:
+            transaction.set_rollback(True)
+            return oldest, False
+        SearchJobEvent.objects.create(search_job=job, event='queued', data={'job_id': job.id})
+    return job, True
+
+
+def queue_stats():
+    """Number of queued and running jobs, and the queue limit."""
+    counts = dict(
+        SearchJob.objects.filter(status__in=IN_FLIGHT_STATUSES)
+        .order_by()
+        .values_list('status')
+        .annotate(count=Count('id'))
+    )
+    return {
+        'queued': counts.get('queued', 0),
+        'processing': counts.get('processing', 0),
+        'queue_limit': int(os.environ.get('LITE_QUEUE_LIMIT', '20')),
+    }
+
+
+def queue_is_full():
+    """True when LITE_QUEUE_LIMIT jobs (default 20) are already waiting for a worker."""
+    stats = queue_stats()
+    return stats['queued'] >= stats['queue_limit']
+
+
+def claim_next_job(worker_id=''):
+    """Move the oldest queued job to processing for `worker_id` and return its id, or None if the queue is empty."""
+    while True:
+        job_id = (
+            SearchJob.objects.filter(status='queued')
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = SearchJob.objects.filter(pk=job_id, status='queued').update(
+            status='processing',
+            worker_id=worker_id,
+            heartbeat_at=now,
+            updated_at=now,
+        )
+        if claimed:
+            return job_id
+
+
+def beat_job(job_id, worker_id):
+    """Record that `worker_id` is still running the job; False once the job is no longer its own."""
+    return bool(
+        SearchJob.objects.filter(pk=job_id, worker_id=worker_id, status='processing')
+        .update(heartbeat_at=timezone.now())
+    )
+
+
+def fail_interrupted_jobs():
+    """Mark processing jobs whose worker stopped sending heartbeats as failed; returns how many."""
+    cutoff = timezone.now() - job_heartbeat_timeout()
+    abandoned = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, updated_at__lt=cutoff)
+    return SearchJob.objects.filter(abandoned, status='processing').update(
+        status='failed',
+        error_message='Pipeline worker stopped while the job was running.',
+        updated_at=timezone.now(),
+    )
+
+
+def describe_job(job, how=None):
+    """Response payload identifying the job that will hold a search's results."""
+    payload = {
+        'job_id': job.id,
+        'status': job.status,
+        'fingerprint': job.fingerprint,
+    }
+    if how:
+        payload[how] = True
+    if job.status == 'queued':
+        payload['queue_position'] = SearchJob.objects.filter(status='queued', id__lte=job.id).count()
+    if job.status == 'completed':
+        payload['papers_matched'] = job.papers_matched
+        payload['topics_found'] = job.topics_found
+    return payload
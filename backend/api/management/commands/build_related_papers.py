@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from api.embeddings import embedding_backend, embedding_cache_name, embedding_model_name
+from api.models import PaperTopic, SearchJob
+from api.related import global_neighbours, related_k, replace_related, store_job_related
+from api.semantic import open_index
+
+
+class Command(BaseCommand):
+    help = 'Backfill precomputed related papers from stored embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            type=str,
+            help='PaperEmbedding model name to use (default: LITE_EMBEDDING_MODEL with LITE_EMBEDDING_BACKEND)',
+        )
+        parser.add_argument(
+            '--jobs',
+            action='store_true',
+            help='Also rebuild the within-job lists of every completed SearchJob',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1024,
+            help='Papers whose neighbours are searched per batch (default: 1024)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model_name = options['model'] or embedding_cache_name(embedding_model_name(), embedding_backend())
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        index = open_index(model_name)
+        k = related_k()
+        papers = 0
+        for segment in index.segments:
+            rows = np.arange(len(segment.paper_ids)) if segment.live is None else np.flatnonzero(segment.live)
+            for start in range(0, len(rows), options['batch_size']):
+                chunk = rows[start:start + options['batch_size']]
+                paper_ids = segment.paper_ids[chunk].tolist()
+                vectors = np.asarray(segment.vectors[chunk], dtype=np.float32)
+                replace_related(None, global_neighbours(index, paper_ids, vectors, k))
+                papers += len(chunk)
+        self.stdout.write(f'Stored global related papers for {papers} papers')
+
+        if options['jobs']:
+            for job_id in SearchJob.objects.filter(status='completed').values_list('id', flat=True):
+                paper_ids, vectors = index.vectors_for(
+                    PaperTopic.objects.filter(search_job_id=job_id).values_list('paper_id', flat=True)
+                )
+                rows = store_job_related(job_id, paper_ids.tolist(), vectors, k)
+                self.stdout.write(f'SearchJob {job_id}: {rows} related-paper rows')
+
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f}s'))
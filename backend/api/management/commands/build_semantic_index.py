@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.embeddings import embedding_backend, embedding_cache_name, embedding_model_name
+from api.semantic import update_index
+
+
+class Command(BaseCommand):
+    help = 'Build or update the semantic search index from stored paper embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            type=str,
+            help='PaperEmbedding model name to index (default: LITE_EMBEDDING_MODEL with LITE_EMBEDDING_BACKEND)',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rewrite the index from scratch and retrain the IVF lists instead of adding new vectors',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model_name = options['model'] or embedding_cache_name(embedding_model_name(), embedding_backend())
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        meta = update_index(model_name, rebuild=options['rebuild'])
+        rows = sum(spec['count'] for spec in meta['segments'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {rows} vectors of {model_name} in {len(meta['segments'])} segment(s), "
+            f"{'IVF lists' if meta.get('quantizer') else 'exact search'}, "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
@@ -1,17 +1,72 @@
-import csv
+from collections import Counter
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
 
-from api.models import Paper, PaperTopic, SearchJob, Topic
+from api.aggregates import store_job_aggregates
+from api.importing import run_import, upsert_papers
+from api.models import PaperImportLog, PaperTopic, SearchJob, Topic
+
+PAPER_UPDATE_FIELDS = [
+    'title', 'abstract', 'authors', 'published_date', 'year', 'month', 'cluster', 'url', 'metadata',
+]
+
+
+def parse_topic_row(job_id, source_file, row_number, row):
+    """Convert one topic CSV row into Paper fields plus its topic assignment."""
+    title = (row.get('Title') or 'Untitled').strip()
+    paper_id = row.get('id') or row.get('ID') or f'imported-{job_id}-{row_number - 1}'
+    published_date = None
+    year = int(float(row['Year'])) if row.get('Year') else None
+    month = (row.get('Month') or '').strip() or None
+    if year and month:
+        try:
+            published_date = datetime.strptime(f'{month} {year}', '%B %Y').date()
+        except ValueError:
+            published_date = None
+
+    cluster_id = int(float(row.get('Cluster') or -1))
+    confidence = row.get('Topic Confidence')
+    return {
+        'cluster_id': cluster_id,
+        'topic_label': (row.get('Topic Label') or f'Cluster {cluster_id}').strip(),
+        'topic_keywords': (row.get('Topic Keywords') or '').strip(),
+        'confidence': float(confidence) if confidence else None,
+        'paper': {
+            'arxiv_id': str(paper_id)[:100],
+            'title': title,
+            'abstract': (row.get('Abstract') or '').strip(),
+            'authors': (row.get('Authors') or '').strip(),
+            'published_date': published_date,
+            'year': year,
+            'month': month,
+            'cluster': cluster_id,
+            'url': row.get('url') or '#',
+            'metadata': {'source_file': source_file},
+        },
+    }
 
 
 class Command(BaseCommand):
     help = 'Import the latest topic CSV into SearchJob, Topic, Paper, and PaperTopic tables'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows upserted per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes used to parse CSV rows (default: 1)',
+        )
+
     def handle(self, *args, **options):
         out_dir = Path(settings.BASE_DIR).parent / 'backend' / 'scripts' / 'out'
         files = sorted(
@@ -23,78 +78,101 @@ class Command(BaseCommand):
             raise CommandError(f'No topic CSV files found in {out_dir}')
 
         file_path = files[0]
-        with file_path.open('r', encoding='utf-8', newline='') as csvfile:
-            rows = list(csv.DictReader(csvfile))
-        if not rows:
-            raise CommandError(f'{file_path} is empty')
+        # The job stays 'processing' until every chunk is written, so the API
+        # keeps serving the previous completed job in the meantime.
+        self.job = SearchJob.objects.create(
+            query='Imported latest topic CSV',
+            status='processing',
+            metadata={'source_file': file_path.name},
+        )
+        self.topic_map = {}
+        self.cluster_counts = Counter()
+        import_log = PaperImportLog(filename=file_path.name, row_count=0, status='processing')
 
-        with transaction.atomic():
-            job = SearchJob.objects.create(
-                query='Imported latest topic CSV',
-                status='completed',
-                papers_scanned=len(rows),
-                papers_matched=len(rows),
-                topics_found=len({row.get('Cluster', '-1') for row in rows if row.get('Cluster') != '-1'}),
-                outliers_found=sum(1 for row in rows if row.get('Cluster') == '-1'),
-                metadata={'source_file': file_path.name},
+        try:
+            run_import(
+                file_path,
+                import_log,
+                partial(parse_topic_row, self.job.id, file_path.name),
+                self.store_rows,
+                batch_size=max(1, options['batch_size']),
+                workers=options['workers'],
+                stdout=self.stdout,
             )
+        except Exception as e:
+            self.job.status = 'failed'
+            self.job.error_message = str(e)
+            self.job.save()
+            import_log.status = 'failed'
+            import_log.error_message = str(e)
+            import_log.save()
+            raise CommandError(f'Failed to import {file_path}: {e}')
+
+        rows_seen = import_log.row_count + import_log.failed_rows
+        if not rows_seen:
+            self.job.delete()
+            raise CommandError(f'{file_path} is empty')
 
-            topic_map = {}
-            for row in rows:
-                cluster_id = int(float(row.get('Cluster') or -1))
-                if cluster_id in topic_map:
-                    continue
-                topic_map[cluster_id] = Topic.objects.create(
-                    search_job=job,
+        for cluster_id, topic in self.topic_map.items():
+            topic.paper_count = self.cluster_counts[cluster_id]
+        Topic.objects.bulk_update(self.topic_map.values(), ['paper_count'])
+        store_job_aggregates(self.job.id)
+
+        self.job.status = 'completed' if import_log.row_count else 'failed'
+        self.job.papers_scanned = rows_seen
+        self.job.papers_matched = import_log.row_count
+        self.job.topics_found = len([cid for cid in self.cluster_counts if cid != -1])
+        self.job.outliers_found = self.cluster_counts[-1]
+        self.job.error_message = import_log.error_message
+        self.job.save()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nImported {import_log.row_count} papers, {len(self.topic_map)} topics into SearchJob {self.job.id}'
+            f' ({import_log.failed_rows} rows failed)'
+        ))
+
+    def store_rows(self, rows):
+        """Write one parsed chunk: new topics, papers, and paper-topic assignments."""
+        new_topics = {}
+        for row in rows:
+            cluster_id = row['cluster_id']
+            if cluster_id not in self.topic_map and cluster_id not in new_topics:
+                new_topics[cluster_id] = Topic(
+                    search_job=self.job,
                     cluster_id=cluster_id,
-                    label=(row.get('Topic Label') or f'Cluster {cluster_id}').strip(),
-                    keywords=(row.get('Topic Keywords') or '').strip(),
-                    paper_count=sum(1 for item in rows if int(float(item.get('Cluster') or -1)) == cluster_id),
+                    label=row['topic_label'],
+                    keywords=row['topic_keywords'],
                     is_outlier=cluster_id == -1,
                 )
+        if new_topics:
+            Topic.objects.bulk_create(new_topics.values())
+            self.topic_map.update({
+                topic.cluster_id: topic
+                for topic in Topic.objects.filter(search_job=self.job, cluster_id__in=list(new_topics))
+            })
 
-            for index, row in enumerate(rows):
-                title = (row.get('Title') or 'Untitled').strip()
-                paper_id = row.get('id') or row.get('ID') or f'imported-{job.id}-{index}'
-                published_date = None
-                year = int(float(row['Year'])) if row.get('Year') else None
-                month = (row.get('Month') or '').strip() or None
-                if year and month:
-                    try:
-                        published_date = datetime.strptime(f'{month} {year}', '%B %Y').date()
-                    except ValueError:
-                        published_date = None
-
-                cluster_id = int(float(row.get('Cluster') or -1))
-                topic = topic_map[cluster_id]
-                paper, _ = Paper.objects.update_or_create(
-                    arxiv_id=str(paper_id)[:100],
-                    defaults={
-                        'title': title,
-                        'abstract': (row.get('Abstract') or '').strip(),
-                        'authors': (row.get('Authors') or '').strip(),
-                        'published_date': published_date,
-                        'year': year,
-                        'month': month,
-                        'cluster': cluster_id,
-                        'url': row.get('url') or '#',
-                        'metadata': {
-                            'topic_label': topic.label,
-                            'topic_keywords': topic.keywords,
-                            'source_file': file_path.name,
-                        },
-                    },
-                )
-                confidence = row.get('Topic Confidence')
-                PaperTopic.objects.update_or_create(
-                    paper=paper,
-                    search_job=job,
-                    defaults={
-                        'topic': topic,
-                        'confidence': float(confidence) if confidence else None,
-                    },
-                )
+        for row in rows:
+            topic = self.topic_map[row['cluster_id']]
+            row['paper']['metadata'].update({
+                'topic_label': topic.label,
+                'topic_keywords': topic.keywords,
+            })
+        paper_ids = upsert_papers([row['paper'] for row in rows], PAPER_UPDATE_FIELDS)
 
-        self.stdout.write(self.style.SUCCESS(
-            f'Imported {len(rows)} papers, {len(topic_map)} topics into SearchJob {job.id}'
-        ))
+        assignments = {}
+        for row in rows:
+            assignments[row['paper']['arxiv_id']] = PaperTopic(
+                paper_id=paper_ids[row['paper']['arxiv_id']],
+                topic=self.topic_map[row['cluster_id']],
+                search_job=self.job,
+                confidence=row['confidence'],
+                published_date=row['paper']['published_date'],
+            )
+        PaperTopic.objects.bulk_create(
+            assignments.values(),
+            update_conflicts=True,
+            unique_fields=['paper', 'search_job'],
+            update_fields=['topic', 'confidence', 'published_date'],
+        )
+        self.cluster_counts.update(row['cluster_id'] for row in rows)
+        return len(rows)
@@ -1,13 +1,81 @@
 import os
-import csv
-import json
 from datetime import datetime
 from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
 from django.conf import settings
+from api.importing import run_import, upsert_papers
 from api.models import Paper, PaperImportLog
 
+PAPER_UPDATE_FIELDS = [
+    'title', 'abstract', 'authors', 'published_date', 'year', 'month',
+    'categories', 'cluster', 'url', 'metadata',
+]
+
+
+def parse_paper_row(row_number, row):
+    """Convert one CSV row into Paper field values."""
+    # Extract paper ID
+    paper_id = row.get('id') or row.get('ID', '').strip()
+    if not paper_id:
+        raise ValueError('Missing paper ID')
+
+    # Parse published date
+    published_date = None
+    date_str = row.get('Published') or row.get('published') or row.get('Date', '')
+    if date_str:
+        try:
+            # Handle different date formats
+            for fmt in ('%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y'):
+                try:
+                    published_date = datetime.strptime(date_str.split()[0], fmt).date()
+                    break
+                except ValueError:
+                    continue
+        except (ValueError, AttributeError):
+            pass
+
+    # Extract year and month
+    year = None
+    month = None
+
+    # Try to get from explicit fields first
+    if 'Year' in row and row['Year']:
+        try:
+            year = int(float(row['Year']))
+        except (ValueError, TypeError):
+            pass
+
+    if 'Month' in row and row['Month']:
+        month = str(row['Month']).strip()
+
+    # Fall back to published date
+    if published_date and not (year and month):
+        year = published_date.year
+        month = published_date.strftime('%B')
+
+    # Prepare metadata
+    metadata = {k: v for k, v in row.items() if v and k not in [
+        'id', 'ID', 'Title', 'title', 'Abstract', 'abstract',
+        'Authors', 'authors', 'Published', 'published', 'Date',
+        'Cluster', 'cluster', 'Categories', 'categories', 'Year', 'year',
+        'Month', 'month', 'url', 'URL'
+    ]}
+
+    return {
+        'arxiv_id': paper_id,
+        'title': row.get('Title') or row.get('title', '').strip(),
+        'abstract': (row.get('Abstract') or row.get('abstract', '')).strip(),
+        'authors': (row.get('Authors') or row.get('authors', '')).strip(),
+        'published_date': published_date,
+        'year': year,
+        'month': month,
+        'categories': (row.get('Categories') or row.get('categories', '')).strip(),
+        'cluster': int(float(row.get('Cluster') or row.get('cluster') or -1)),
+        'url': row.get('url') or f'https://arxiv.org/abs/{paper_id}',
+        'metadata': metadata,
+    }
+
+
 class Command(BaseCommand):
     help = 'Import papers from CSV files into the database'
 
@@ -27,6 +95,18 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing papers before import',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows upserted per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes used to parse CSV rows (default: 1)',
+        )
 
     def handle(self, *args, **options):
         files_to_import = []
@@ -69,112 +149,41 @@ class Command(BaseCommand):
         # Process each file
         for file_path in files_to_import:
             self.stdout.write(f'\nProcessing file: {file_path}')
-            self.import_file(file_path)
+            self.import_file(file_path, options['batch_size'], options['workers'])
     
-    def import_file(self, file_path):
-        """Import papers from a single CSV file."""
+    def import_file(self, file_path, batch_size=1000, workers=1):
+        """Stream papers from a single CSV file into the database."""
         import_log = PaperImportLog(
             filename=file_path.name,
             row_count=0,
             status='processing'
         )
-        
+
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-                total_rows = len(rows)
-                
-                with transaction.atomic():
-                    for i, row in enumerate(rows, 1):
-                        try:
-                            self.import_paper(row)
-                            import_log.row_count += 1
-                            
-                            # Log progress
-                            if i % 100 == 0 or i == total_rows:
-                                self.stdout.write(f'  Processed {i}/{total_rows} rows...', ending='\r')
-                                
-                        except Exception as e:
-                            self.stderr.write(f'\nError processing row {i}: {e}')
-                            continue
-                    
-                    import_log.status = 'success' if import_log.row_count > 0 else 'partial'
-                    import_log.save()
-                    
-                    self.stdout.write(f'\nSuccessfully imported {import_log.row_count} papers from {file_path.name}')
-                    
+            run_import(
+                file_path,
+                import_log,
+                parse_paper_row,
+                self.store_papers,
+                batch_size=max(1, batch_size),
+                workers=workers,
+                stdout=self.stdout,
+            )
+            self.stdout.write(
+                f'\nSuccessfully imported {import_log.row_count} papers from {file_path.name}'
+                f' ({import_log.failed_rows} rows failed)'
+            )
+            if import_log.failed_rows:
+                self.stderr.write(import_log.error_message)
+
         except Exception as e:
             import_log.status = 'failed'
             import_log.error_message = str(e)
             import_log.save()
             self.stderr.write(f'\nError importing file {file_path}: {e}')
             raise CommandError(f'Failed to import {file_path}: {e}')
-    
-    def import_paper(self, row):
-        """Import a single paper from a CSV row."""
-        # Extract paper ID
-        paper_id = row.get('id') or row.get('ID', '').strip()
-        if not paper_id:
-            raise ValueError('Missing paper ID')
-        
-        # Parse published date
-        published_date = None
-        date_str = row.get('Published') or row.get('published') or row.get('Date', '')
-        if date_str:
-            try:
-                # Handle different date formats
-                for fmt in ('%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y'):
-                    try:
-                        published_date = datetime.strptime(date_str.split()[0], fmt).date()
-                        break
-                    except ValueError:
-                        continue
-            except (ValueError, AttributeError):
-                pass
-        
-        # Extract year and month
-        year = None
-        month = None
-        
-        # Try to get from explicit fields first
-        if 'Year' in row and row['Year']:
-            try:
-                year = int(float(row['Year']))
-            except (ValueError, TypeError):
-                pass
-                
-        if 'Month' in row and row['Month']:
-            month = str(row['Month']).strip()
-        
-        # Fall back to published date
-        if published_date and not (year and month):
-            year = published_date.year
-            month = published_date.strftime('%B')
-        
-        # Prepare metadata
-        metadata = {k: v for k, v in row.items() if v and k not in [
-            'id', 'ID', 'Title', 'title', 'Abstract', 'abstract', 
-            'Authors', 'authors', 'Published', 'published', 'Date',
-            'Cluster', 'cluster', 'Categories', 'categories', 'Year', 'year',
-            'Month', 'month', 'url', 'URL'
-        ]}
-        
-        # Create or update paper
-        paper, created = Paper.objects.update_or_create(
-            arxiv_id=paper_id,
-            defaults={
-                'title': row.get('Title') or row.get('title', '').strip(),
-                'abstract': (row.get('Abstract') or row.get('abstract', '')).strip(),
-                'authors': (row.get('Authors') or row.get('authors', '')).strip(),
-                'published_date': published_date,
-                'year': year,
-                'month': month,
-                'categories': (row.get('Categories') or row.get('categories', '')).strip(),
-                'cluster': int(float(row.get('Cluster') or row.get('cluster') or -1)),
-                'url': row.get('url') or f'https://arxiv.org/abs/{paper_id}',
-                'metadata': metadata
-            }
-        )
-        
-        return paper
+
+    def store_papers(self, rows):
+        """Upsert one parsed chunk of papers."""
+        upsert_papers(rows, PAPER_UPDATE_FIELDS)
+        return len(rows)
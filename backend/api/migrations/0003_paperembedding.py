@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_searchjob_topic_papertopic"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaperEmbedding",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("arxiv_id", models.CharField(db_index=True, max_length=100)),
+                ("content_hash", models.CharField(max_length=64)),
+                ("model_name", models.CharField(max_length=200)),
+                ("dimensions", models.IntegerField()),
+                ("vector", models.BinaryField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "unique_together": {("arxiv_id", "content_hash", "model_name")},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_paperembedding"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueryWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("query_hash", models.CharField(max_length=64, unique=True)),
+                ("query", models.TextField()),
+                ("newest_submitted", models.DateTimeField(blank=True, null=True)),
+                ("arxiv_ids", models.JSONField(blank=True, default=list)),
+                ("last_fetched_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_querywatermark"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paperimportlog",
+            name="failed_rows",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="paperimportlog",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("processing", "Processing"),
+                    ("success", "Success"),
+                    ("partial", "Partial"),
+                    ("failed", "Failed"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
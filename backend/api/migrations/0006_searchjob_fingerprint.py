@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_paperimportlog_failed_rows"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchjob",
+            name="fingerprint",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_searchjobevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchjob",
+            name="config",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
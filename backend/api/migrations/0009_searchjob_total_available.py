@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_searchjob_config"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchjob",
+            name="total_available",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:29
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_published_dates(apps, schema_editor):
+    Paper = apps.get_model("api", "Paper")
+    PaperTopic = apps.get_model("api", "PaperTopic")
+    PaperTopic.objects.update(
+        published_date=Subquery(Paper.objects.filter(pk=OuterRef("paper_id")).values("published_date")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_searchjob_total_available"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="papertopic",
+            name="published_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="papertopic",
+            index=models.Index(
+                fields=["search_job", "published_date", "paper"],
+                name="api_paperto_search__a4787d_idx",
+            ),
+        ),
+        migrations.RunPython(copy_published_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_paper_fts USING fts5("
+    "title, abstract, authors, content='api_paper', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS api_paper_fts_insert AFTER INSERT ON api_paper BEGIN "
+    "INSERT INTO api_paper_fts(rowid, title, abstract, authors) VALUES (new.id, new.title, new.abstract, new.authors); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS api_paper_fts_delete AFTER DELETE ON api_paper BEGIN "
+    "INSERT INTO api_paper_fts(api_paper_fts, rowid, title, abstract, authors) "
+    "VALUES ('delete', old.id, old.title, old.abstract, old.authors); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS api_paper_fts_update AFTER UPDATE OF title, abstract, authors ON api_paper BEGIN "
+    "INSERT INTO api_paper_fts(api_paper_fts, rowid, title, abstract, authors) "
+    "VALUES ('delete', old.id, old.title, old.abstract, old.authors); "
+    "INSERT INTO api_paper_fts(rowid, title, abstract, authors) VALUES (new.id, new.title, new.abstract, new.authors); "
+    "END",
+    "INSERT INTO api_paper_fts(api_paper_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS api_paper_fts_insert",
+    "DROP TRIGGER IF EXISTS api_paper_fts_delete",
+    "DROP TRIGGER IF EXISTS api_paper_fts_update",
+    "DROP TABLE IF EXISTS api_paper_fts",
+]
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE api_paper ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('{config}', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('{config}', coalesce(authors, '')), 'B') || "
+    "setweight(to_tsvector('{config}', coalesce(abstract, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS api_paper_search_vector_gin ON api_paper USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS api_paper_search_vector_gin",
+    "ALTER TABLE api_paper DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        statements = SQLITE_FORWARD
+    elif connection.vendor == 'postgresql':
+        config = getattr(settings, 'LITE_SEARCH_CONFIG', 'english')
+        statements = [statement.format(config=config) for statement in POSTGRES_FORWARD]
+    else:
+        # api.search falls back to substring matching.
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_papertopic_published_date"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
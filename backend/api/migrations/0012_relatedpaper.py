@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_paper_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedPaper",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "paper",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_papers",
+                        to="api.paper",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="api.paper",
+                    ),
+                ),
+                (
+                    "search_job",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_papers",
+                        to="api.searchjob",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["rank"],
+                "indexes": [
+                    models.Index(
+                        fields=["paper", "search_job", "rank"],
+                        name="api_related_paper_i_1c8d12_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_relatedpaper"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchJobAggregate",
+            fields=[
+                (
+                    "search_job",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="aggregate",
+                        serialize=False,
+                        to="api.searchjob",
+                    ),
+                ),
+                ("total_papers", models.IntegerField(default=0)),
+                ("cells", models.JSONField(blank=True, default=list)),
+                ("category_cells", models.JSONField(blank=True, default=list)),
+                ("clusters", models.JSONField(blank=True, default=list)),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
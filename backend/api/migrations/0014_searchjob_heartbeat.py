@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_searchjobaggregate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="searchjob",
+            name="worker_id",
+            field=models.CharField(blank=True, max_length=120),
+        ),
+    ]
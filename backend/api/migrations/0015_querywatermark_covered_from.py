@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_searchjob_heartbeat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="querywatermark",
+            name="covered_from",
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
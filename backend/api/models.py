@@ -57,6 +57,9 @@ class SearchJob(models.Model):
     """Track one user-triggered literature search and processing run."""
     query = models.TextField()
     optional_keywords = models.TextField(blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+    # Keywords, date window and parameter overrides the pipeline runs with (api.fingerprint.search_config).
+    config = JSONField(default=dict, blank=True)
     status = models.CharField(max_length=20, choices=[
         ('queued', 'Queued'),
         ('processing', 'Processing'),
@@ -64,6 +67,8 @@ class SearchJob(models.Model):
         ('failed', 'Failed'),
     ], default='queued', db_index=True)
     papers_scanned = models.IntegerField(default=0)
+    # Sum of the total result counts arXiv reported for the run's queries.
+    total_available = models.IntegerField(null=True, blank=True)
     papers_matched = models.IntegerField(default=0)
     duplicates_skipped = models.IntegerField(default=0)
     irrelevant_skipped = models.IntegerField(default=0)
@@ -71,6 +76,9 @@ class SearchJob(models.Model):
     outliers_found = models.IntegerField(default=0)
     processing_seconds = models.FloatField(null=True, blank=True)
     error_message = models.TextField(blank=True)
+    # Pipeline worker process that claimed the job, and when it last reported it still runs it.
+    worker_id = models.CharField(max_length=120, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
     metadata = JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -81,6 +89,31 @@ class SearchJob(models.Model):
     def __str__(self):
         return f"{self.query} ({self.status})"
 
+    @classmethod
+    def get_total_available_papers(cls):
+        """arXiv's total result count for the latest completed search, recorded when it was fetched."""
+        return (
+            cls.objects.filter(status='completed')
+            .order_by('-created_at')
+            .values_list('total_available', flat=True)
+            .first()
+        )
+
+
+class SearchJobEvent(models.Model):
+    """One progress event emitted by the pipeline for a SearchJob, streamed over SSE."""
+    search_job = models.ForeignKey(SearchJob, on_delete=models.CASCADE, related_name='events')
+    event = models.CharField(max_length=40)
+    data = JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['search_job', 'id'])]
+
+    def __str__(self):
+        return f"{self.search_job_id}: {self.event}"
+
 
 class Topic(models.Model):
     """Semantic topic discovered for a search job."""
@@ -106,6 +139,8 @@ class PaperTopic(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='paper_assignments')
     search_job = models.ForeignKey(SearchJob, on_delete=models.CASCADE, related_name='paper_topics')
     confidence = models.FloatField(null=True, blank=True)
+    # Copy of paper.published_date, so a job's papers page from one index.
+    published_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -113,18 +148,96 @@ class PaperTopic(models.Model):
         indexes = [
             models.Index(fields=['search_job', 'confidence']),
             models.Index(fields=['topic', 'confidence']),
+            models.Index(fields=['search_job', 'published_date', 'paper']),
         ]
 
     def __str__(self):
         return f"{self.paper_id} -> {self.topic_id}"
 
 
+class RelatedPaper(models.Model):
+    """
+    Precomputed nearest neighbour of a paper by embedding cosine similarity.
+
+    Rows with a search_job rank neighbours among that job's papers; rows
+    without one rank them across every indexed paper.
+    """
+    # The (paper, search_job, rank) index serves lookups by paper.
+    paper = models.ForeignKey(Paper, on_delete=models.CASCADE, related_name='related_papers', db_index=False)
+    related = models.ForeignKey(Paper, on_delete=models.CASCADE, related_name='+')
+    search_job = models.ForeignKey(
+        SearchJob, on_delete=models.CASCADE, null=True, blank=True, related_name='related_papers'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['rank']
+        indexes = [models.Index(fields=['paper', 'search_job', 'rank'])]
+
+    def __str__(self):
+        return f"{self.paper_id} ~ {self.related_id} ({self.score:.3f})"
+
+
+class SearchJobAggregate(models.Model):
+    """
+    Counts behind the papers endpoint for one SearchJob, computed once when it
+    completes (api.aggregates) instead of on every request.
+    """
+    search_job = models.OneToOneField(
+        SearchJob, on_delete=models.CASCADE, primary_key=True, related_name='aggregate'
+    )
+    total_papers = models.IntegerField(default=0)
+    # [year, month, cluster_id, count] for every combination present in the job.
+    cells = JSONField(default=list, blank=True)
+    # [year, month, cluster_id, category, count], the same cube split by arXiv category.
+    category_cells = JSONField(default=list, blank=True)
+    # [cluster_id, paper_count] of the job's Topic rows.
+    clusters = JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"SearchJob {self.search_job_id}: {self.total_papers} papers"
+
+
+class QueryWatermark(models.Model):
+    """Newest arXiv submission seen for one normalized pipeline query."""
+    query_hash = models.CharField(max_length=64, unique=True)
+    query = models.TextField()
+    newest_submitted = models.DateTimeField(null=True, blank=True)
+    # First day of the harvested range; the range ends at newest_submitted.
+    covered_from = models.DateField(null=True, blank=True)
+    arxiv_ids = JSONField(default=list, blank=True)
+    last_fetched_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.query} (<= {self.newest_submitted})"
+
+
+class PaperEmbedding(models.Model):
+    """Cached embedding vector for one paper's text under one embedding model."""
+    arxiv_id = models.CharField(max_length=100, db_index=True)
+    content_hash = models.CharField(max_length=64)
+    model_name = models.CharField(max_length=200)
+    dimensions = models.IntegerField()
+    vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('arxiv_id', 'content_hash', 'model_name')
+
+    def __str__(self):
+        return f"{self.arxiv_id} ({self.model_name})"
+
+
 class PaperImportLog(models.Model):
     """Track CSV imports and updates."""
     filename = models.CharField(max_length=255)
     row_count = models.IntegerField()
+    failed_rows = models.IntegerField(default=0)
     imported_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=[
+        ('processing', 'Processing'),
         ('success', 'Success'),
         ('partial', 'Partial'),
         ('failed', 'Failed')
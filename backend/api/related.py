@@ -0,0 +1,152 @@
+"""
+Precomputed related papers: the RelatedPaper table behind
+/api/papers/<arxiv_id>/related/.
+
+Once a job's papers are saved, the pipeline calls store_related_papers()
+with the embeddings it already computed. Every paper's nearest neighbours by
+cosine similarity are stored twice: among the job's papers, and across the
+whole semantic index (api/semantic.py). A new paper can also displace a
+neighbour of an older one, so it is merged into the stored global lists of
+the older papers it lands near instead of recomputing them.
+`manage.py build_related_papers` backfills lists from stored embeddings.
+"""
+import os
+
+import numpy as np
+from django.db import transaction
+
+from .models import RelatedPaper
+from .semantic import open_index
+
+REVERSE_FANOUT = 4
+
+
+def related_k():
+    return max(1, int(os.environ.get('LITE_RELATED_K', '10')))
+
+
+def batch_size():
+    return max(1, int(os.environ.get('LITE_DB_BATCH_SIZE', '500')))
+
+
+def job_neighbours(vectors, k):
+    """(indices, scores) of the k rows most similar to each row of `vectors`, excluding itself."""
+    count = len(vectors)
+    k = min(k, count - 1)
+    if k <= 0:
+        return np.empty((count, 0), dtype=np.int64), np.empty((count, 0), dtype=np.float32)
+    indices = np.empty((count, k), dtype=np.int64)
+    scores = np.empty((count, k), dtype=np.float32)
+    rows = max(1, (1 << 24) // count)
+    for start in range(0, count, rows):
+        sims = vectors[start:start + rows] @ vectors.T
+        sims[np.arange(len(sims)), np.arange(start, start + len(sims))] = -np.inf
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        indices[start:start + len(sims)] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + len(sims)] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, scores
+
+
+def global_neighbours(index, paper_ids, vectors, k):
+    """{paper_id: [(related_id, score), ...]} from the semantic index, without the paper itself."""
+    neighbours = {}
+    for paper_id, matches in zip(paper_ids, index.search_many(vectors, k + 1)):
+        neighbours[paper_id] = [(other, score) for other, score in matches if other != paper_id][:k]
+    return neighbours
+
+
+def replace_related(search_job_id, neighbours):
+    """Replace the stored lists of the papers in `neighbours` for one scope (None is global)."""
+    paper_ids = list(neighbours)
+    scope = {'search_job_id': search_job_id} if search_job_id else {'search_job__isnull': True}
+    size = batch_size()
+    for start in range(0, len(paper_ids), size):
+        chunk = paper_ids[start:start + size]
+        with transaction.atomic():
+            RelatedPaper.objects.filter(paper_id__in=chunk, **scope).delete()
+            RelatedPaper.objects.bulk_create([
+                RelatedPaper(
+                    paper_id=paper_id, related_id=related_id, search_job_id=search_job_id,
+                    rank=rank, score=score,
+                )
+                for paper_id in chunk
+                for rank, (related_id, score) in enumerate(neighbours[paper_id])
+            ], batch_size=size)
+
+
+def merge_into_existing(neighbours, k):
+    """
+    Offer the new papers in `neighbours` to the stored global lists of the older papers in their lists.
+
+    Returns the lists that changed. Only papers that already have a global
+    list are considered; a paper without one would otherwise get a partial list.
+    """
+    reverse = {}
+    for paper_id, matches in neighbours.items():
+        for other, score in matches:
+            if other not in neighbours:
+                reverse.setdefault(other, []).append((paper_id, score))
+    stored = {}
+    older_ids = list(reverse)
+    size = batch_size()
+    for start in range(0, len(older_ids), size):
+        rows = RelatedPaper.objects.filter(
+            search_job__isnull=True, paper_id__in=older_ids[start:start + size]
+        ).order_by('paper_id', 'rank').values_list('paper_id', 'related_id', 'score')
+        for paper_id, related_id, score in rows:
+            stored.setdefault(paper_id, []).append((related_id, score))
+
+    changed = {}
+    for paper_id, current in stored.items():
+        candidates = dict(current)
+        for other, score in reverse[paper_id]:
+            candidates[other] = max(score, candidates.get(other, -np.inf))
+        merged = sorted(candidates.items(), key=lambda item: -item[1])[:k]
+        if [other for other, _ in merged] != [other for other, _ in current]:
+            changed[paper_id] = merged
+    return changed
+
+
+def store_job_related(search_job_id, paper_ids, vectors, k):
+    """Replace one job's within-job lists; returns the number of rows stored."""
+    indices, scores = job_neighbours(vectors, k)
+    within_job = {
+        paper_id: [(paper_ids[j], float(score)) for j, score in zip(indices[i], scores[i])]
+        for i, paper_id in enumerate(paper_ids)
+    }
+    RelatedPaper.objects.filter(search_job_id=search_job_id).delete()
+    replace_related(search_job_id, within_job)
+    return sum(len(matches) for matches in within_job.values())
+
+
+def store_related_papers(search_job_id, paper_ids, vectors, model_name, k=None, across_corpus=True):
+    """
+    Store related papers for one job's papers and return row counts.
+
+    `paper_ids` are Paper ids aligned with the rows of `vectors`, the
+    normalized embeddings stored under `model_name`. With across_corpus=False
+    only the within-job lists are stored, from `vectors` alone: the pipeline
+    passes it when LITE_EMBEDDING_CACHE=0, since no stored vectors then exist
+    to build the semantic index from.
+    """
+    k = k or related_k()
+    paper_ids = [int(paper_id) for paper_id in paper_ids]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    job_rows = store_job_related(search_job_id, paper_ids, vectors, k)
+    if not across_corpus:
+        return {'job_rows': job_rows, 'global_rows': 0, 'older_papers_updated': 0}
+
+    # kNN is not symmetric: an older paper can have a new one among its k
+    # nearest while not being among the new paper's k nearest, so new papers
+    # are offered to a wider ring of older ones.
+    reach = global_neighbours(open_index(model_name), paper_ids, vectors, k * REVERSE_FANOUT)
+    across_corpus = {paper_id: matches[:k] for paper_id, matches in reach.items()}
+    displaced = merge_into_existing(reach, k)
+    replace_related(None, {**across_corpus, **displaced})
+    return {
+        'job_rows': job_rows,
+        'global_rows': sum(len(matches) for matches in across_corpus.values()),
+        'older_papers_updated': len(displaced),
+    }
@@ -0,0 +1,174 @@
+"""
+Full-text search over Paper titles, abstracts and authors.
+
+SQLite uses the FTS5 table api_paper_fts and Postgres a weighted tsvector
+column with a GIN index; both are created by migration 0011 and maintained by
+the database itself (triggers on SQLite, a generated column on Postgres), so
+every writer of Paper rows (the pipeline, import commands, the admin) keeps
+the index in sync. Matches are ranked with bm25 / ts_rank_cd, titles weigh
+most, and highlights mark matched terms with <mark>.
+
+On other databases, or before the migration has run, search falls back to
+case-insensitive substring matching without ranking.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'api_paper_fts'
+JOB_PAPERS = 'SELECT paper_id FROM api_papertopic WHERE search_job_id = %s'
+HIGHLIGHT_START, HIGHLIGHT_END = '<mark>', '</mark>'
+
+_index_ready = False
+
+
+def search_config():
+    """Postgres text search configuration; must match the one the search_vector column was built with."""
+    return getattr(settings, 'LITE_SEARCH_CONFIG', 'english')
+
+
+def search_limit():
+    """Most matches ranked per query, after any job restriction (LITE_SEARCH_LIMIT, default 500)."""
+    return max(1, int(os.environ.get('LITE_SEARCH_LIMIT', '500')))
+
+
+def index_available():
+    """True when this database has the full-text index; only a positive answer is cached."""
+    global _index_ready
+    if _index_ready:
+        return True
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT 1 FROM information_schema.columns WHERE table_name = 'api_paper' AND column_name = 'search_vector'"
+            )
+        else:
+            return False
+        _index_ready = cursor.fetchone() is not None
+    return _index_ready
+
+
+def fts5_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation typed by users are
+    searched for literally instead of raising syntax errors.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = ['"%s"' % word for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def ranked_matches(text, limit=None, search_job_id=None):
+    """
+    Return [(paper_id, score), ...] best first for a search, or None without an index.
+
+    With `search_job_id` only that job's papers are matched, so the limit
+    keeps the job's best matches rather than the best across every job.
+    """
+    if not index_available():
+        return None
+    limit = limit or search_limit()
+    scope = [] if search_job_id is None else [search_job_id]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            query = fts5_query(text)
+            if query is None:
+                return []
+            in_job = f'AND rowid IN ({JOB_PAPERS})' if scope else ''
+            # bm25 is lower-is-better; columns are weighted title, abstract, authors.
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, 10.0, 1.0, 3.0) AS score FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s {in_job} "
+                "ORDER BY score DESC LIMIT %s",
+                [query, *scope, limit],
+            )
+        else:
+            in_job = f'AND id IN ({JOB_PAPERS})' if scope else ''
+            cursor.execute(
+                "SELECT id, ts_rank_cd(search_vector, query) AS score "
+                "FROM api_paper, websearch_to_tsquery(%s::regconfig, %s) query "
+                f"WHERE search_vector @@ query {in_job} "
+                "ORDER BY score DESC LIMIT %s",
+                [search_config(), text, *scope, limit],
+            )
+        return [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+
+def search_queryset(queryset, text, paper_field='id', search_job_id=None):
+    """
+    Restrict a queryset to papers matching `text`.
+
+    `paper_field` names the Paper id on the queryset's model ('id' for Paper,
+    'paper_id' for PaperTopic). Pass `search_job_id` when the queryset is one
+    job's papers, so ranking is restricted to them. With an index the queryset
+    is annotated with `search_rank` (higher is better) for ordering; returns
+    (queryset, ranked).
+    """
+    matches = ranked_matches(text, search_job_id=search_job_id)
+    if matches is None:
+        prefix = '' if paper_field == 'id' else paper_field[:-len('_id')] + '__'
+        return queryset.filter(
+            Q(**{f'{prefix}title__icontains': text}) |
+            Q(**{f'{prefix}abstract__icontains': text}) |
+            Q(**{f'{prefix}authors__icontains': text})
+        ), False
+    if not matches:
+        return queryset.none(), True
+    # One simple CASE over the capped match list; building it as SQL text keeps
+    # a 500-branch expression cheap to construct.
+    column = '%s.%s' % (
+        connection.ops.quote_name(queryset.model._meta.db_table),
+        connection.ops.quote_name(queryset.model._meta.get_field(paper_field).column),
+    )
+    rank = RawSQL(
+        f"CASE {column} {' '.join(['WHEN %s THEN %s'] * len(matches))} ELSE 0 END",
+        [value for match in matches for value in match],
+        output_field=FloatField(),
+    )
+    return queryset.filter(**{f'{paper_field}__in': [paper_id for paper_id, _ in matches]}).annotate(
+        search_rank=rank
+    ), True
+
+
+def highlights(text, paper_ids):
+    """Return {paper_id: {'title': ..., 'abstract': ...}} with matched terms wrapped in <mark>."""
+    paper_ids = list(paper_ids)
+    if not paper_ids or not index_available():
+        return {}
+    placeholders = ', '.join(['%s'] * len(paper_ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            query = fts5_query(text)
+            if query is None:
+                return {}
+            cursor.execute(
+                f"SELECT rowid, highlight({FTS_TABLE}, 0, %s, %s), "
+                f"snippet({FTS_TABLE}, 1, %s, %s, '…', 32) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({placeholders})",
+                [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, query, *paper_ids],
+            )
+        else:
+            options = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}'
+            cursor.execute(
+                "SELECT id, ts_headline(%s::regconfig, title, query, %s), "
+                "ts_headline(%s::regconfig, abstract, query, %s) "
+                "FROM api_paper, websearch_to_tsquery(%s::regconfig, %s) query "
+                f"WHERE id IN ({placeholders})",
+                [
+                    search_config(), options + ', HighlightAll=true',
+                    search_config(), options + ', MaxFragments=2, MaxWords=32, MinWords=12',
+                    search_config(), text, *paper_ids,
+                ],
+            )
+        return {row[0]: {'title': row[1], 'abstract': row[2]} for row in cursor.fetchall()}
@@ -0,0 +1,589 @@
+"""
+Semantic search over stored paper embeddings.
+
+Queries are encoded with the pipeline's model and backend (api/embeddings.py),
+loaded once per web worker and kept warm. Paper vectors come from
+PaperEmbedding and are written to float32 matrix files next to aligned arrays
+of Paper ids; every worker memory-maps those files, so one copy is shared
+through the page cache. Vectors are L2-normalized by the pipeline, so cosine
+similarity is a matrix-vector product followed by a partial sort for the top k.
+
+Small corpora are searched exactly. From LITE_ANN_MIN_PAPERS papers the index
+also keeps IVF lists of int8 codes (api/ann.py) and a query scans only the
+LITE_ANN_NPROBE lists closest to it.
+
+The files live under LITE_SEMANTIC_DIR (default backend/.cache/semantic). Only
+the pipeline, when it persists results, and the build_semantic_index command
+write them, one process at a time under a lock on the directory. Web workers
+never build: they load the segments named by the last completed metadata
+file, re-reading it at most every LITE_SEMANTIC_REFRESH_SECONDS (default 30).
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, Q
+
+from .ann import CHUNK_ROWS, IVFQuantizer, inverted_lists, ivf_search, list_labels, top_k
+from .embeddings import embedding_backend, embedding_cache_name, embedding_model_name, load_embedding_model
+from .models import Paper, PaperEmbedding, PaperTopic
+
+INDEX_VERSION = 2
+# Filters narrower than this many papers are scored exactly instead of
+# through the IVF lists, which could hold too few of them near the query.
+EXACT_FILTER_LIMIT = 20000
+
+_models = {}
+_model_lock = threading.Lock()
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class SemanticSearchUnavailable(Exception):
+    """The embedding model cannot be loaded in this process, or no index has been built yet."""
+
+
+def index_directory():
+    return os.environ.get('LITE_SEMANTIC_DIR', os.path.join(settings.BASE_DIR, '.cache', 'semantic'))
+
+
+@contextmanager
+def index_lock(directory):
+    """Hold an exclusive lock on the index directory, so only one process writes or prunes its files."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'a') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def refresh_seconds():
+    return float(os.environ.get('LITE_SEMANTIC_REFRESH_SECONDS', '30'))
+
+
+def max_segments():
+    return max(1, int(os.environ.get('LITE_SEMANTIC_MAX_SEGMENTS', '8')))
+
+
+def ann_min_papers():
+    return int(os.environ.get('LITE_ANN_MIN_PAPERS', '50000'))
+
+
+def ann_nprobe():
+    return int(os.environ.get('LITE_ANN_NPROBE', '32'))
+
+
+def ann_rerank():
+    return int(os.environ.get('LITE_ANN_RERANK', '4'))
+
+
+def query_model():
+    """Return (model, cache_name) for the configured embedding model, loading it on first use."""
+    try:
+        model_name, backend = embedding_model_name(), embedding_backend()
+    except ValueError as exc:
+        raise SemanticSearchUnavailable(str(exc)) from exc
+    key = (model_name, backend)
+    with _model_lock:
+        if key not in _models:
+            try:
+                _models[key] = load_embedding_model(model_name, backend)
+            except Exception as exc:
+                # Missing packages, weights that cannot be downloaded or read, a bad backend.
+                raise SemanticSearchUnavailable(f'Embedding model unavailable: {exc}') from exc
+        return _models[key], embedding_cache_name(model_name, backend)
+
+
+def encode_query(text):
+    """Encode one query as a normalized float32 vector; returns (vector, cache_name)."""
+    model, cache_name = query_model()
+    vector = model.encode([text], convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+    return np.asarray(vector, dtype=np.float32).reshape(-1), cache_name
+
+
+def warm_up():
+    """Load the query model ahead of the first request (LITE_SEMANTIC_WARM=1)."""
+    try:
+        model, _ = query_model()
+        model.encode(['warm up'], convert_to_numpy=True, show_progress_bar=False)
+    except Exception:
+        # The endpoint reports the failure on first use.
+        pass
+
+
+def write_atomic(path, write):
+    """Write a file through `write(fh)` and move it into place in one step."""
+    tmp_path = f'{path}.tmp{os.getpid()}-{threading.get_ident()}'
+    with open(tmp_path, 'wb') as fh:
+        write(fh)
+    os.replace(tmp_path, path)
+
+
+def write_segment(directory, stem, vectors, paper_ids, quantizer=None, labels=None):
+    """
+    Write one segment's files and return its spec.
+
+    With a quantizer, rows are grouped by IVF list (`labels`, assigned here
+    when not given) and stored a second time as int8 codes.
+    """
+    count = len(paper_ids)
+    spec = {
+        'count': count,
+        'dimensions': vectors.shape[1] if count else 0,
+        'vectors': f'{stem}.f32',
+        'ids': f'{stem}.ids.npy',
+    }
+    order = None
+    if quantizer is not None:
+        labels = quantizer.assign(vectors) if labels is None else labels
+        order, offsets = inverted_lists(labels, quantizer.nlist)
+        spec.update(codes=f'{stem}.i8', offsets=f'{stem}.offsets.npy')
+        write_atomic(os.path.join(directory, spec['offsets']), lambda fh: np.save(fh, offsets))
+
+    def write_rows(fh, encode=False):
+        for start in range(0, count, CHUNK_ROWS):
+            rows = slice(start, start + CHUNK_ROWS) if order is None else order[start:start + CHUNK_ROWS]
+            block = np.asarray(vectors[rows], dtype=np.float32)
+            fh.write((quantizer.encode(block) if encode else block).tobytes())
+
+    write_atomic(os.path.join(directory, spec['vectors']), write_rows)
+    if quantizer is not None:
+        write_atomic(os.path.join(directory, spec['codes']), lambda fh: write_rows(fh, encode=True))
+    paper_ids = np.asarray(paper_ids, dtype=np.int64)
+    write_atomic(
+        os.path.join(directory, spec['ids']),
+        lambda fh: np.save(fh, paper_ids if order is None else paper_ids[order]),
+    )
+    return spec
+
+
+class Segment:
+    """One immutable set of index files: vectors and Paper ids, plus int8 codes grouped by IVF list."""
+
+    def __init__(self, directory, spec):
+        count, dims = spec['count'], spec['dimensions']
+        self.spec = spec
+        self.paper_ids = np.load(os.path.join(directory, spec['ids']))
+        self.vectors = np.empty((0, dims), dtype=np.float32)
+        self.codes = self.offsets = None
+        if count:
+            self.vectors = np.memmap(
+                os.path.join(directory, spec['vectors']), dtype=np.float32, mode='r', shape=(count, dims)
+            )
+            if spec.get('codes'):
+                self.codes = np.memmap(
+                    os.path.join(directory, spec['codes']), dtype=np.int8, mode='r', shape=(count, dims)
+                )
+                self.offsets = np.load(os.path.join(directory, spec['offsets']))
+        # False for rows superseded by a newer segment.
+        self.live = None
+
+
+def open_segments(directory, meta):
+    segments = [Segment(directory, spec) for spec in meta['segments']]
+    newer = np.empty(0, dtype=np.int64)
+    for segment in reversed(segments):
+        if len(newer):
+            segment.live = ~np.isin(segment.paper_ids, newer)
+        newer = np.concatenate([newer, segment.paper_ids])
+    return segments
+
+
+class EmbeddingIndex:
+    """
+    Stored vectors of every paper under one model name, as memory-mapped segments.
+
+    The first build writes one segment with the newest vector of each paper;
+    later updates append a segment with only the vectors stored since, which
+    shadows older rows of the same papers. Past LITE_SEMANTIC_MAX_SEGMENTS
+    segments are merged into one. Once the corpus reaches LITE_ANN_MIN_PAPERS
+    an IVF quantizer (api/ann.py) is trained and every segment also carries
+    int8 codes grouped by list; it is retrained when the corpus has doubled.
+    """
+
+    def __init__(self, model_name, directory):
+        self.model_name = model_name
+        self.directory = directory
+        self.slug = model_name.replace('/', '--').replace('@', '--')
+        self.segments = []
+        self.quantizer = None
+        self.count = 0
+        self.loaded = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, f'{self.slug}.json')
+
+    def current_signature(self):
+        """Newest PaperEmbedding and Paper ids; either changes when the index is stale."""
+        latest_embedding = PaperEmbedding.objects.filter(model_name=self.model_name).aggregate(
+            latest=Max('id'))['latest']
+        latest_paper = Paper.objects.aggregate(latest=Max('id'))['latest']
+        return [latest_embedding or 0, latest_paper or 0]
+
+    def read_meta(self):
+        try:
+            with open(self.meta_path) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('version') == INDEX_VERSION else None
+
+    def load_quantizer(self, meta):
+        if not meta.get('quantizer'):
+            return None
+        return IVFQuantizer.load(os.path.join(self.directory, meta['quantizer']))
+
+    def refresh(self, attempts=3):
+        """Load the segments of the last completed index build; never builds or prunes files itself."""
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < refresh_seconds():
+            return
+        with self.lock:
+            if self.checked_at is not None and time.monotonic() - self.checked_at < refresh_seconds():
+                return
+            for attempt in range(attempts):
+                meta = self.read_meta()
+                if meta is None:
+                    raise SemanticSearchUnavailable(
+                        f'No semantic index for {self.model_name} yet; '
+                        'run a search or python manage.py build_semantic_index'
+                    )
+                try:
+                    self.load(meta)
+                    break
+                except OSError:
+                    # A writer pruned these files after we read the metadata; read its new metadata.
+                    if attempt == attempts - 1:
+                        raise SemanticSearchUnavailable('The semantic index is being rebuilt; try again shortly')
+            self.checked_at = time.monotonic()
+
+    def load(self, meta):
+        loaded = [spec['ids'] for spec in meta['segments']]
+        if loaded == self.loaded:
+            return
+        segments = open_segments(self.directory, meta)
+        self.quantizer = self.load_quantizer(meta)
+        self.segments = segments
+        self.count = sum(
+            len(segment.paper_ids) if segment.live is None else int(segment.live.sum()) for segment in segments
+        )
+        self.loaded = loaded
+
+    def update(self, rebuild=False):
+        """Bring the index files up to date with the database and return their metadata."""
+        with index_lock(self.directory):
+            return self.write_update(rebuild)
+
+    def write_update(self, rebuild=False):
+        """update() for a caller already holding index_lock()."""
+        signature = self.current_signature()
+        meta = self.read_meta()
+        if meta is not None and meta['signature'] == signature and not rebuild:
+            return meta
+
+        if meta is None or rebuild:
+            meta = self.build_full(signature)
+        else:
+            quantizer = self.load_quantizer(meta)
+            meta = self.build_increment(meta, signature, quantizer)
+            count = sum(spec['count'] for spec in meta['segments'])
+            if (quantizer is None and count >= ann_min_papers()) or (
+                quantizer is not None and count >= 2 * quantizer.trained_count
+            ):
+                meta = self.build_full(signature)
+            elif len(meta['segments']) > max_segments():
+                meta = self.compact(meta, quantizer)
+
+        write_atomic(self.meta_path, lambda fh: fh.write(json.dumps(meta).encode('utf-8')))
+        self.remove_stale_files(meta)
+        return meta
+
+    def newest_vectors(self, embeddings, paper_ids):
+        """Yield (paper id, dimensions, vector bytes) for the newest embedding of each paper in `paper_ids`."""
+        rows = embeddings.order_by('arxiv_id', '-id').values_list('arxiv_id', 'dimensions', 'vector')
+        previous = None
+        for arxiv_id, dimensions, vector in rows.iterator(chunk_size=2000):
+            if arxiv_id == previous:
+                continue
+            previous = arxiv_id
+            paper_id = paper_ids.get(arxiv_id)
+            if paper_id is not None:
+                yield paper_id, dimensions, bytes(vector)
+
+    def build_full(self, signature):
+        """One segment with every paper's newest vector; trains the quantizer for a large corpus."""
+        stem = f'{self.slug}-full-{signature[0]}-{signature[1]}'
+        raw_path = os.path.join(self.directory, f'{stem}.raw.tmp{os.getpid()}-{threading.get_ident()}')
+        paper_ids = dict(Paper.objects.values_list('arxiv_id', 'id'))
+        embeddings = PaperEmbedding.objects.filter(model_name=self.model_name)
+        ids, dims = [], 0
+        with open(raw_path, 'wb') as fh:
+            for paper_id, dimensions, vector in self.newest_vectors(embeddings, paper_ids):
+                dims = dims or dimensions
+                if dimensions == dims:
+                    fh.write(vector)
+                    ids.append(paper_id)
+        try:
+            vectors = (
+                np.memmap(raw_path, dtype=np.float32, mode='r', shape=(len(ids), dims))
+                if ids else np.empty((0, dims), dtype=np.float32)
+            )
+            quantizer = quantizer_name = None
+            if len(ids) >= ann_min_papers():
+                nlist = int(os.environ.get('LITE_ANN_NLIST', '0')) or None
+                quantizer = IVFQuantizer.train(vectors, nlist=nlist)
+                quantizer_name = f'{stem}.ivf.npz'
+                write_atomic(os.path.join(self.directory, quantizer_name), quantizer.save)
+            spec = write_segment(self.directory, stem, vectors, ids, quantizer)
+            del vectors
+        finally:
+            os.remove(raw_path)
+        return {
+            'version': INDEX_VERSION,
+            'model_name': self.model_name,
+            'signature': signature,
+            'dimensions': dims,
+            'quantizer': quantizer_name,
+            'segments': [spec],
+        }
+
+    def build_increment(self, meta, signature, quantizer):
+        """Add a segment with the vectors stored, or papers saved, since `meta` was written."""
+        last_embedding, last_paper = meta['signature']
+        embeddings = PaperEmbedding.objects.filter(model_name=self.model_name).filter(
+            Q(id__gt=last_embedding) | Q(arxiv_id__in=Paper.objects.filter(id__gt=last_paper).values('arxiv_id'))
+        )
+        arxiv_ids = list(embeddings.values_list('arxiv_id', flat=True).distinct())
+        paper_ids = {}
+        for start in range(0, len(arxiv_ids), 500):
+            paper_ids.update(Paper.objects.filter(arxiv_id__in=arxiv_ids[start:start + 500]).values_list('arxiv_id', 'id'))
+
+        dims = meta['dimensions']
+        ids, vectors = [], []
+        for paper_id, dimensions, vector in self.newest_vectors(embeddings, paper_ids):
+            dims = dims or dimensions
+            if dimensions == dims:
+                ids.append(paper_id)
+                vectors.append(vector)
+        meta = {**meta, 'signature': signature, 'dimensions': dims}
+        if ids:
+            stem = f'{self.slug}-add-{last_embedding}-{last_paper}-{signature[0]}-{signature[1]}'
+            matrix = np.frombuffer(b''.join(vectors), dtype=np.float32).reshape(len(ids), dims)
+            meta['segments'] = meta['segments'] + [write_segment(self.directory, stem, matrix, ids, quantizer)]
+        return meta
+
+    def compact(self, meta, quantizer):
+        """Merge all segments into one without superseded rows, keeping the trained lists."""
+        signature = meta['signature']
+        stem = f'{self.slug}-merged-{signature[0]}-{signature[1]}'
+        raw_path = os.path.join(self.directory, f'{stem}.raw.tmp{os.getpid()}-{threading.get_ident()}')
+        ids, labels = [], []
+        with open(raw_path, 'wb') as fh:
+            for segment in open_segments(self.directory, meta):
+                rows = np.arange(len(segment.paper_ids)) if segment.live is None else np.flatnonzero(segment.live)
+                for start in range(0, len(rows), CHUNK_ROWS):
+                    fh.write(np.asarray(segment.vectors[rows[start:start + CHUNK_ROWS]]).tobytes())
+                ids.append(segment.paper_ids[rows])
+                if quantizer is not None:
+                    labels.append(list_labels(segment.offsets)[rows] if segment.offsets is not None
+                                  else quantizer.assign(segment.vectors[rows]))
+        try:
+            ids = np.concatenate(ids)
+            dims = meta['dimensions']
+            vectors = (
+                np.memmap(raw_path, dtype=np.float32, mode='r', shape=(len(ids), dims))
+                if len(ids) else np.empty((0, dims), dtype=np.float32)
+            )
+            labels = np.concatenate(labels) if quantizer is not None else None
+            spec = write_segment(self.directory, stem, vectors, ids, quantizer, labels)
+            del vectors
+        finally:
+            os.remove(raw_path)
+        return {**meta, 'segments': [spec]}
+
+    def remove_stale_files(self, meta):
+        """Delete this model's segment files that `meta` no longer names; other models' files are left alone."""
+        # Workers still mapping old segments keep reading them after the unlink.
+        keep = {meta.get('quantizer')}
+        for spec in meta['segments']:
+            keep.update(spec.get(key) for key in ('vectors', 'ids', 'codes', 'offsets'))
+        # Only the stems build_full, build_increment and compact write: another
+        # model's slug can start with this one (all-MiniLM-L6-v2--int8).
+        own_file = re.compile(rf'{re.escape(self.slug)}-(?:full|add|merged)(?:-\d+)+\.')
+        for name in os.listdir(self.directory):
+            if own_file.match(name) and name not in keep and '.tmp' not in name:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def search(self, query_vector, k, allowed_ids=None, nprobe=None):
+        """
+        Return ([(paper_id, score), ...], mode) for the k most similar papers, best first.
+
+        Uses the IVF lists when the index has them, scanning `nprobe` lists
+        (LITE_ANN_NPROBE by default); nprobe=0, or a filter narrower than
+        EXACT_FILTER_LIMIT papers, scores every candidate exactly.
+        """
+        dims = next((segment.vectors.shape[1] for segment in self.segments if len(segment.paper_ids)), None)
+        if dims is None:
+            return [], 'exact'
+        if query_vector.shape[0] != dims:
+            raise SemanticSearchUnavailable(
+                f'Stored {self.model_name} vectors have {dims} dimensions, '
+                f'the query model returns {query_vector.shape[0]}'
+            )
+        nprobe = ann_nprobe() if nprobe is None else nprobe
+        exact = self.quantizer is None or nprobe <= 0 or (
+            allowed_ids is not None and len(allowed_ids) <= EXACT_FILTER_LIMIT
+        )
+
+        hits, scores = [], []
+        for segment in self.segments:
+            if not len(segment.paper_ids):
+                continue
+            allowed = None if allowed_ids is None else np.isin(segment.paper_ids, allowed_ids)
+            if exact and allowed is not None:
+                rows = np.flatnonzero(allowed if segment.live is None else allowed & segment.live)
+                found = np.asarray(segment.vectors[rows]) @ query_vector
+                top = top_k(found, k)
+                rows, found = rows[top], found[top]
+            elif exact:
+                found = segment.vectors @ query_vector
+                if segment.live is not None:
+                    found = np.where(segment.live, found, -np.inf)
+                rows = top_k(found, k)
+                found = found[rows]
+            else:
+                mask = segment.live
+                if allowed is not None:
+                    mask = allowed if mask is None else mask & allowed
+                rows, found = ivf_search(
+                    self.quantizer, segment.codes, segment.offsets, query_vector, k, nprobe,
+                    vectors=segment.vectors, rerank=ann_rerank(), mask=mask,
+                )
+            hits.append(segment.paper_ids[rows])
+            scores.append(found)
+        if not hits:
+            return [], 'exact' if exact else 'ivf'
+        hits, scores = np.concatenate(hits), np.concatenate(scores)
+        top = top_k(scores, k)
+        return [(int(hits[i]), float(scores[i])) for i in top], 'exact' if exact else 'ivf'
+
+    def vectors_for(self, paper_ids):
+        """(paper_ids, vectors) of the given papers that have a current vector in the index."""
+        wanted = np.asarray(list(paper_ids), dtype=np.int64)
+        found_ids, found = [], []
+        for segment in self.segments:
+            mask = np.isin(segment.paper_ids, wanted)
+            if segment.live is not None:
+                mask &= segment.live
+            rows = np.flatnonzero(mask)
+            found_ids.append(segment.paper_ids[rows])
+            found.append(np.asarray(segment.vectors[rows], dtype=np.float32))
+        if not found_ids:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(found_ids), np.vstack(found)
+
+    def search_many(self, query_vectors, k):
+        """
+        Top k for every row of `query_vectors`: a list of [(paper_id, score), ...].
+
+        Exact indexes score blocks of queries with one matrix product per
+        segment; IVF indexes search each query's lists.
+        """
+        if self.quantizer is not None:
+            return [self.search(query, k)[0] for query in query_vectors]
+        results = []
+        segments = [segment for segment in self.segments if len(segment.paper_ids)]
+        rows = max(1, (1 << 24) // max(1, self.count))
+        for start in range(0, len(query_vectors), rows):
+            block = np.asarray(query_vectors[start:start + rows], dtype=np.float32)
+            hits, scores = [], []
+            for segment in segments:
+                found = block @ segment.vectors.T
+                if segment.live is not None:
+                    found[:, ~segment.live] = -np.inf
+                top = np.argpartition(-found, min(k, found.shape[1]) - 1, axis=1)[:, :k]
+                hits.append(segment.paper_ids[top])
+                scores.append(np.take_along_axis(found, top, axis=1))
+            if not hits:
+                results.extend([] for _ in block)
+                continue
+            hits, scores = np.hstack(hits), np.hstack(scores)
+            for row in range(len(block)):
+                results.append([(int(hits[row, i]), float(scores[row, i])) for i in top_k(scores[row], k)])
+        return results
+
+
+def get_index(model_name):
+    with _indexes_lock:
+        index = _indexes.get(model_name)
+        if index is None:
+            index = _indexes[model_name] = EmbeddingIndex(model_name, index_directory())
+    index.refresh()
+    return index
+
+
+def filtered_paper_ids(job=None, topic=None, year=None, category=None):
+    """Paper ids allowed by the filters as an int64 array, or None when nothing is filtered."""
+    if job is None and topic is None and year is None and not category:
+        return None
+    if job is not None or topic is not None:
+        # A paper is assigned once per job, so assignment rows need no DISTINCT.
+        rows, prefix, field = PaperTopic.objects.all(), 'paper__', 'paper_id'
+        if job is not None:
+            rows = rows.filter(search_job_id=job)
+        if topic is not None:
+            rows = rows.filter(topic_id=topic)
+    else:
+        rows, prefix, field = Paper.objects.all(), '', 'id'
+    if year is not None:
+        rows = rows.filter(**{f'{prefix}year': year})
+    if category:
+        rows = rows.filter(**{f'{prefix}categories__icontains': category})
+    return np.fromiter(rows.values_list(field, flat=True).iterator(), dtype=np.int64)
+
+
+def semantic_search(text, k=20, job=None, topic=None, year=None, category=None, nprobe=None):
+    """
+    Return ([(paper_id, score), ...], info) for the papers closest to `text`.
+
+    `info` names the model, how many papers are indexed, and whether the
+    search was exact or went through the IVF lists. Raises
+    SemanticSearchUnavailable when the model cannot be loaded or no index
+    has been built.
+    """
+    vector, cache_name = encode_query(text)
+    index = get_index(cache_name)
+    matches, mode = index.search(vector, k, filtered_paper_ids(job, topic, year, category), nprobe)
+    return matches, {
+        'model': cache_name,
+        'indexed_papers': index.count,
+        'mode': mode,
+        'nprobe': (ann_nprobe() if nprobe is None else nprobe) if mode == 'ivf' else None,
+    }
+
+
+def update_index(model_name, rebuild=False):
+    """Bring the index files for `model_name` up to date; used by the pipeline and build_semantic_index."""
+    return EmbeddingIndex(model_name, index_directory()).update(rebuild=rebuild)
+
+
+def open_index(model_name):
+    """A freshly updated and loaded index, for the pipeline and commands outside the per-worker cache."""
+    index = EmbeddingIndex(model_name, index_directory())
+    with index_lock(index.directory):
+        index.load(index.write_update())
+    return index
@@ -1,3 +1,1290 @@
-from django.test import TestCase
+import csv
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipIf
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import arxiv
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone as django_timezone
+
+from . import semantic, views
+from .aggregates import JobAggregates, split_categories, store_job_aggregates
+from .fingerprint import clean_parameters, fingerprint_settings, search_config, search_fingerprint
+from .importing import iter_csv_chunks
+from .jobs import (
+    claim_next_job, create_search_job, fail_interrupted_jobs, find_reusable_job, job_heartbeat_timeout,
+)
+from .models import (
+    Paper, PaperEmbedding, PaperImportLog, PaperTopic, QueryWatermark, SearchJob, SearchJobAggregate, Topic,
+)
+
+SCRIPT_DIR = os.path.join(settings.BASE_DIR, 'scripts')
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+from arxiv_fetcher import TokenBucket, fetch_papers  # noqa: E402
+
+try:
+    import arxiv_kmeans_sbert_umap as pipeline  # noqa: E402
+except ImportError:
+    # sentence-transformers and the rest of requirements.txt are not installed.
+    pipeline = None
+
+requires_pipeline = skipIf(pipeline is None, 'pipeline dependencies are not installed')
+
+
+def make_paper(arxiv_id, published=None, title='A paper', abstract='', categories='cs.AI'):
+    return Paper.objects.create(
+        arxiv_id=arxiv_id, title=title, abstract=abstract, categories=categories,
+        published_date=published,
+        year=published.year if published else None,
+        month=published.strftime('%B') if published else None,
+    )
+
+
+def completed_job(query='agents', papers=(), clusters=2):
+    """A completed SearchJob whose papers are spread round-robin over `clusters` topics."""
+    job = SearchJob.objects.create(query=query, status='completed')
+    topics = [
+        Topic.objects.create(search_job=job, cluster_id=cluster_id, label=f'Topic {cluster_id}')
+        for cluster_id in range(clusters)
+    ]
+    for i, paper in enumerate(papers):
+        PaperTopic.objects.create(
+            paper=paper, topic=topics[i % clusters], search_job=job,
+            confidence=0.5, published_date=paper.published_date,
+        )
+    for topic in topics:
+        topic.paper_count = topic.paper_assignments.count()
+        topic.save(update_fields=['paper_count'])
+    return job
+
+
+def submitted(day):
+    return datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+
+
+def arxiv_result(arxiv_id, day=date(2024, 1, 1), title='A paper about agents', summary='Agents plan.'):
+    """An arxiv.Result as the fetcher returns it."""
+    return arxiv.Result(
+        entry_id=f'http://arxiv.org/abs/{arxiv_id}v1',
+        updated=submitted(day),
+        published=submitted(day),
+        title=title,
+        authors=[arxiv.Result.Author('A. Author'), arxiv.Result.Author('B. Author')],
+        summary=summary,
+        primary_category='cs.AI',
+        categories=['cs.AI', 'cs.LG'],
+    )
+
+
+class AtomFeed(BaseHTTPRequestHandler):
+    """Serves arXiv API pages of TOTAL_RESULTS entries per query, shared by every query."""
+
+    TOTAL_RESULTS = 40
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        start, count = int(params['start'][0]), int(params['max_results'][0])
+        type(self).requests.append((params['search_query'][0], start))
+        entries = ''.join(
+            f'<entry><id>http://arxiv.org/abs/2401.{i:05d}v1</id><updated>2024-01-01T00:00:00Z</updated>'
+            f'<published>2024-01-{i % 28 + 1:02d}T00:00:00Z</published><title>Paper {i}</title>'
+            f'<summary>Summary {i}</summary><author><name>A. Author</name></author>'
+            f'<link href="http://arxiv.org/abs/2401.{i:05d}v1" rel="alternate" type="text/html"/>'
+            '<category term="cs.AI"/></entry>'
+            for i in range(start, min(self.TOTAL_RESULTS, start + count))
+        )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+            '<title>query</title><id>feed</id><updated>2024-01-01T00:00:00Z</updated>'
+            f'<opensearch:totalResults>{self.TOTAL_RESULTS}</opensearch:totalResults>'
+            f'<opensearch:startIndex>{start}</opensearch:startIndex>'
+            f'<opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>{entries}</feed>'
+        ).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/atom+xml')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TokenBucketTests(TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=20, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.04)
+        for _ in range(4):
+            bucket.acquire()
+        # Four more tokens at 20 per second.
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+
+    def test_threads_share_the_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - started, 9 / 50 - 0.01)
+
+
+class FetchPapersTests(TestCase):
+    def setUp(self):
+        AtomFeed.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), AtomFeed)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        environ = mock.patch.dict(os.environ, {
+            'LITE_ARXIV_API_URL': f'http://127.0.0.1:{self.server.server_port}/api/query',
+            'LITE_ARXIV_REQUESTS_PER_SECOND': '100',
+            'LITE_FETCH_WORKERS': '2',
+        })
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def fetch(self, queries, max_papers):
+        even = lambda result: int(result.entry_id.rsplit('.', 1)[1][:5]) % 2 == 0  # noqa: E731
+        return fetch_papers(queries, max_papers, even, lambda result: result.entry_id)
+
+    def test_deduplicates_and_filters_across_queries(self):
+        papers, metrics = self.fetch(['all:agents', 'all:planning'], max_papers=100)
+
+        self.assertEqual(len(papers), 20)
+        self.assertEqual(len({paper.entry_id for paper in papers}), 20)
+        self.assertEqual(metrics['total_seen'], 80)
+        self.assertEqual(metrics['skipped_duplicates'], 40)
+        self.assertEqual(metrics['skipped_irrelevant'], 20)
+        self.assertEqual(metrics['total_available'], 80)
+        for query in ('all:agents', 'all:planning'):
+            self.assertEqual(len(metrics['queries'][query]['matched_ids']), 20)
+
+    def test_stops_every_query_once_enough_papers_are_accepted(self):
+        queries = [f'all:topic{i}' for i in range(6)]
+        papers, metrics = self.fetch(queries, max_papers=5)
+
+        self.assertEqual(len(papers), 5)
+        # The queries still waiting when the limit was reached never hit the feed.
+        self.assertLess(len({query for query, _ in AtomFeed.requests}), len(queries))
+        self.assertLess(metrics['total_seen'], 2 * AtomFeed.TOTAL_RESULTS)
+
+    def test_reports_whether_each_query_saw_every_result(self):
+        _, stopped = self.fetch(['all:agents'], max_papers=5)
+        self.assertFalse(stopped['queries']['all:agents']['complete'])
+
+        # max_results is twice max_papers, below the feed's 40 results.
+        _, capped = fetch_papers(['all:agents'], 10, lambda result: False, lambda result: result.entry_id)
+        self.assertFalse(capped['queries']['all:agents']['complete'])
+
+        _, full = self.fetch(['all:agents'], max_papers=100)
+        stats = full['queries']['all:agents']
+        self.assertTrue(stats['complete'])
+        self.assertEqual((stats['oldest_submitted'].day, stats['newest_submitted'].day), (1, 28))
+
+
+@requires_pipeline
+class QueryWatermarkTests(TestCase):
+    start, end = '2024-01-01', '2024-06-30'
+
+    def watermark(self, base, covered_from, newest, arxiv_ids=()):
+        return QueryWatermark.objects.create(
+            query_hash=pipeline.query_hash(base), query=base,
+            covered_from=covered_from, newest_submitted=submitted(newest), arxiv_ids=list(arxiv_ids),
+        )
+
+    def run_stats(self, newest, oldest, complete, matched_ids=()):
+        return {
+            'newest_submitted': submitted(newest), 'oldest_submitted': submitted(oldest),
+            'complete': complete, 'matched_ids': list(matched_ids),
+        }
+
+    def test_uncovered_ranges(self):
+        covered = QueryWatermark(covered_from=date(2024, 3, 1), newest_submitted=submitted(date(2024, 5, 10)))
+        self.assertEqual(pipeline.uncovered_ranges(self.start, self.end, None), [(self.start, self.end)])
+        self.assertEqual(
+            pipeline.uncovered_ranges(self.start, self.end, covered),
+            [('2024-01-01', '2024-02-29'), ('2024-05-10', '2024-06-30')],
+        )
+        # Windows before or after the covered range are clamped, never inverted.
+        self.assertEqual(pipeline.uncovered_ranges('2024-01-01', '2024-02-10', covered), [('2024-01-01', '2024-02-10')])
+        self.assertEqual(pipeline.uncovered_ranges('2024-06-01', '2024-06-30', covered), [('2024-06-01', '2024-06-30')])
+        self.assertEqual(pipeline.uncovered_ranges('2024-03-05', '2024-04-01', covered), [('2024-04-01', '2024-04-01')])
+
+    def test_plan_queries_fetches_only_uncovered_dates(self):
+        seen, fresh = pipeline.generate_queries(['agents'], ['planning'])[:2]
+        self.watermark(seen, date(2024, 3, 1), date(2024, 5, 10))
+
+        planned, watermarks = pipeline.plan_queries(['agents'], ['planning'], self.start, self.end)
+
+        self.assertEqual(set(watermarks), {seen})
+        self.assertEqual(
+            sorted(query for query, base in planned.items() if base == seen),
+            [f'{seen} AND submittedDate:[202401010000 TO 202402292359]',
+             f'{seen} AND submittedDate:[202405100000 TO 202406302359]'],
+        )
+        self.assertIn(f'{fresh} AND submittedDate:[202401010000 TO 202406302359]', planned)
+
+        with mock.patch.dict(os.environ, {'LITE_INCREMENTAL_FETCH': '0'}):
+            planned, watermarks = pipeline.plan_queries(['agents'], ['planning'], self.start, self.end)
+        self.assertEqual(watermarks, {})
+        self.assertEqual(len(planned), len(pipeline.generate_queries(['agents'], ['planning'])))
+
+    def test_merge_stored_papers_tops_up_from_the_window(self):
+        make_paper('2403.00001', date(2024, 3, 1), title='Agents that plan')
+        make_paper('2403.00002', date(2024, 4, 1), title='Agents again')
+        make_paper('2312.00003', date(2023, 12, 1), title='Agents before the window')
+        make_paper('2404.00004', date(2024, 4, 2), title='Unrelated work')
+        make_paper('2405.00005', date(2024, 5, 1), title='Agents, already fetched')
+        watermarks = {'q': QueryWatermark(arxiv_ids=['2403.00001', '2403.00002', '2312.00003', '2404.00004', '2405.00005'])}
+        papers = [pipeline.result_from_record(Paper.objects.get(arxiv_id='2405.00005'))]
+
+        kept = pipeline.merge_stored_papers(papers, watermarks, self.start, self.end, 2, ['agents'], [])
+
+        self.assertEqual([pipeline.paper_arxiv_id(paper) for paper in papers], ['2405.00005', '2403.00002'])
+        self.assertEqual(kept, {'2403.00001', '2403.00002', '2404.00004', '2405.00005'})
+
+    def test_complete_harvest_covers_the_window(self):
+        base = pipeline.generate_queries(['agents'], [])[0]
+        planned, watermarks = pipeline.plan_queries(['agents'], [], self.start, self.end)
+        query = next(iter(planned))
+
+        pipeline.update_query_watermarks(
+            planned, watermarks, {query: self.run_stats(date(2024, 6, 20), date(2024, 1, 3), True, ['a'])},
+            set(), self.start, self.end,
+        )
+
+        watermark = QueryWatermark.objects.get(query_hash=pipeline.query_hash(base))
+        self.assertEqual(watermark.covered_from, date(2024, 1, 1))
+        self.assertEqual(watermark.newest_submitted, submitted(date(2024, 6, 20)))
+        self.assertEqual(watermark.arxiv_ids, ['a'])
+
+    def test_truncated_harvest_covers_only_what_it_saw(self):
+        base = pipeline.generate_queries(['agents'], [])[0]
+        planned, watermarks = pipeline.plan_queries(['agents'], [], self.start, self.end)
+        query = next(iter(planned))
+
+        # Stopped at max_papers after reaching back to May 15.
+        pipeline.update_query_watermarks(
+            planned, watermarks, {query: self.run_stats(date(2024, 6, 20), date(2024, 5, 15), False)},
+            set(), self.start, self.end,
+        )
+        watermark = QueryWatermark.objects.get(query_hash=pipeline.query_hash(base))
+        self.assertEqual(watermark.covered_from, date(2024, 5, 16))
+
+        # A later, larger harvest goes back for everything before that.
+        planned, _ = pipeline.plan_queries(['agents'], [], self.start, self.end)
+        self.assertIn(f'{base} AND submittedDate:[202401010000 TO 202405152359]', planned)
+
+    def test_gap_after_a_truncated_delta_is_not_skipped(self):
+        base = pipeline.generate_queries(['agents'], [])[0]
+        self.watermark(base, date(2024, 1, 1), date(2024, 3, 10))
+        planned, watermarks = pipeline.plan_queries(['agents'], [], self.start, self.end)
+        (suffix,) = planned
+
+        # The delta since March 10 stopped at June 1, so March 10 to June 1 was never fetched.
+        pipeline.update_query_watermarks(
+            planned, watermarks, {suffix: self.run_stats(date(2024, 6, 25), date(2024, 6, 1), False)},
+            set(), self.start, self.end,
+        )
+        watermark = QueryWatermark.objects.get(query_hash=pipeline.query_hash(base))
+        self.assertEqual(watermark.covered_from, date(2024, 6, 2))
+        self.assertEqual(
+            pipeline.uncovered_ranges(self.start, self.end, watermark),
+            [('2024-01-01', '2024-06-01'), ('2024-06-25', '2024-06-30')],
+        )
+
+    def test_prefix_and_delta_join_the_covered_range(self):
+        base = pipeline.generate_queries(['agents'], [])[0]
+        self.watermark(base, date(2024, 3, 1), date(2024, 5, 10), ['old', 'gone'])
+        planned, watermarks = pipeline.plan_queries(['agents'], [], self.start, self.end)
+        prefix, suffix = planned
+
+        pipeline.update_query_watermarks(planned, watermarks, {
+            prefix: self.run_stats(date(2024, 2, 20), date(2024, 1, 2), True, ['p']),
+            suffix: self.run_stats(date(2024, 6, 28), date(2024, 5, 11), True, ['s']),
+        }, {'old'}, self.start, self.end)
+
+        watermark = QueryWatermark.objects.get(query_hash=pipeline.query_hash(base))
+        self.assertEqual(watermark.covered_from, date(2024, 1, 1))
+        self.assertEqual(watermark.newest_submitted, submitted(date(2024, 6, 28)))
+        self.assertEqual(watermark.arxiv_ids, ['p', 's', 'old'])
+
+
+@requires_pipeline
+class PersistResultsTests(TestCase):
+    cfg = {'must_include': ['agents'], 'optional_keywords': ['planning']}
+
+    def persist(self, papers, labels, search_job_id=None, probabilities=None):
+        labels = np.asarray(labels)
+        clusters = sorted(set(labels.tolist()))
+        return pipeline.persist_results_to_database(
+            papers, labels,
+            {cluster: f'Topic {cluster}' for cluster in clusters if cluster != -1},
+            {cluster: ['agents', f'kw{cluster}'] for cluster in clusters},
+            probabilities, self.cfg, {'total_seen': 30, 'fingerprint': 'f' * 64}, 1.5,
+            search_job_id=search_job_id,
+        )
+
+    def test_saves_papers_topics_and_assignments_in_chunks(self):
+        job = SearchJob.objects.create(query='agents', status='processing')
+        papers = [arxiv_result(f'2401.{i:05d}', date(2024, 1, 1 + i)) for i in range(7)]
+        labels = [0, 0, 1, 1, 1, -1, 0]
+
+        with mock.patch.dict(os.environ, {'LITE_DB_BATCH_SIZE': '3'}):
+            self.assertEqual(self.persist(papers, labels, job.id, probabilities=np.linspace(0.1, 0.7, 7)), job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.papers_matched, job.papers_scanned, job.topics_found, job.outliers_found),
+            ('completed', 7, 30, 2, 1),
+        )
+        self.assertEqual(
+            dict(Topic.objects.filter(search_job=job).values_list('cluster_id', 'paper_count')), {-1: 1, 0: 3, 1: 3}
+        )
+        self.assertTrue(Topic.objects.get(search_job=job, cluster_id=-1).is_outlier)
+        paper = Paper.objects.get(arxiv_id='2401.00002')
+        self.assertEqual((paper.authors, paper.year, paper.month, paper.cluster), ('A. Author; B. Author', 2024, 'January', 1))
+        assignment = PaperTopic.objects.get(search_job=job, paper=paper)
+        self.assertEqual((assignment.topic.cluster_id, assignment.published_date), (1, date(2024, 1, 3)))
+        self.assertAlmostEqual(assignment.confidence, 0.3)
+        self.assertEqual(SearchJobAggregate.objects.get(search_job=job).total_papers, 7)
+
+    def test_upserts_papers_seen_by_an_earlier_run(self):
+        first = self.persist([arxiv_result('2401.00001', title='Old title'), arxiv_result('2401.00002')], [0, 0])
+        second = self.persist([arxiv_result('2401.00001', title='New title'), arxiv_result('2401.00003')], [0, 1])
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(Paper.objects.count(), 3)
+        self.assertEqual(Paper.objects.get(arxiv_id='2401.00001').title, 'New title')
+        self.assertEqual(PaperTopic.objects.filter(paper__arxiv_id='2401.00001').count(), 2)
+
+    def test_queries_do_not_grow_with_the_number_of_papers(self):
+        counts = []
+        for size in (5, 40):
+            papers = [arxiv_result(f'24{size:02d}.{i:05d}') for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                self.persist(papers, [i % 3 for i in range(size)])
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class CSVImportTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write_csv(self, path, rows):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def paper_rows(self, count):
+        return [
+            {'id': f'2401.{i:05d}', 'Title': f'Paper {i}', 'Abstract': 'About agents', 'Authors': 'A. Author',
+             'Published': f'2024-01-{i % 28 + 1:02d}', 'Cluster': str(i % 3), 'Categories': 'cs.AI', 'Extra': 'x'}
+            for i in range(count)
+        ]
+
+    def test_chunks_are_bounded(self):
+        path = self.write_csv(self.directory / 'papers.csv', self.paper_rows(7))
+        chunks = list(iter_csv_chunks(path, 3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(chunks[2][0][0], 7)
+
+    def import_papers(self, rows, **options):
+        path = self.write_csv(self.directory / 'papers.csv', rows)
+        call_command('import_papers', file=str(path), stdout=StringIO(), stderr=StringIO(), **options)
+        return PaperImportLog.objects.latest('id')
+
+    def test_import_papers_upserts_and_logs_failed_rows(self):
+        rows = self.paper_rows(10)
+        rows[4]['id'] = ''
+        rows[7]['Title'] = 'Paper 7, corrected'
+        rows.append(dict(rows[7], Title='Paper 7, latest'))
+
+        log = self.import_papers(rows, batch_size=3)
+
+        self.assertEqual((log.status, log.row_count, log.failed_rows), ('partial', 10, 1))
+        self.assertIn('Row 5: Missing paper ID', log.error_message)
+        self.assertEqual(Paper.objects.count(), 9)
+        paper = Paper.objects.get(arxiv_id='2401.00007')
+        self.assertEqual((paper.title, paper.year, paper.month, paper.cluster), ('Paper 7, latest', 2024, 'January', 1))
+        self.assertEqual(paper.metadata, {'Extra': 'x'})
+
+        rows[1]['Title'] = 'Paper 1, revised'
+        self.import_papers(rows[:3], batch_size=2)
+        self.assertEqual(Paper.objects.count(), 9)
+        self.assertEqual(Paper.objects.get(arxiv_id='2401.00001').title, 'Paper 1, revised')
+
+    def test_parallel_parsing_gives_the_same_rows(self):
+        log = self.import_papers(self.paper_rows(25), batch_size=4, workers=2)
+        self.assertEqual((log.status, log.row_count), ('success', 25))
+        self.assertEqual(
+            list(Paper.objects.order_by('arxiv_id').values_list('arxiv_id', flat=True)),
+            [f'2401.{i:05d}' for i in range(25)],
+        )
+
+    def test_import_latest_topics_creates_a_completed_job(self):
+        backend = self.directory / 'backend'
+        rows = [
+            {'id': f'2402.{i:05d}', 'Title': f'Paper {i}', 'Abstract': 'About agents', 'Authors': 'A. Author',
+             'Year': '2024', 'Month': 'February', 'Cluster': str(i % 3 - 1), 'Topic Label': f'Topic {i % 3 - 1}',
+             'Topic Keywords': 'agents; planning', 'Topic Confidence': '0.5'}
+            for i in range(8)
+        ]
+        self.write_csv(backend / 'scripts' / 'out' / 'arxiv_with_authors_topics_cli_20240201.csv', rows)
+
+        with override_settings(BASE_DIR=backend):
+            call_command('import_latest_topics', batch_size=3, stdout=StringIO())
+
+        job = SearchJob.objects.get()
+        self.assertEqual(
+            (job.status, job.papers_matched, job.topics_found, job.outliers_found), ('completed', 8, 2, 3)
+        )
+        self.assertEqual(
+            dict(job.topics.values_list('cluster_id', 'paper_count')), {-1: 3, 0: 3, 1: 2}
+        )
+        self.assertEqual(PaperTopic.objects.filter(search_job=job).count(), 8)
+        self.assertEqual(
+            PaperTopic.objects.get(search_job=job, paper__arxiv_id='2402.00000').published_date, date(2024, 2, 1)
+        )
+        self.assertEqual(SearchJobAggregate.objects.get(search_job=job).total_papers, 8)
+
+
+@requires_pipeline
+class TopicKeywordTests(TestCase):
+    ABSTRACTS = [
+        'Reinforcement learning agents plan with reward models.',
+        'Reward shaping helps reinforcement learning agents.',
+        'Protein folding predicted from amino acid sequences.',
+        'Amino acid embeddings improve protein folding accuracy.',
+        'A survey of everything.',
+    ]
+
+    def test_keywords_are_distinctive_per_cluster(self):
+        keywords = pipeline.extract_keywords(self.ABSTRACTS, np.array([0, 0, 1, 1, -1]), n_kw=3)
+
+        self.assertEqual(set(keywords), {-1, 0, 1})
+        self.assertEqual(keywords[-1], ['outlier'])
+        self.assertEqual(len(keywords[0]), 3)
+        self.assertTrue(set(keywords[0]) <= {'reinforcement', 'learning', 'agents', 'reward', 'reinforcement learning', 'learning agents'})
+        self.assertTrue(any('protein' in kw or 'amino' in kw or 'folding' in kw for kw in keywords[1]))
+        self.assertFalse(set(keywords[0]) & set(keywords[1]))
+
+    def test_reuses_a_precomputed_term_matrix(self):
+        labels = np.array([0, 0, 1, 1, -1])
+        term_matrix = pipeline.build_term_matrix(self.ABSTRACTS)
+        self.assertEqual(
+            pipeline.extract_keywords(self.ABSTRACTS, labels, term_matrix=term_matrix),
+            pipeline.extract_keywords(self.ABSTRACTS, labels),
+        )
+
+    def test_empty_vocabulary_yields_no_keywords(self):
+        keywords = pipeline.extract_keywords(['the of and', 'it is a'], np.array([0, -1]))
+        self.assertEqual(keywords, {0: [], -1: ['outlier']})
+        self.assertEqual(pipeline.title_from_keywords(keywords[0]), 'Outlier / Mixed Topic')
+
+
+class IdentityReducer:
+    """Stands in for a fitted UMAP reducer when the embeddings are already low-dimensional."""
+
+    def transform(self, X):
+        return X
+
+
+def topic_blobs(per_blob=12, centers=((0, 0), (10, 10), (0, 10)), seed=0):
+    rng = np.random.default_rng(seed)
+    return np.vstack([rng.normal(center, 0.3, size=(per_blob, 2)) for center in centers])
+
+
+@requires_pipeline
+class IncrementalTopicTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.model_dir = directory.name
+        self.X = topic_blobs()
+        self.clusterer = pipeline.build_topic_clusterer(5, 2)
+        self.labels = self.clusterer.fit_predict(self.X)
+
+    def previous(self, known):
+        return {
+            'job_id': 1,
+            'info': {'path': 'model.joblib', 'mode': 'refit'},
+            'assignments': known,
+            'reducer': IdentityReducer(),
+            'clusterer': self.clusterer,
+        }
+
+    def test_new_papers_are_assigned_and_known_papers_keep_their_topic(self):
+        papers = [arxiv_result(f'2401.{i:05d}') for i in range(len(self.X))]
+        known = {f'2401.{i:05d}': (int(self.labels[i]), 0.9) for i in range(0, len(self.X), 2)}
+        known['2401.00000'] = (7, 0.5)
+
+        name, labels, score, probabilities, info = pipeline.assign_topics_incrementally(
+            self.X, papers, self.previous(known)
+        )
+
+        self.assertEqual(labels[0], 7)
+        self.assertEqual(probabilities[0], 0.5)
+        np.testing.assert_array_equal(labels[1::2], self.labels[1::2])
+        self.assertEqual(
+            (info['mode'], info['source_job_id'], info['new_papers'], info['path']),
+            ('incremental', 1, len(self.X) // 2, 'model.joblib'),
+        )
+        self.assertTrue(name.endswith('_incremental'))
+
+    def test_refits_when_new_papers_drift_away_from_the_topics(self):
+        far = np.vstack([self.X, topic_blobs(per_blob=6, centers=((50, -50),), seed=1)])
+        papers = [arxiv_result(f'2401.{i:05d}') for i in range(len(far))]
+        known = {f'2401.{i:05d}': (int(self.labels[i]), 0.9) for i in range(len(self.X))}
+
+        with mock.patch.dict(os.environ, {'LITE_TOPIC_DRIFT_THRESHOLD': '0.3'}):
+            self.assertIsNone(pipeline.assign_topics_incrementally(far, papers, self.previous(known)))
+        self.assertIsNone(pipeline.assign_topics_incrementally(self.X, papers, None))
+
+    def completed_topic_job(self, query, path, created_at):
+        job = SearchJob.objects.create(
+            query=query, status='completed',
+            metadata={'embedding_model': 'model-a', 'topic_model': {'path': path, 'mode': 'refit'}},
+        )
+        SearchJob.objects.filter(pk=job.pk).update(created_at=created_at)
+        return job
+
+    def test_loads_the_newest_saved_model_with_its_assignments(self):
+        old_path = pipeline.save_topic_model(IdentityReducer(), self.clusterer, self.model_dir)
+        new_path = pipeline.save_topic_model(IdentityReducer(), self.clusterer, self.model_dir)
+        self.completed_topic_job('agents', old_path, submitted(date(2024, 1, 1)))
+        job = self.completed_topic_job('agents', new_path, submitted(date(2024, 2, 1)))
+        topic = Topic.objects.create(search_job=job, cluster_id=3, label='Agents')
+        PaperTopic.objects.create(paper=make_paper('2401.00001'), topic=topic, search_job=job, confidence=0.8)
+
+        previous = pipeline.load_previous_topic_model({'must_include': ['agents']}, 'model-a')
+
+        self.assertEqual(previous['job_id'], job.id)
+        self.assertEqual(previous['info']['path'], new_path)
+        self.assertEqual(previous['assignments'], {'2401.00001': (3, 0.8)})
+        self.assertIsInstance(previous['reducer'], IdentityReducer)
+        self.assertIsNone(pipeline.load_previous_topic_model({'must_include': ['agents']}, 'model-b'))
+
+    def test_prunes_models_superseded_for_the_same_search(self):
+        paths = [pipeline.save_topic_model(IdentityReducer(), self.clusterer, self.model_dir) for _ in range(4)]
+        self.completed_topic_job('agents', paths[0], submitted(date(2024, 1, 1)))
+        self.completed_topic_job('agents', paths[1], submitted(date(2024, 1, 2)))
+        newest = self.completed_topic_job('agents', paths[2], submitted(date(2024, 1, 3)))
+        self.completed_topic_job('robots', paths[3], submitted(date(2024, 1, 1)))
+        # An incremental run keeps pointing at the file it was assigned with.
+        self.completed_topic_job('agents', paths[2], submitted(date(2023, 12, 1)))
+
+        pipeline.prune_topic_models(newest.id)
+
+        self.assertEqual([os.path.exists(path) for path in paths], [False, False, True, True])
+
+
+class SearchReuseTests(TestCase):
+    search = {'search_terms': ['LLM Agents'], 'keywords': ['planning'], 'start_date': '2024-01-01', 'end_date': '2024-06-30'}
+
+    def post_search(self, **changes):
+        return self.client.post('/api/search-terms/', {**self.search, **changes}, content_type='application/json')
+
+    def test_identical_search_attaches_then_reuses(self):
+        queued = self.post_search()
+        self.assertEqual(queued.status_code, 202)
+        job_id = queued.json()['job_id']
+
+        # Same terms in another order and case share the fingerprint.
+        attached = self.post_search(search_terms=['llm agents'], keywords=['Planning'])
+        self.assertEqual(attached.json()['job_id'], job_id)
+        self.assertTrue(attached.json()['attached'])
+
+        SearchJob.objects.filter(pk=job_id).update(status='completed', updated_at=django_timezone.now())
+        reused = self.post_search()
+        self.assertEqual(reused.json()['job_id'], job_id)
+        self.assertTrue(reused.json()['reused'])
+        self.assertEqual(SearchJob.objects.count(), 1)
+
+    def test_different_window_or_parameters_start_a_new_job(self):
+        first = self.post_search().json()['job_id']
+        other_window = self.post_search(end_date='2024-05-31').json()['job_id']
+        other_parameters = self.post_search(parameters={'max_papers': 50}).json()['job_id']
+        self.assertEqual(len({first, other_window, other_parameters}), 3)
+
+    def test_duplicate_row_is_never_committed_where_a_worker_could_claim_it(self):
+        config = search_config(['agents'], [], '2024-01-01', '2024-01-31')
+        fingerprint, components = search_fingerprint(['agents'], [], '2024-01-01', '2024-01-31')
+        first, created = create_search_job(config, fingerprint, components)
+        self.assertTrue(created)
+
+        # Two POSTs that both missed find_reusable_job: the second insert must
+        # happen inside a transaction that is rolled back, not be deleted later.
+        savepoints_at_insert = []
+
+        def record(sender, instance, created, **kwargs):
+            if created:
+                savepoints_at_insert.append(len(connection.savepoint_ids))
+
+        baseline = len(connection.savepoint_ids)
+        post_save.connect(record, sender=SearchJob)
+        self.addCleanup(post_save.disconnect, record, sender=SearchJob)
+        job, created = create_search_job(config, fingerprint, components)
+
+        self.assertEqual((job.id, created), (first.id, False))
+        self.assertEqual(savepoints_at_insert, [baseline + 1])
+        self.assertEqual(list(SearchJob.objects.values_list('id', flat=True)), [first.id])
+        self.assertEqual(first.events.filter(event='queued').count(), 1)
+        self.assertEqual(claim_next_job('worker-1'), first.id)
+        self.assertIsNone(claim_next_job('worker-2'))
+
+
+class ClaimNextJobTests(TestCase):
+    def test_each_queued_job_is_claimed_once_oldest_first(self):
+        jobs = [SearchJob.objects.create(query=f'q{i}') for i in range(3)]
+        SearchJob.objects.create(query='done', status='completed')
+
+        claimed = [claim_next_job(f'worker-{i}') for i in range(4)]
+
+        self.assertEqual(claimed, [job.id for job in jobs] + [None])
+        for i, job in enumerate(jobs):
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.worker_id), ('processing', f'worker-{i}'))
+            self.assertIsNotNone(job.heartbeat_at)
+
+    def test_job_taken_by_another_worker_is_skipped(self):
+        first = SearchJob.objects.create(query='first')
+        second = SearchJob.objects.create(query='second')
+        real_update = type(SearchJob.objects.all()).update
+
+        def claimed_elsewhere(queryset, **fields):
+            # Another worker wins the race for the first job between the lookup and the UPDATE.
+            if fields.get('worker_id') == 'slow' and not SearchJob.objects.filter(worker_id='fast').exists():
+                real_update(SearchJob.objects.filter(pk=first.id), status='processing', worker_id='fast')
+            return real_update(queryset, **fields)
+
+        with mock.patch.object(type(SearchJob.objects.all()), 'update', claimed_elsewhere):
+            self.assertEqual(claim_next_job('slow'), second.id)
+        first.refresh_from_db()
+        self.assertEqual(first.worker_id, 'fast')
+
+    def test_only_jobs_with_stale_heartbeats_fail(self):
+        stale = django_timezone.now() - job_heartbeat_timeout() - timedelta(seconds=5)
+        live = SearchJob.objects.create(query='live', status='processing', heartbeat_at=django_timezone.now())
+        dead = SearchJob.objects.create(query='dead', status='processing', heartbeat_at=stale)
+
+        self.assertEqual(fail_interrupted_jobs(), 1)
+        live.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual((live.status, dead.status), ('processing', 'failed'))
+
+    def test_searches_attach_only_to_jobs_whose_worker_is_alive(self):
+        now = django_timezone.now()
+        stale = now - job_heartbeat_timeout() - timedelta(seconds=5)
+        long_ago = now - timedelta(days=1)
+        beating = SearchJob.objects.create(query='a', fingerprint='beating', status='processing')
+        silent = SearchJob.objects.create(query='b', fingerprint='silent', status='processing')
+        queued = SearchJob.objects.create(query='c', fingerprint='queued')
+        unclaimed = SearchJob.objects.create(query='d', fingerprint='unclaimed', status='processing')
+        # A long run keeps beating long after its row was last saved; a dead one stops.
+        SearchJob.objects.filter(pk=beating.pk).update(heartbeat_at=now, updated_at=long_ago)
+        SearchJob.objects.filter(pk=silent.pk).update(heartbeat_at=stale, updated_at=now)
+        SearchJob.objects.filter(pk=unclaimed.pk).update(updated_at=stale)
+
+        self.assertEqual(find_reusable_job('beating'), (beating, 'attached'))
+        self.assertEqual(find_reusable_job('silent'), (None, None))
+        self.assertEqual(find_reusable_job('queued'), (queued, 'attached'))
+        self.assertEqual(find_reusable_job('unclaimed'), (None, None))
+
+
+@requires_pipeline
+class EmbeddingsDisabledTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        environ = mock.patch.dict(os.environ, {
+            'LITE_DISABLE_EMBEDDINGS': '1',
+            'ARXIV_EXTRACTOR_BASE_DIR': directory.name,
+            'LITE_INCREMENTAL_FETCH': '0',
+        })
+        environ.start()
+        self.addCleanup(environ.stop)
+        # run_search replaces the root logging handlers with its own.
+        root = logging.getLogger()
+        self.addCleanup(setattr, root, 'handlers', list(root.handlers))
+        self.addCleanup(root.setLevel, root.level)
+
+    def test_warm_up_skips_the_model(self):
+        with mock.patch.object(pipeline, 'get_embedding_model') as get_model:
+            startup = pipeline.warm_up()
+        get_model.assert_not_called()
+        self.assertTrue(startup['embeddings_disabled'])
+        self.assertEqual(startup['model_load_seconds'], 0)
+
+    def test_unclustered_run_completes_with_a_note(self):
+        config = search_config(['agents'], [], '2024-01-01', '2024-01-31')
+        fingerprint, components = search_fingerprint(['agents'], [], '2024-01-01', '2024-01-31')
+        job, _ = create_search_job(config, fingerprint, components)
+        papers = [arxiv_result(f'2401.{i:05d}', date(2024, 1, i + 1), summary=f'Agents plan step {i}.') for i in range(3)]
+        metrics = {'total_seen': 5, 'total_available': 9, 'skipped_duplicates': 1, 'skipped_irrelevant': 1, 'queries': {}}
+
+        with mock.patch.object(pipeline, 'fetch_papers', return_value=(papers, metrics)), \
+                mock.patch.object(pipeline, 'get_embedding_model') as get_model, \
+                redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+            pipeline.main(job.id)
+
+        get_model.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.papers_matched, job.topics_found, job.error_message), ('completed', 3, 1, ''))
+        self.assertIn('LITE_DISABLE_EMBEDDINGS', job.metadata['note'])
+        self.assertEqual(PaperTopic.objects.filter(search_job=job).count(), 3)
+        self.assertEqual(job.events.last().event, 'completed')
+
+
+class JobEventsTests(TestCase):
+    def setUp(self):
+        self.job = SearchJob.objects.create(query='agents', status='processing')
+        environ = mock.patch.dict(os.environ, {'LITE_SSE_POLL_SECONDS': '0', 'LITE_SSE_MAX_SECONDS': '0'})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def add_event(self, event, **data):
+        return self.job.events.create(event=event, data=data)
+
+    def read_stream(self, job_id=None, **headers):
+        response = self.client.get(f'/api/jobs/{job_id or self.job.id}/events', headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        try:
+            return b''.join(response.streaming_content).decode()
+        finally:
+            response.close()
+
+    def test_replays_events_up_to_the_final_one(self):
+        queued = self.add_event('queued')
+        stage = self.add_event('stage_started', stage='fetch')
+        completed = self.add_event('completed', status='completed')
+        self.add_event('stage_started', stage='late')
+
+        body = self.read_stream()
+
+        self.assertTrue(body.startswith('retry: 3000\n\n'))
+        self.assertIn(f'id: {stage.id}\nevent: stage_started\ndata: {{"stage": "fetch", "job_id": {self.job.id}}}\n\n', body)
+        self.assertEqual(
+            [line for line in body.splitlines() if line.startswith('id: ')],
+            [f'id: {queued.id}', f'id: {stage.id}', f'id: {completed.id}'],
+        )
+
+    def test_resumes_after_last_event_id(self):
+        first = self.add_event('queued')
+        second = self.add_event('stage_started', stage='fetch')
+
+        body = self.read_stream(**{'Last-Event-ID': str(first.id)})
+
+        self.assertNotIn(f'id: {first.id}\n', body)
+        self.assertIn(f'id: {second.id}\n', body)
+
+    def test_finished_job_without_events_gets_a_synthesized_final_event(self):
+        SearchJob.objects.filter(pk=self.job.pk).update(
+            status='completed', papers_matched=4, updated_at=django_timezone.now() - timedelta(minutes=1)
+        )
+        body = self.read_stream()
+        self.assertIn('event: completed\ndata: ', body)
+        self.assertIn('"papers_matched": 4', body)
+
+    def test_open_streams_are_capped(self):
+        with mock.patch.dict(os.environ, {'LITE_SSE_MAX_STREAMS': '1'}):
+            open_stream = self.client.get(f'/api/jobs/{self.job.id}/events')
+            refused = self.client.get(f'/api/jobs/{self.job.id}/events')
+            open_stream.close()
+            after_close = self.client.get(f'/api/jobs/{self.job.id}/events')
+            after_close.close()
+
+        self.assertEqual(refused.status_code, 503)
+        self.assertEqual(refused['Retry-After'], '5')
+        self.assertEqual(after_close.status_code, 200)
+
+    def test_unknown_job_is_not_found(self):
+        self.assertEqual(self.client.get('/api/jobs/999/events').status_code, 404)
+
+
+class SearchConfigTests(TestCase):
+    def test_parameters_are_validated(self):
+        self.assertEqual(
+            clean_parameters({'clustering_mode': ' KMeans ', 'max_papers': '50', 'min_topic_size': 3}),
+            {'clustering_mode': 'kmeans', 'max_papers': 50, 'min_topic_size': 3},
+        )
+        for parameters in ({'embedding_model': 'x'}, {'max_papers': 0}, {'max_papers': 'many'},
+                           {'clustering_mode': 'spectral'}, ['max_papers']):
+            with self.subTest(parameters=parameters), self.assertRaises(ValueError):
+                clean_parameters(parameters)
+
+    def test_max_papers_is_capped(self):
+        self.assertEqual(clean_parameters({'max_papers': 500}), {'max_papers': 500})
+        with self.assertRaisesMessage(ValueError, 'max_papers must be at most 500'):
+            clean_parameters({'max_papers': 501})
+        with mock.patch.dict(os.environ, {'LITE_MAX_PAPERS_LIMIT': '50'}):
+            response = self.client.post(
+                '/api/search-terms/', {'search_terms': ['agents'], 'parameters': {'max_papers': 51}},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'max_papers must be at most 50')
+        self.assertFalse(SearchJob.objects.exists())
+
+    def test_config_cleans_keywords_and_checks_dates(self):
+        config = search_config([' LLM  Agents', 'llm agents'], 'Planning', '2024-01-01', '2024-02-01', {'max_papers': 20})
+        self.assertEqual(config, {
+            'must_include': ['llm agents'], 'optional_keywords': ['planning'],
+            'start_date': '2024-01-01', 'end_date': '2024-02-01', 'parameters': {'max_papers': 20},
+        })
+        with self.assertRaisesMessage(ValueError, 'start_date must not be after end_date'):
+            search_config(['agents'], [], '2024-02-01', '2024-01-01')
+        with self.assertRaises(ValueError):
+            search_config(['agents'], [], '01/02/2024', '2024-01-01')
+
+    def test_fingerprint_covers_overrides_but_not_keyword_order(self):
+        settings_ = fingerprint_settings({}, {'max_papers': 20})
+        self.assertEqual(settings_['max_papers'], '20')
+        first, _ = search_fingerprint(['b', 'a'], [], '2024-01-01', '2024-02-01', settings_)
+        same, _ = search_fingerprint(['A', 'B'], [], '2024-01-01', '2024-02-01', settings_)
+        other, _ = search_fingerprint(['a', 'b'], [], '2024-01-01', '2024-02-01', fingerprint_settings({}))
+        self.assertEqual(first, same)
+        self.assertNotEqual(first, other)
+
+
+@requires_pipeline
+class JobOutputTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_load_config_reads_the_jobs_own_configuration(self):
+        config = search_config(['agents'], ['planning'], '2024-01-01', '2024-01-31', {'max_papers': 20})
+        fingerprint, components = search_fingerprint(['agents'], ['planning'], '2024-01-01', '2024-01-31')
+        job, _ = create_search_job(config, fingerprint, components)
+
+        with mock.patch.dict(os.environ, {'LITE_MAX_PAPERS': '100'}):
+            loaded = pipeline.load_config(job.id)
+
+        self.assertEqual((loaded['must_include'], loaded['optional_keywords']), (['agents'], ['planning']))
+        self.assertEqual((loaded['start_date'], loaded['end_date']), ('2024-01-01', '2024-01-31'))
+        self.assertEqual(loaded['settings']['max_papers'], '20')
+        self.assertEqual((loaded['fingerprint'], loaded['fingerprint_components']), (fingerprint, components))
+
+    def test_old_outputs_of_running_jobs_are_kept(self):
+        running = SearchJob.objects.create(query='running', status='processing')
+        finished = SearchJob.objects.create(query='finished', status='completed')
+        me = SearchJob.objects.create(query='me', status='processing')
+        names = [
+            f'run_{pipeline.output_tag(running.id)}_1.csv',
+            f'run_{pipeline.output_tag(finished.id)}_1.csv',
+            f'run_{pipeline.output_tag(me.id)}_1.csv',
+            f'run_{pipeline.output_tag(None)}_1.csv',
+            'other_file.csv',
+        ]
+        keep = os.path.join(self.directory, f'run_{pipeline.output_tag(me.id)}_2.csv')
+        for name in names + [os.path.basename(keep)]:
+            Path(self.directory, name).touch()
+
+        pipeline.remove_previous_outputs(self.directory, 'run_', '.csv', me.id, keep)
+
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted([names[0], names[3], names[4], os.path.basename(keep)]),
+        )
+
+
+class PapersAPITestCase(TestCase):
+    def setUp(self):
+        # The papers endpoint is cached per URL, and parsed results per process.
+        cache.clear()
+        views._results_cache.clear()
+
+    def get_papers(self, **params):
+        return self.client.get('/api/papers/', params)
+
+
+class CursorPagingTests(PapersAPITestCase):
+    def setUp(self):
+        super().setUp()
+        first = date(2024, 3, 1)
+        papers = [make_paper(f'2403.{i:05d}', first + timedelta(days=i // 3)) for i in range(23)]
+        papers += [make_paper(f'undated.{i}') for i in range(2)]
+        self.job = completed_job(papers=papers)
+
+    def test_cursor_walks_every_paper_once_in_offset_order(self):
+        by_page = []
+        for page in (1, 2, 3):
+            by_page += [paper['id'] for paper in self.get_papers(page=page, page_size=10).json()['papers']]
+
+        by_cursor, params = [], {'page_size': 10}
+        while True:
+            body = self.get_papers(**params).json()
+            by_cursor += [paper['id'] for paper in body['papers']]
+            if not body['pagination']['next_cursor']:
+                break
+            params['cursor'] = body['pagination']['next_cursor']
+            self.assertIsNone(self.get_papers(**params).json()['pagination']['total_items'])
+
+        self.assertEqual(len(by_page), 25)
+        self.assertEqual(by_cursor, by_page)
+        self.assertEqual(by_cursor[-2:], ['undated.1', 'undated.0'])
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', 'WyIyMDI0LTEzLTAxIiwgMV0'):
+            response = self.get_papers(cursor=cursor)
+            self.assertEqual(response.status_code, 400)
+
+    def test_cursor_is_rejected_for_ranked_search(self):
+        cursor = views.encode_papers_cursor(date(2024, 3, 2), 1)
+        self.assertEqual(self.get_papers(search='paper', cursor=cursor).status_code, 400)
+
+
+class JobScopedSearchTests(PapersAPITestCase):
+    def test_search_ranks_only_the_jobs_papers(self):
+        # The other job's papers match better and outnumber the search limit.
+        crowd = [
+            make_paper(f'crowd.{i}', date(2024, 1, 1), title='graph graph graph networks', abstract='graph')
+            for i in range(8)
+        ]
+        completed_job('crowd', crowd)
+        ours = [
+            make_paper(f'ours.{i}', date(2024, 2, 1), title='Other', abstract='a graph in a long abstract')
+            for i in range(3)
+        ]
+        job = completed_job('ours', ours + [make_paper('ours.nomatch', date(2024, 2, 1), title='Unrelated')])
+
+        with mock.patch.dict(os.environ, {'LITE_SEARCH_LIMIT': '5'}):
+            body = self.get_papers(job=job.id, search='graph').json()
+
+        self.assertEqual(sorted(paper['id'] for paper in body['papers']), ['ours.0', 'ours.1', 'ours.2'])
+        self.assertEqual(body['pagination']['total_items'], 3)
+        self.assertIn('<mark>', body['papers'][0]['highlight']['abstract'])
+
+
+def unit_vectors(count, dims=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dims)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def store_embeddings(papers, vectors, model_name='test-model'):
+    PaperEmbedding.objects.bulk_create([
+        PaperEmbedding(
+            arxiv_id=paper.arxiv_id, content_hash=f'{paper.arxiv_id}-{i}-{vector[0]}', model_name=model_name,
+            dimensions=len(vector), vector=vector.astype(np.float32).tobytes(),
+        )
+        for i, (paper, vector) in enumerate(zip(papers, vectors))
+    ])
+
+
+class SemanticIndexTestCase(TestCase):
+    model_name = 'test-model'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        environ = mock.patch.dict(os.environ, {'LITE_SEMANTIC_DIR': self.directory, 'LITE_SEMANTIC_REFRESH_SECONDS': '0'})
+        environ.start()
+        self.addCleanup(environ.stop)
+        # Web workers keep loaded indexes and query models per process.
+        semantic._indexes.clear()
+        self.addCleanup(semantic._indexes.clear)
+
+    def add_papers(self, prefix, vectors):
+        papers = [make_paper(f'{prefix}.{i}') for i in range(len(vectors))]
+        store_embeddings(papers, vectors, self.model_name)
+        return papers
+
+    def open_index(self):
+        index = semantic.EmbeddingIndex(self.model_name, self.directory)
+        index.refresh()
+        return index
+
+
+class SemanticIndexTests(SemanticIndexTestCase):
+    def test_updates_append_segments_that_shadow_older_rows(self):
+        vectors = unit_vectors(12)
+        papers = self.add_papers('first', vectors[:10])
+        full = semantic.update_index(self.model_name)
+        self.assertEqual(len(full['segments']), 1)
+        self.assertIn('-full-', full['segments'][0]['vectors'])
+        self.assertEqual(semantic.update_index(self.model_name), full)
+
+        self.add_papers('second', vectors[10:])
+        # A changed abstract stores a new vector for an indexed paper.
+        store_embeddings(papers[:1], -vectors[:1], self.model_name)
+        meta = semantic.update_index(self.model_name)
+
+        self.assertEqual([spec['count'] for spec in meta['segments']], [10, 3])
+        self.assertIn('-add-', meta['segments'][1]['vectors'])
+        index = self.open_index()
+        self.assertEqual(index.count, 12)
+        (best, score), = index.search(-vectors[0], 1)[0]
+        self.assertEqual(best, papers[0].id)
+        self.assertAlmostEqual(score, 1.0, places=5)
+        self.assertEqual(index.search(vectors[0], 12)[0][-1][0], papers[0].id)
+
+    def test_compaction_removes_only_this_models_stale_files(self):
+        vectors = unit_vectors(9)
+        self.add_papers('first', vectors[:3])
+        semantic.update_index(self.model_name)
+        # Files of a model whose slug starts with this one must survive.
+        others = ['test-model--int8.json', 'test-model--int8-full-1-1.f32', 'test-model--int8-full-1-1.ids.npy']
+        for name in others:
+            Path(self.directory, name).touch()
+
+        with mock.patch.dict(os.environ, {'LITE_SEMANTIC_MAX_SEGMENTS': '2'}):
+            for start in (3, 6):
+                self.add_papers(f'more{start}', vectors[start:start + 3])
+                meta = semantic.update_index(self.model_name)
+
+        self.assertEqual(len(meta['segments']), 1)
+        self.assertIn('-merged-', meta['segments'][0]['vectors'])
+        self.assertEqual(meta['segments'][0]['count'], 9)
+        expected = {'.lock', 'test-model.json', meta['segments'][0]['vectors'], meta['segments'][0]['ids'], *others}
+        self.assertEqual(set(os.listdir(self.directory)), expected)
+        self.assertEqual(self.open_index().count, 9)
+
+    def test_readers_never_build_an_index(self):
+        self.add_papers('first', unit_vectors(3))
+        with self.assertRaisesMessage(semantic.SemanticSearchUnavailable, 'No semantic index for test-model'):
+            semantic.get_index(self.model_name)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class SemanticSearchViewTests(SemanticIndexTestCase):
+    def search(self, **params):
+        return self.client.get('/api/papers/semantic/', {'q': 'agents', **params})
+
+    def test_returns_the_closest_papers(self):
+        vectors = unit_vectors(6)
+        papers = self.add_papers('paper', vectors)
+        semantic.update_index(self.model_name)
+        with mock.patch.object(semantic, 'encode_query', return_value=(vectors[2], self.model_name)):
+            body = self.search(k=2).json()
+
+        self.assertEqual((body['mode'], body['indexed_papers'], body['model']), ('exact', 6, self.model_name))
+        self.assertEqual(body['results'][0]['id'], papers[2].arxiv_id)
+        self.assertAlmostEqual(body['results'][0]['score'], 1.0, places=5)
+        self.assertEqual(len(body['results']), 2)
+
+    def test_missing_index_is_unavailable(self):
+        with mock.patch.object(semantic, 'encode_query', return_value=(unit_vectors(1)[0], self.model_name)):
+            response = self.search()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('build_semantic_index', response.json()['error'])
+
+    def test_model_that_cannot_load_is_unavailable(self):
+        semantic._models.clear()
+        self.addCleanup(semantic._models.clear)
+        with mock.patch.object(semantic, 'load_embedding_model', side_effect=OSError('weights not found')):
+            response = self.search()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Embedding model unavailable: weights not found', response.json()['error'])
+
+
+def clustered_unit_vectors(count, dims=16, centers=12, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.normal(size=(centers, dims))
+    vectors = (means[rng.integers(centers, size=count)] + rng.normal(scale=0.4, size=(count, dims))).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class ApproximateSearchTests(SemanticIndexTestCase):
+    def setUp(self):
+        super().setUp()
+        environ = mock.patch.dict(os.environ, {'LITE_ANN_MIN_PAPERS': '300', 'LITE_ANN_NLIST': '16', 'LITE_ANN_NPROBE': '4'})
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.vectors = clustered_unit_vectors(460)
+        self.papers = self.add_papers('paper', self.vectors[:400])
+        self.meta = semantic.update_index(self.model_name)
+        self.index = self.open_index()
+
+    def test_ivf_lists_keep_recall_close_to_exact_search(self):
+        self.assertIsNotNone(self.meta['quantizer'])
+        self.assertIn('codes', self.meta['segments'][0])
+        queries = clustered_unit_vectors(30, seed=1)
+        found = exact = 0
+        for query in queries:
+            approximate, mode = self.index.search(query, 10)
+            truth, exact_mode = self.index.search(query, 10, nprobe=0)
+            self.assertEqual((mode, exact_mode), ('ivf', 'exact'))
+            found += len({paper_id for paper_id, _ in approximate} & {paper_id for paper_id, _ in truth})
+            exact += len(truth)
+            # Re-ranked scores are true cosines, never better than the exact ones.
+            self.assertLessEqual(approximate[0][1], truth[0][1] + 1e-6)
+        self.assertGreaterEqual(found / exact, 0.9)
+
+        # Probing every list finds exactly what a full scan finds.
+        everything = self.index.search(queries[0], 10, nprobe=16)[0]
+        self.assertEqual(
+            [paper_id for paper_id, _ in everything],
+            [paper_id for paper_id, _ in self.index.search(queries[0], 10, nprobe=0)[0]],
+        )
+
+    def test_narrow_filters_are_scored_exactly(self):
+        allowed = np.array([paper.id for paper in self.papers[:5]], dtype=np.int64)
+        matches, mode = self.index.search(self.vectors[3], 3, allowed_ids=allowed)
+        self.assertEqual(mode, 'exact')
+        self.assertEqual(matches[0][0], self.papers[3].id)
+        self.assertTrue({paper_id for paper_id, _ in matches} <= set(allowed.tolist()))
+
+    def test_new_segments_use_the_trained_lists_until_the_corpus_doubles(self):
+        added = self.add_papers('added', self.vectors[400:])
+        meta = semantic.update_index(self.model_name)
+        self.assertEqual(meta['quantizer'], self.meta['quantizer'])
+        self.assertIn('codes', meta['segments'][1])
+        index = self.open_index()
+        self.assertEqual(index.search(self.vectors[450], 1)[0][0][0], added[50].id)
+
+        self.add_papers('more', clustered_unit_vectors(400, seed=2))
+        meta = semantic.update_index(self.model_name)
+        self.assertNotEqual(meta['quantizer'], self.meta['quantizer'])
+        self.assertEqual(len(meta['segments']), 1)
+        self.assertEqual(semantic.IVFQuantizer.load(os.path.join(self.directory, meta['quantizer'])).trained_count, 860)
+
+
+class RelatedPapersTests(SemanticIndexTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vectors = unit_vectors(8, seed=3)
+        self.older = self.add_papers('older', self.vectors[:4])
+        self.job = SearchJob.objects.create(query='agents', status='completed')
+        self.papers = self.add_papers('new', self.vectors[4:])
+
+    def related(self, paper, **params):
+        return self.client.get(f'/api/papers/{paper.arxiv_id}/related/', params)
+
+    def expected_order(self, paper_index, candidates):
+        scores = {i: float(self.vectors[i] @ self.vectors[paper_index]) for i in candidates if i != paper_index}
+        return sorted(scores, key=lambda i: -scores[i])
+
+    def test_lists_within_the_job_and_across_the_corpus(self):
+        from .related import store_related_papers
+
+        with mock.patch.dict(os.environ, {'LITE_RELATED_K': '3'}):
+            counts = store_related_papers(self.job.id, [paper.id for paper in self.papers], self.vectors[4:], self.model_name)
+
+        self.assertEqual(counts['job_rows'], 12)
+        self.assertEqual(counts['global_rows'], 12)
+        everyone = self.older + self.papers
+        body = self.related(self.papers[0]).json()
+        self.assertEqual(body['scope'], 'global')
+        self.assertEqual(
+            [result['id'] for result in body['results']],
+            [everyone[i].arxiv_id for i in self.expected_order(4, range(8))[:3]],
+        )
+        within = self.related(self.papers[0], job=self.job.id, k=2).json()
+        self.assertEqual(
+            [result['id'] for result in within['results']],
+            [everyone[i].arxiv_id for i in self.expected_order(4, range(4, 8))[:2]],
+        )
+        self.assertAlmostEqual(
+            within['results'][0]['score'], float(self.vectors[4] @ self.vectors[self.expected_order(4, range(4, 8))[0]]),
+            places=5,
+        )
+
+    def test_unknown_paper_is_not_found(self):
+        self.assertEqual(self.client.get('/api/papers/nope/related/').status_code, 404)
+        self.assertEqual(self.related(self.older[0]).json()['results'], [])
+
+    @requires_pipeline
+    def test_without_the_embedding_cache_only_job_lists_are_stored(self):
+        papers = [arxiv_result(paper.arxiv_id) for paper in self.papers]
+        with mock.patch.dict(os.environ, {'LITE_EMBEDDING_CACHE': '0'}):
+            pipeline.store_related(self.job.id, papers, self.vectors[4:], self.model_name)
+
+        self.assertEqual(self.job.related_papers.count(), 12)
+        self.assertEqual(self.related(self.papers[0]).json()['results'], [])
+        # No index was built from the database behind the pipeline's back.
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class JobAggregatesTests(TestCase):
+    def setUp(self):
+        categories = ['cs.AI; cs.LG', "['cs.CL', 'cs.AI']", 'stat.ML', '']
+        papers = [
+            make_paper(f'p{i}', date(2023 + i % 2, 1 + i % 4, 1) if i % 7 else None, categories=categories[i % 4])
+            for i in range(30)
+        ]
+        self.job = completed_job(papers=papers, clusters=3)
+        # A paper of another job must not be counted.
+        completed_job('other', [make_paper('elsewhere', date(2023, 1, 1))])
+        self.aggregates = JobAggregates(store_job_aggregates(self.job.id))
+
+    def live(self, year=None, month=None, cluster=None):
+        rows = PaperTopic.objects.filter(search_job=self.job)
+        if year is not None:
+            rows = rows.filter(paper__year=year)
+        if month:
+            rows = rows.filter(paper__month__iexact=month)
+        if cluster is not None:
+            rows = rows.filter(topic__cluster_id=cluster)
+        return rows
+
+    def test_counts_match_live_counts_for_every_filter(self):
+        for year in (None, 2023, 2024, 2030):
+            for month in (None, 'January', 'march', 'December'):
+                for cluster in (None, 0, 1, 2):
+                    with self.subTest(year=year, month=month, cluster=cluster):
+                        self.assertEqual(
+                            self.aggregates.count(year, month, cluster),
+                            self.live(year, month, cluster).count(),
+                        )
+
+    def test_timeline_and_categories_match_live_counts(self):
+        for year, cluster in ((None, None), (2024, None), (2023, 1)):
+            rows = self.live(year=year, cluster=cluster)
+            timeline = {
+                (row['paper__year'], row['paper__month']): row['count']
+                for row in rows.filter(paper__year__isnull=False)
+                .values('paper__year', 'paper__month').annotate(count=Count('id'))
+            }
+            self.assertEqual(
+                {(row['year'], row['month']): row['count'] for row in self.aggregates.timeline(year=year, cluster=cluster)},
+                timeline,
+            )
+            categories = {}
+            for value in rows.values_list('paper__categories', flat=True):
+                for category in set(split_categories(value)):
+                    categories[category] = categories.get(category, 0) + 1
+            self.assertEqual(
+                {row['category']: row['count'] for row in self.aggregates.categories(year=year, cluster=cluster)},
+                categories,
+            )
+
+    def test_cluster_stats_match_topics(self):
+        stats = self.aggregates.cluster_stats()
+        self.assertEqual(stats['total_papers'], 30)
+        self.assertEqual(stats['papers_per_cluster'], {0: 10, 1: 10, 2: 10})
+        self.assertEqual(SearchJobAggregate.objects.get(search_job=self.job).total_papers, 30)
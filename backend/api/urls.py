@@ -35,9 +35,27 @@ urlpatterns = [
     path('papers/', 
          cache_page(CACHE_TTL)(views.PapersAPIView.as_view()), 
          name='papers'),
+    path('papers/semantic/',
+         views.SemanticSearchView.as_view(),
+         name='papers-semantic'),
+    path('papers/<path:arxiv_id>/related/',
+         views.RelatedPapersView.as_view(),
+         name='paper-related'),
     path('papers/all-for-clustering/', 
          cache_page(CACHE_TTL)(views.PapersAPIView.as_view()), 
          name='papers-all-clustering'),
+    path('worker/status/',
+         views.PipelineWorkerStatusView.as_view(),
+         name='worker-status'),
+    path('jobs/<int:job_id>/profile/',
+         views.JobProfileView.as_view(),
+         name='job-profile'),
+    path('jobs/<int:job_id>/events',
+         views.JobEventsView.as_view(),
+         name='job-events'),
+    path('jobs/<int:job_id>/events/',
+         views.JobEventsView.as_view(),
+         name='job-events-slash'),
     
     # Redirect URLs without trailing slashes to URLs with trailing slashes
     path('search-terms', 
@@ -1,21 +1,35 @@
+import base64
+import binascii
 import json
+import csv
+import logging
 import os
-import subprocess
-import sys
+import re
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from django.conf import settings
-from django.core.cache import cache
-from django.db.models import Count, Q
+from django.db.models import F, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from django.views.decorators.cache import cache_page
 from django.views.decorators.csrf import csrf_exempt
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.vary import vary_on_cookie
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
-from .models import Paper, PaperImportLog, PaperTopic, SearchJob
+from .models import Paper, PaperImportLog, PaperTopic, RelatedPaper, SearchJob, SearchJobEvent
+from .aggregates import job_aggregates
+from .fingerprint import fingerprint_settings, search_config, search_fingerprint
+from .jobs import create_search_job, describe_job, find_reusable_job, queue_is_full, queue_stats
+from .search import highlights, search_queryset
+from .semantic import SemanticSearchUnavailable, semantic_search
+from .worker import get_worker_status
+
+logger = logging.getLogger(__name__)
 
 
 class ClearSearchTermsView(APIView):
@@ -29,568 +43,616 @@ class ClearSearchTermsView(APIView):
         return SearchTermsAPIView().clear(request)
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """Custom pagination class with configurable page size."""
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 1000
-    
-    def get_paginated_response(self, data):
-        return Response({
-            'links': {
-                'next': self.get_next_link(),
-                'previous': self.get_previous_link()
-            },
-            'count': self.page.paginator.count,
-            'total_pages': self.page.paginator.num_pages,
-            'current_page': self.page.number,
-            'results': data
-        })
-
-
-class PapersAPIView(APIView):
-    """API endpoint for retrieving and searching papers."""
-    pagination_class = StandardResultsSetPagination
-    
-    def get_queryset(self):
-        """Return the base queryset with common filtering."""
-        queryset = Paper.objects.all()
-        
-        # Apply search filters if provided
-        search_query = self.request.query_params.get('search', '').strip()
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(abstract__icontains=search_query) |
-                Q(authors__icontains=search_query)
-            )
-        
-        # Filter by cluster if specified
-        cluster = self.request.query_params.get('cluster')
-        if cluster is not None:
-            try:
-                cluster_id = int(cluster)
-                queryset = queryset.filter(cluster=cluster_id)
-            except (ValueError, TypeError):
-                pass
-        
-        # Filter by year if specified
-        year = self.request.query_params.get('year')
-        if year is not None:
-            try:
-                year_int = int(year)
-                queryset = queryset.filter(year=year_int)
-            except (ValueError, TypeError):
-                pass
-        
-        # Filter by month if specified
-        month = self.request.query_params.get('month')
-        if month is not None:
-            queryset = queryset.filter(month__iexact=month)
-        
-        return queryset.order_by('-published_date', '-id')
-    
-    def get_cluster_stats(self):
-        """Get statistics about paper clusters."""
-        cache_key = 'cluster_stats'
-        stats = cache.get(cache_key)
-        
-        if stats is None:
-            stats = Paper.get_cluster_stats()
-            cache.set(cache_key, stats, 3600)  # Cache for 1 hour
-            
-        return stats
-    
-    def get_publication_timeline(self, queryset):
-        """Generate publication timeline data."""
-        timeline = list(
-            queryset.exclude(year__isnull=True, month__isnull=True)
-                   .values('year', 'month')
-                   .annotate(count=Count('id'))
-                   .order_by('year', 'month')
-        )
-        return timeline
-    
-    def get_category_distribution(self, queryset):
-        """Generate category distribution data."""
-        # This is a simplified example - adjust based on your category structure
-        categories = {}
-        for paper in queryset.only('categories').iterator(chunk_size=1000):
-            if paper.categories:
-                for cat in paper.categories.split(';'):
-                    cat = cat.strip()
-                    if cat:
-                        categories[cat] = categories.get(cat, 0) + 1
-        
-        return [{'category': k, 'count': v} 
-               for k, v in sorted(categories.items(), key=lambda x: -x[1])[:10]]
-    
-    def get_total_available_papers(self):
-        """Get the total number of papers available from ArXiv extraction logs."""
-        try:
-            import os
-            import glob
-            from pathlib import Path
-            
-            # Look for log files in the scripts/logs directory
-            logs_dir = Path(settings.BASE_DIR) / 'scripts' / 'logs'
-            print(f"Looking for logs in: {logs_dir}")
-            print(f"Logs dir exists: {logs_dir.exists()}")
-            
-            if not logs_dir.exists():
-                print(f"Logs directory does not exist: {logs_dir}")
-                return None
-            
-            # Find the most recent log file
-            log_files = glob.glob(str(logs_dir / 'arxiv_extractor_*.log'))
-            print(f"Found log files: {log_files}")
-            
-            if not log_files:
-                print("No log files found")
-                return None
-            
-            # Sort by modification time and get the most recent
-            latest_log = max(log_files, key=os.path.getmtime)
-            print(f"Latest log file: {latest_log}")
-            
-            total_available = 0
-            with open(latest_log, 'r') as f:
-                for line in f:
-                    if 'Got first page:' in line and 'total results' in line:
-                        print(f"Found line: {line.strip()}")
-                        # Extract the total number from lines like:
-                        # "Got first page: 100 of 12847 total results"
-                        try:
-                            parts = line.split('of')
-                            if len(parts) == 2:
-                                total_part = parts[1].strip().split()[0]
-                                total_available += int(total_part)
-                                print(f"Added {total_part} to total, now: {total_available}")
-                        except (ValueError, IndexError) as e:
-                            print(f"Error parsing line: {e}")
-                            continue
-            
-            print(f"Final total available: {total_available}")
-            return total_available if total_available > 0 else None
-            
-        except Exception as e:
-            print(f"Error reading total available papers from logs: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-    
-    def get_all_papers_for_clustering(self):
-        """Get all papers without pagination for clustering visualization."""
-        try:
-            # Get all papers without pagination
-            queryset = Paper.objects.all()
-            
-            # Apply search filters if provided
-            search_query = self.request.query_params.get('search', '').strip()
-            if search_query:
-                queryset = queryset.filter(
-                    Q(title__icontains=search_query) |
-                    Q(abstract__icontains=search_query) |
-                    Q(authors__icontains=search_query)
-                )
-            
-            # Filter by cluster if specified
-            cluster = self.request.query_params.get('cluster')
-            if cluster is not None:
-                try:
-                    cluster_id = int(cluster)
-                    queryset = queryset.filter(cluster=cluster_id)
-                except (ValueError, TypeError):
-                    pass
-            
-            # Filter by year if specified
-            year = self.request.query_params.get('year')
-            if year is not None:
-                try:
-                    year_int = int(year)
-                    queryset = queryset.filter(year=year_int)
-                except (ValueError, TypeError):
-                    pass
-            
-            # Filter by month if specified
-            month = self.request.query_params.get('month')
-            if month is not None:
-                queryset = queryset.filter(month__iexact=month)
-            
-            # Return all papers (not paginated)
-            papers = [self.get_serialized_paper(paper) for paper in queryset]
-            return papers
-            
-        except Exception as e:
-            print(f"Error getting all papers for clustering: {e}")
-            return []
-    
-    def get_serialized_paper(self, paper):
-        """Convert a Paper model instance to a serializable dict."""
-        return {
-            'id': paper.arxiv_id,
-            'title': paper.title,
-            'authors': paper.authors,
-            'abstract': paper.abstract,
-            'published': paper.published_date.isoformat() if paper.published_date else None,
-            'cluster': paper.cluster,
-            'cluster_label': f'Cluster {paper.cluster}' if paper.cluster is not None else 'Unclustered',
-            'url': paper.url,
-            'categories': paper.categories,
-            'Month': paper.month,
-            'Year': paper.year,
-            '_original': {
-                'Month': paper.month,
-                'Year': paper.year,
-                'published': paper.published_date.isoformat() if paper.published_date else None,
-                'categories': paper.categories,
-                'authors': paper.authors,
-                'title': paper.title,
-                'abstract': paper.abstract,
-                'url': paper.url,
-                'cluster': paper.cluster
-            }
-        }
-    
-    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
-    @method_decorator(vary_on_cookie)
-    def get(self, request):
-        """
-        Get paginated papers with optional filtering.
-        
-        Query Parameters:
-            page: Page number (default: 1)
-            page_size: Number of items per page (default: 20, max: 100)
-            search: Optional search query
-            cluster: Optional cluster ID to filter by
-            year: Optional year to filter by
-            month: Optional month to filter by
-        """
-        try:
-            # Check if this is a request for all papers (clustering)
-            is_clustering_request = 'all-for-clustering' in request.path
-            
-            if is_clustering_request:
-                # Return all papers without pagination for clustering
-                all_papers = self.get_all_papers_for_clustering()
-                return Response({
-                    'papers': all_papers,
-                    'total_count': len(all_papers),
-                    'is_clustering_data': True
-                })
-            
-            # Get base queryset with filters applied
-            queryset = self.get_queryset()
-            
-            # Get paginated results
-            paginator = self.pagination_class()
-            page = paginator.paginate_queryset(queryset, request)
-            
-            if page is not None:
-                # Serialize the page of papers
-                papers = [self.get_serialized_paper(paper) for paper in page]
-                
-                # Get cluster stats (cached)
-                cluster_stats = self.get_cluster_stats()
-                
-                # Get additional statistics
-                timeline_data = self.get_publication_timeline(queryset)
-                category_data = self.get_category_distribution(queryset)
-                
-                # Get total available papers from ArXiv extraction logs
-                total_available = self.get_total_available_papers()
-                
-                # Build response data
-                response_data = {
-                    'papers': papers,
-                    'clustering': {
-                        'available': True,
-                        'stats': {
-                            'total_papers': queryset.count(),
-                            'total_available_from_arxiv': total_available,
-                            'num_clusters': len(set(queryset.exclude(cluster__isnull=True)
-                                                 .values_list('cluster', flat=True))),
-                            'papers_per_cluster': cluster_stats
-                        },
-                        'source_file': 'database',
-                        'last_modified': Paper.objects.latest('updated_at').updated_at.timestamp()
-                    },
-                    'timeline': timeline_data,
-                    'categories': category_data
-                }
-                
-                # Add pagination info
-                response = paginator.get_paginated_response(response_data)
-                return response
-            
-            # If pagination is not used (shouldn't happen with our settings)
-            papers = [self.get_serialized_paper(paper) for paper in queryset]
-            
-            # Get total available papers from ArXiv extraction logs
-            total_available = self.get_total_available_papers()
-            
-            return Response({
-                'pagination': {
-                    'current_page': 1,
-                    'page_size': len(papers),
-                    'total_pages': 1,
-                    'total_items': len(papers),
-                    'has_next': False,
-                    'has_previous': False
-                },
-                'results': {
-                    'papers': papers,
-                    'clustering': {
-                        'available': True,
-                        'stats': {
-                            'total_available_from_arxiv': total_available
-                        },
-                        'source_file': 'database',
-                        'last_modified': Paper.objects.latest('updated_at').updated_at.timestamp()
-                    },
-                    'timeline': self.get_publication_timeline(queryset),
-                    'categories': self.get_category_distribution(queryset)
-                }
-            })
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return Response(
-                {'error': f'Failed to retrieve papers: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-
-
-class StandardResultsSetPagination(PageNumberPagination):
-    """Custom pagination class with configurable page size."""
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 1000
-
-    def get_paginated_response(self, data):
-        # Get total available papers from ArXiv extraction logs if available
-        total_available = None
-        if hasattr(data, 'get') and data.get('clustering', {}).get('stats', {}).get('total_available_from_arxiv'):
-            total_available = data['clustering']['stats']['total_available_from_arxiv']
-        
-        return Response({
-            'pagination': {
-                'current_page': self.page.number,
-                'page_size': self.page.paginator.per_page,
-                'total_pages': self.page.paginator.num_pages,
-                'total_items': self.page.paginator.count,
-                'total_available_from_arxiv': total_available,
-                'has_next': self.page.has_next(),
-                'has_previous': self.page.has_previous(),
-            },
-            'results': data
-        })
-
-
 class SearchTermsAPIView(APIView):
     """API endpoint for managing search terms."""
     @method_decorator(csrf_exempt, name='dispatch')
     def dispatch(self, request, *args, **kwargs):
         return super().dispatch(request, *args, **kwargs)
     
-    def get_config_path(self):
-        """Get the path to the config file."""
-        return Path(settings.BASE_DIR).parent / 'backend' / 'config.json'
-    
     @method_decorator(cache_page(60 * 15))  # Cache for 15 minutes
     def get(self, request):
-        """Get the current search terms from config.json"""
-        config_path = self.get_config_path()
-        try:
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return Response({
-                'must_include': config.get('must_include', []),
-                'optional_keywords': config.get('optional_keywords', [])
-            })
-        except FileNotFoundError:
-            # Return default values if config file doesn't exist
+        """Get the search terms of the most recent search"""
+        job = SearchJob.objects.only('query', 'optional_keywords', 'config').first()
+        if job is None:
             return Response({
                 'must_include': [],
                 'optional_keywords': []
             })
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to read config file: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        config = job.config or {}
+        return Response({
+            'must_include': config.get('must_include', [term for term in job.query.split(', ') if term]),
+            'optional_keywords': config.get(
+                'optional_keywords', [term for term in job.optional_keywords.split(', ') if term]
+            ),
+        })
     
     def clear(self, request):
         """
-        Clear the current search terms and reset the config.
-        This endpoint is called before setting new search terms to ensure a clean state.
+        Clear the current search terms.
+        Each search keeps its terms on its own SearchJob, so there is no shared
+        state to reset; the endpoint stays for clients that call it first.
         """
-        config_path = self.get_config_path()
-        try:
-            # Create or reset the config file with empty values
-            with open(config_path, 'w') as f:
-                json.dump({
-                    'must_include': [],
-                    'optional_keywords': []
-                }, f, indent=4)
-            
-            return Response({
-                'message': 'Search terms cleared successfully',
-                'must_include': [],
-                'optional_keywords': []
-            })
-            
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to clear search terms: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response({
+            'message': 'Search terms cleared successfully',
+            'must_include': [],
+            'optional_keywords': []
+        })
     
     def post(self, request):
         """
-        Update search terms in config.json and trigger data processing.
+        Queue a search with its own terms and trigger data processing.
         Expected request data: {
             "search_terms": ["term1", "term2", ...],
-            "keywords": ["keyword1", "keyword2", ...]  # optional
+            "keywords": ["keyword1", "keyword2", ...],  # optional
+            "start_date": "YYYY-MM-DD",  # optional, default one year ago
+            "end_date": "YYYY-MM-DD",  # optional, default today
+            "parameters": {"max_papers": 200, "clustering_mode": "kmeans", ...}  # optional
         }
         """
-        config_path = self.get_config_path()
-        search_terms = request.data.get('search_terms', [])
-        keywords = request.data.get('keywords', [])
+        try:
+            config = search_config(
+                request.data.get('search_terms', []),
+                request.data.get('keywords', []),
+                start_date=request.data.get('start_date'),
+                end_date=request.data.get('end_date'),
+                parameters=request.data.get('parameters'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not config['must_include']:
+            return Response(
+                {'error': 'At least one search term is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
-            # Read current config or create a new one if it doesn't exist
-            if config_path.exists():
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
-            else:
-                config = {}
-            
-            # Update must_include terms if provided
-            if search_terms:
-                config['must_include'] = search_terms
-                
-            # Update optional keywords if provided
-            if keywords:
-                config['optional_keywords'] = keywords if isinstance(keywords, list) else [keywords]
-            
-            # Save updated config
-            with open(config_path, 'w') as f:
-                json.dump(config, f, indent=4)
-            
-            # Define the path to the script
-            script_path = Path(settings.BASE_DIR).parent / 'backend' / 'scripts' / 'arxiv_kmeans_sbert_umap.py'
-            scripts_dir = script_path.parent
-            cache_dir = Path(settings.BASE_DIR) / '.cache'
-            mpl_cache_dir = cache_dir / 'matplotlib'
-            hf_cache_dir = cache_dir / 'huggingface'
-
-            # Ensure local cache directories exist (avoid home dir permissions)
-            os.makedirs(mpl_cache_dir, exist_ok=True)
-            os.makedirs(hf_cache_dir, exist_ok=True)
-            
             # Optionally skip heavy processing on low-memory environments
             if os.environ.get("LITE_DISABLE_PROCESSING", "0") == "1":
                 return Response({
-                    'message': 'Search terms updated (processing disabled by LITE_DISABLE_PROCESSING).'
+                    'message': 'Search not queued (processing disabled by LITE_DISABLE_PROCESSING).'
                 })
 
-            # Run the arxiv extractor script asynchronously so the request
-            # returns immediately and the frontend can poll for results.
-            try:
-                env = os.environ.copy()
-                env.setdefault('MPLCONFIGDIR', str(mpl_cache_dir))
-                env.setdefault('HF_HOME', str(hf_cache_dir))
-                env.setdefault('TRANSFORMERS_CACHE', str(hf_cache_dir))
-                env.setdefault('HF_HUB_CACHE', str(hf_cache_dir))
-                env.setdefault('HF_HUB_DISABLE_XET', '1')
-                env.setdefault('ARXIV_EXTRACTOR_BASE_DIR', str(scripts_dir))
-                env.setdefault('KMP_USE_SHM', '0')
-                env.setdefault('OMP_NUM_THREADS', '1')
-                env.setdefault('NUMBA_NUM_THREADS', '1')
-                env.setdefault('NUMBA_THREADING_LAYER', 'workqueue')
-                env.setdefault('PYTHONUNBUFFERED', '1')
-
-                # Default to low-memory mode on Render unless explicitly overridden
-                if env.get('RENDER') or env.get('RENDER_SERVICE_ID'):
-                    env.setdefault('LITE_DISABLE_EMBEDDINGS', '1')
-                    env.setdefault('LITE_MAX_PAPERS', '50')
-                    env.setdefault('LITE_DISABLE_PROCESSING', '1')
-
-                # Launch the script in the background (non-blocking)
-                subprocess.Popen(
-                    [sys.executable, str(script_path)],
-                    cwd=str(scripts_dir),
-                    env=env,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                )
-
+            # Identical searches share one run: hand back a recent result or
+            # the job already working on it instead of starting another.
+            fingerprint, components = search_fingerprint(
+                config['must_include'],
+                config['optional_keywords'],
+                config['start_date'],
+                config['end_date'],
+                fingerprint_settings(overrides=config['parameters']),
+            )
+            job, how = find_reusable_job(fingerprint)
+            if job is None:
+                # Admission control: the worker pool runs a fixed number of
+                # jobs, so refuse new work instead of letting the queue grow.
+                if queue_is_full():
+                    response = Response(
+                        {'error': 'Search queue is full, try again shortly.', **queue_stats()},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    )
+                    response['Retry-After'] = os.environ.get('LITE_QUEUE_RETRY_AFTER', '30')
+                    return response
+                job, created = create_search_job(config, fingerprint, components)
+                how = None if created else 'attached'
+            if how == 'reused':
                 return Response({
-                    'message': 'Search started. Processing papers in background — poll /api/papers/ for results.',
-                    'status': 'processing'
+                    'message': f'Identical search completed recently — results are in SearchJob {job.id}.',
+                    **describe_job(job, how),
+                })
+            if how == 'attached':
+                return Response({
+                    'message': f'Identical search already running — attached to SearchJob {job.id}.',
+                    **describe_job(job, how),
                 })
 
-            except Exception as e:
-                return Response(
-                    {
-                        'message': 'Config updated but failed to start background script',
-                        'error': str(e)
-                    },
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-                
+            # The pipeline worker pool (scripts/pipeline_worker.py) claims
+            # queued jobs from the database in order.
+            return Response(
+                {
+                    'message': f'Search queued as SearchJob {job.id}.',
+                    **describe_job(job),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
         except Exception as e:
             return Response(
-                {'error': f'Failed to update config: {str(e)}'}, 
+                {'error': f'Failed to queue search: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
-class PapersAPIView(APIView):
-    def get_database_papers_data(self):
-        latest_job = SearchJob.objects.filter(status='completed').order_by('-created_at').first()
-        if not latest_job:
-            return []
-
-        assignments = (
-            PaperTopic.objects
-            .filter(search_job=latest_job)
-            .select_related('paper', 'topic')
-            .order_by('-paper__published_date', 'paper__title')
+class PipelineWorkerStatusView(APIView):
+    """Report whether the pipeline worker pool is up, its startup cost and the job queue."""
+
+    def get(self, request):
+        worker_status = get_worker_status()
+        if worker_status is None:
+            return Response(
+                {'status': 'unavailable', **queue_stats()},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(worker_status)
+
+
+class JobProfileView(APIView):
+    """Per-stage wall time, CPU time, item counts and peak RSS recorded for one SearchJob."""
+
+    def get(self, request, job_id):
+        job = SearchJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({'error': f'SearchJob {job_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+        metadata = job.metadata or {}
+        return Response({
+            'job_id': job.id,
+            'status': job.status,
+            'processing_seconds': job.processing_seconds,
+            'papers_matched': job.papers_matched,
+            'startup': metadata.get('startup'),
+            'encode': (metadata.get('embedding_cache') or {}).get('encode'),
+            'profile': metadata.get('profile'),
+        })
+
+
+_sse_streams_lock = threading.Lock()
+_sse_streams = 0
+
+
+def acquire_sse_stream():
+    """Reserve one of this process's LITE_SSE_MAX_STREAMS (default 2) stream slots; False when all are taken."""
+    global _sse_streams
+    with _sse_streams_lock:
+        if _sse_streams >= int(os.environ.get('LITE_SSE_MAX_STREAMS', '2')):
+            return False
+        _sse_streams += 1
+        return True
+
+
+def release_sse_stream():
+    global _sse_streams
+    with _sse_streams_lock:
+        _sse_streams = max(0, _sse_streams - 1)
+
+
+class EventStream:
+    """Iterator over an event generator that frees its stream slot once, when the response is closed."""
+
+    def __init__(self, events):
+        self.events = events
+        self.released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.events)
+
+    def close(self):
+        try:
+            self.events.close()
+        finally:
+            if not self.released:
+                self.released = True
+                release_sse_stream()
+
+
+def format_sse(event_id, event, data):
+    """One server-sent event frame."""
+    frame = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    return f"id: {event_id}\n{frame}" if event_id is not None else frame
+
+
+class JobEventsView(View):
+    """
+    Stream a SearchJob's progress as server-sent events.
+
+    Replays stored events after Last-Event-ID, then follows new ones until the
+    job's final "completed" or "failed" event. Streams are closed after
+    LITE_SSE_MAX_SECONDS (default 30); EventSource reconnects with
+    Last-Event-ID and resumes where it stopped.
+
+    An open stream holds one of the web worker's threads, so each process
+    serves at most LITE_SSE_MAX_STREAMS at once and answers 503 with
+    Retry-After beyond that, leaving the other threads to the rest of the API.
+    """
+    terminal_events = ('completed', 'failed')
+
+    def get(self, request, job_id):
+        if not SearchJob.objects.filter(pk=job_id).exists():
+            return JsonResponse({'error': f'SearchJob {job_id} not found'}, status=404)
+        last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0
+        try:
+            last_id = int(last_id)
+        except ValueError:
+            last_id = 0
+        if not acquire_sse_stream():
+            response = JsonResponse({'error': 'Too many open event streams; retry shortly'}, status=503)
+            response['Retry-After'] = '5'
+            return response
+        response = StreamingHttpResponse(EventStream(self.stream(job_id, last_id)), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def stream(self, job_id, last_id):
+        poll_seconds = float(os.environ.get('LITE_SSE_POLL_SECONDS', '0.5'))
+        deadline = time.monotonic() + float(os.environ.get('LITE_SSE_MAX_SECONDS', '30'))
+        heartbeat_at = time.monotonic() + 15
+        yield 'retry: 3000\n\n'
+        while True:
+            events = list(
+                SearchJobEvent.objects.filter(search_job_id=job_id, id__gt=last_id).order_by('id')[:200]
+            )
+            for event in events:
+                last_id = event.id
+                yield format_sse(event.id, event.event, {**event.data, 'job_id': job_id})
+                if event.event in self.terminal_events:
+                    return
+            if events:
+                continue
+
+            job = SearchJob.objects.filter(pk=job_id).first()
+            # Jobs finished without events (imports, runs before events existed)
+            # get a synthesized final event once they have been idle a while.
+            if job is None or (
+                job.status in self.terminal_events
+                and (timezone.now() - job.updated_at).total_seconds() > 10
+            ):
+                status_name = job.status if job else 'failed'
+                yield format_sse(None, status_name, {
+                    'job_id': job_id,
+                    'status': status_name,
+                    'papers_scanned': job.papers_scanned if job else 0,
+                    'papers_matched': job.papers_matched if job else 0,
+                    'topics_found': job.topics_found if job else 0,
+                    'error': job.error_message if job else 'SearchJob was deleted',
+                })
+                return
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if now >= heartbeat_at:
+                heartbeat_at = now + 15
+                yield ': keep-alive\n\n'
+            time.sleep(poll_seconds)
+
+
+def paper_summary(paper):
+    """Fields of a paper shown in search and related-paper results."""
+    return {
+        'id': paper.arxiv_id,
+        'title': paper.title,
+        'authors': paper.authors,
+        'abstract': paper.abstract,
+        'published': paper.published_date.isoformat() if paper.published_date else '',
+        'url': paper.url,
+        'categories': paper.categories,
+        'Month': paper.month,
+        'Year': paper.year,
+    }
+
+
+class SemanticSearchView(APIView):
+    """
+    Papers closest in meaning to a free-text query.
+
+    GET /api/papers/semantic/?q=...&k=20 with optional job, topic (Topic id),
+    year and category filters. Results carry a cosine similarity `score`; with
+    a job filter they also carry the paper's topic in that job. On a large
+    corpus `nprobe` trades recall for latency, and nprobe=0 searches exactly.
+    """
+    max_results = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = min(max(int(request.query_params.get('k', 20)), 1), self.max_results)
+            filters = {
+                name: int(request.query_params[name])
+                for name in ('job', 'topic', 'year', 'nprobe')
+                if request.query_params.get(name, '').strip()
+            }
+        except ValueError:
+            return Response({'error': 'k, job, topic, year and nprobe must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        filters['category'] = request.query_params.get('category', '').strip() or None
+
+        started = time.perf_counter()
+        try:
+            matches, info = semantic_search(query, k, **filters)
+        except SemanticSearchUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        papers = Paper.objects.in_bulk([paper_id for paper_id, _ in matches])
+        assignments = {}
+        if 'job' in filters:
+            assignments = {
+                assignment.paper_id: assignment
+                for assignment in PaperTopic.objects.filter(
+                    search_job_id=filters['job'], paper_id__in=papers
+                ).select_related('topic')
+            }
+        results = []
+        for paper_id, score in matches:
+            paper = papers.get(paper_id)
+            if paper is None:
+                continue
+            result = {**paper_summary(paper), 'score': round(score, 6)}
+            assignment = assignments.get(paper_id)
+            if assignment is not None:
+                result.update({
+                    'cluster': assignment.topic.cluster_id,
+                    'topic_label': assignment.topic.label,
+                    'topic_confidence': assignment.confidence,
+                })
+            results.append(result)
+        return Response({
+            'query': query,
+            'model': info['model'],
+            'indexed_papers': info['indexed_papers'],
+            'mode': info['mode'],
+            'nprobe': info['nprobe'],
+            'took_ms': round((time.perf_counter() - started) * 1000, 2),
+            'results': results,
+        })
+
+
+
+class RelatedPapersView(APIView):
+    """
+    Precomputed nearest neighbours of one paper.
+
+    GET /api/papers/<arxiv_id>/related/?k=10 ranks across every indexed
+    paper; with job=<id> it ranks among that search's papers. Rows come from
+    RelatedPaper in one indexed query.
+    """
+    def get(self, request, arxiv_id):
+        try:
+            k = min(max(int(request.query_params.get('k', 10)), 1), 100)
+            job = request.query_params.get('job', '').strip()
+            job = int(job) if job else None
+        except ValueError:
+            return Response({'error': 'k and job must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        scope = {'search_job_id': job} if job is not None else {'search_job__isnull': True}
+        rows = list(
+            RelatedPaper.objects.filter(paper__arxiv_id=arxiv_id, **scope)
+            .select_related('related')
+            .order_by('rank')[:k]
         )
-        papers = []
-        for assignment in assignments:
-            paper = assignment.paper
-            topic = assignment.topic
-            papers.append({
-                'id': paper.arxiv_id,
-                'title': paper.title,
-                'authors': paper.authors,
-                'abstract': paper.abstract,
-                'published': paper.published_date.isoformat() if paper.published_date else '',
-                'cluster': topic.cluster_id,
-                'cluster_label': topic.label,
-                'topic_label': topic.label,
+        if not rows and not Paper.objects.filter(arxiv_id=arxiv_id).exists():
+            return Response({'error': f'Paper {arxiv_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'id': arxiv_id,
+            'scope': 'job' if job is not None else 'global',
+            'job_id': job,
+            'results': [{**paper_summary(row.related), 'score': round(row.score, 6)} for row in rows],
+        })
+
+# Parsed CSV and clustering results shared by every request in this process:
+# one entry per source kind, keyed by CSV (path, mtime, size) or by SearchJob.
+_results_cache = {}
+_results_cache_lock = threading.Lock()
+
+
+def cached_results(key, load):
+    """Return the cached (results, error) for `key`, calling `load()` once when the key changes."""
+    kind = key[0]
+    with _results_cache_lock:
+        cached = _results_cache.get(kind)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    value = load()
+    if value[0] is not None:
+        with _results_cache_lock:
+            _results_cache[kind] = (key, value)
+    return value
+
+
+def parse_clustering_csv(path, last_modified):
+    """Read a clustering CSV into per-cluster stats and a lower-cased title index."""
+    match = re.search(r'kmeans_k(\d+)_', path.name)
+    num_clusters = int(match.group(1)) if match else 0
+    by_title = {}
+    cluster_counts = {}
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    title = (row.get('Title') or '').strip()
+                    cluster_id = int(float(row.get('Cluster') or -1))
+                except ValueError as e:
+                    logger.warning("Skipping clustering row in %s: %s", path.name, e)
+                    continue
+                cluster_counts[cluster_id] = cluster_counts.get(cluster_id, 0) + 1
+                by_title[title.lower()] = {
+                    'cluster': cluster_id,
+                    'authors': (row.get('Authors') or '').strip(),
+                    'url': f"https://arxiv.org/abs/{row.get('id', '')}" if 'id' in row else ''
+                }
+    except Exception as e:
+        logger.exception("Error reading clustering results from %s", path)
+        return None, f'Error reading clustering results: {str(e)}'
+
+    total = sum(cluster_counts.values())
+    return {
+        'by_title': by_title,
+        'stats': {
+            'total_papers': total,
+            'num_clusters': num_clusters,
+            'papers_per_cluster': cluster_counts,
+            'source_file': path.name
+        } if total else {},
+        'source_file': path.name,
+        'last_modified': last_modified
+    }, None
+
+
+def job_clustering_results(job, aggregates):
+    """Clustering stats for a completed SearchJob from its precomputed aggregates; its papers already carry their topics."""
+    return {
+        'by_title': {},
+        'stats': aggregates.cluster_stats(),
+        'source_file': 'database',
+        'last_modified': job.updated_at.timestamp()
+    }
+
+
+def encode_papers_cursor(published_date, paper_id):
+    """Opaque cursor for the papers endpoint: the (published_date, paper id) of a page's last row."""
+    position = [published_date.isoformat() if published_date else None, paper_id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_papers_cursor(cursor):
+    """Inverse of encode_papers_cursor; raises ValueError for a malformed cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published, paper_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return (datetime.strptime(published, '%Y-%m-%d').date() if published else None), int(paper_id)
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise ValueError('Invalid cursor') from None
+
+
+class PapersAPIView(APIView):
+    def get_filters(self, request):
+        """The request's cluster, year and month filters as {'cluster', 'year', 'month'}; None when absent."""
+        cluster = request.query_params.get('cluster', '').strip()
+        year = request.query_params.get('year', '').strip()
+        month = request.query_params.get('month', '').strip()
+        return {
+            'cluster': int(cluster) if cluster else None,
+            'year': int(year) if year else None,
+            'month': month or None,
+        }
+
+    def get_aggregates(self, job):
+        """The job's precomputed totals, timeline and categories, cached for the life of the process."""
+        key = ('aggregates', job.id, job.updated_at)
+        return cached_results(key, lambda: (job_aggregates(job), None))[0]
+
+    def get_database_papers_queryset(self, job, request):
+        """
+        The job's paper assignments with the request's filters applied, newest
+        first, or most relevant first for a full-text search. Returns
+        (queryset, ranked).
+        """
+        queryset = PaperTopic.objects.filter(search_job=job).select_related('paper', 'topic')
+
+        filters = self.get_filters(request)
+        if filters['cluster'] is not None:
+            queryset = queryset.filter(topic__cluster_id=filters['cluster'])
+        if filters['year'] is not None:
+            queryset = queryset.filter(paper__year=filters['year'])
+        if filters['month']:
+            queryset = queryset.filter(paper__month__iexact=filters['month'])
+        ordering = [F('published_date').desc(nulls_last=True), '-paper_id']
+        ranked = False
+        search_query = request.query_params.get('search', '').strip()
+        if search_query:
+            queryset, ranked = search_queryset(
+                queryset, search_query, paper_field='paper_id', search_job_id=job.id
+            )
+            if ranked:
+                ordering.insert(0, '-search_rank')
+        # Without a search, (published_date, paper) matches the PaperTopic
+        # index, so pages are read in index order instead of sorting the job.
+        return queryset.order_by(*ordering), ranked
+
+    def serialize_assignment(self, assignment, job):
+        paper = assignment.paper
+        topic = assignment.topic
+        return {
+            'id': paper.arxiv_id,
+            'title': paper.title,
+            'authors': paper.authors,
+            'abstract': paper.abstract,
+            'published': paper.published_date.isoformat() if paper.published_date else '',
+            'cluster': topic.cluster_id,
+            'cluster_label': topic.label,
+            'topic_label': topic.label,
+            'topic_keywords': topic.keywords,
+            'topic_confidence': assignment.confidence,
+            'url': paper.url,
+            'categories': paper.categories,
+            'Month': paper.month,
+            'Year': paper.year,
+            '_original': {
+                'source': 'database',
+                'search_job_id': job.id,
+                'topic_id': topic.id,
                 'topic_keywords': topic.keywords,
                 'topic_confidence': assignment.confidence,
-                'url': paper.url,
-                'categories': paper.categories,
-                'Month': paper.month,
-                'Year': paper.year,
-                '_original': {
-                    'source': 'database',
-                    'search_job_id': latest_job.id,
-                    'topic_id': topic.id,
-                    'topic_keywords': topic.keywords,
-                    'topic_confidence': assignment.confidence,
-                }
-            })
-        return papers
+            }
+        }
+
+    def get_database_page(self, job, request, page, page_size):
+        """
+        One page of the job's papers, filtered, ordered and sliced in SQL.
+
+        With `cursor` (from a previous page's next_cursor) the page is read by
+        keyset on (published_date, paper id), so its cost does not depend on how
+        deep into the results it is, and no total is returned. Without it, `page`
+        selects the page by offset; the total comes from the job's aggregates,
+        and is only counted in SQL for a search. Search results are ordered by
+        relevance, carry highlights and page by `page` only.
+        """
+        queryset, ranked = self.get_database_papers_queryset(job, request)
+        cursor = request.query_params.get('cursor', '').strip()
+        total = None
+        if cursor and ranked:
+            raise ValueError('Search results are ranked by relevance; page them with page, not cursor')
+        if cursor:
+            published, paper_id = decode_papers_cursor(cursor)
+            if published is None:
+                after = Q(published_date__isnull=True, paper_id__lt=paper_id)
+            else:
+                after = (
+                    Q(published_date__lt=published) |
+                    Q(published_date=published, paper_id__lt=paper_id) |
+                    Q(published_date__isnull=True)
+                )
+            rows = list(queryset.filter(after)[:page_size + 1])
+        else:
+            search_query = request.query_params.get('search', '').strip()
+            total = queryset.count() if search_query else self.get_aggregates(job).count(**self.get_filters(request))
+            start = (page - 1) * page_size
+            rows = list(queryset[start:start + page_size + 1])
+
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        last = rows[-1] if rows else None
+        pagination = {
+            'current_page': None if cursor else page,
+            'page_size': page_size,
+            'total_pages': None if total is None else max(1, (total + page_size - 1) // page_size),
+            'total_items': total,
+            'has_next': has_next,
+            'has_previous': bool(cursor) or page > 1,
+            'next_cursor': encode_papers_cursor(last.published_date, last.paper_id) if has_next and not ranked else None,
+        }
+        papers = [self.serialize_assignment(row, job) for row in rows]
+        search_query = request.query_params.get('search', '').strip()
+        if search_query:
+            marked = highlights(search_query, [row.paper_id for row in rows])
+            for row, paper in zip(rows, papers):
+                paper['highlight'] = marked.get(row.paper_id)
+        return papers, pagination
+
+    def get_clustering_results(self, job=None):
+        """
+        Clustering results for the papers response, cached for the life of the process.
+
+        For a completed SearchJob they come from its precomputed aggregates, cached by job id.
+        Otherwise the newest clustering CSV in backend/out is parsed once and
+        cached until its modification time or size changes. Results carry a
+        `by_title` index for merging cluster data into papers.
+        """
+        if job is not None:
+            key = ('job', job.id, job.updated_at)
+            return cached_results(key, lambda: (job_clustering_results(job, self.get_aggregates(job)), None))
 
-    def get_clustering_results(self):
-        """Helper method to get clustering results from CSV"""
         output_dir = Path(settings.BASE_DIR).parent / 'backend' / 'out'
         clustering_files = list(output_dir.glob('arxiv_with_authors_kmeans_*.csv'))
         
@@ -606,63 +668,14 @@ class PapersAPIView(APIView):
             latest_file = max(clustering_files, key=os.path.getmtime)
         
         try:
-            import pandas as pd
-            # Read the clustering results CSV
-            df = pd.read_csv(latest_file)
-            
-            # Extract the number of clusters from the filename
-            import re
-            match = re.search(r'kmeans_k(\d+)_', latest_file.name)
-            num_clusters = int(match.group(1)) if match else 0
-            
-            # Convert to list of dicts and clean the data
-            clustering_data = []
-            for _, row in df.iterrows():
-                try:
-                    clustering_data.append({
-                        'title': row.get('Title', '').strip(),
-                        'abstract': row.get('Abstract', '').strip(),
-                        'authors': row.get('Authors', '').strip(),
-                        'cluster': int(row.get('Cluster', -1)),
-                        'url': f"https://arxiv.org/abs/{row.get('id', '')}" if 'id' in row else ''
-                    })
-                except Exception as e:
-                    print(f"Error processing clustering row: {e}")
-                    continue
-            
-            # Get cluster statistics
-            cluster_stats = {}
-            if clustering_data:
-                cluster_counts = {}
-                for item in clustering_data:
-                    cluster_id = item['cluster']
-                    cluster_counts[cluster_id] = cluster_counts.get(cluster_id, 0) + 1
-                
-                cluster_stats = {
-                    'total_papers': len(clustering_data),
-                    'num_clusters': num_clusters,
-                    'papers_per_cluster': cluster_counts,
-                    'source_file': latest_file.name
-                }
-            
-            return {
-                'data': clustering_data,
-                'stats': cluster_stats,
-                'source_file': latest_file.name,
-                'last_modified': os.path.getmtime(latest_file)
-            }, None
-            
-        except Exception as e:
-            import traceback
-            print(f"Error in get_clustering_results: {str(e)}\n{traceback.format_exc()}")
+            file_stat = latest_file.stat()
+        except OSError as e:
             return None, f'Error reading clustering results: {str(e)}'
+        key = ('csv', str(latest_file), file_stat.st_mtime_ns, file_stat.st_size)
+        return cached_results(key, lambda: parse_clustering_csv(latest_file, file_stat.st_mtime))
     
     def get_papers_data(self):
         """Helper method to get papers data from CSV files"""
-        database_papers = self.get_database_papers_data()
-        if database_papers:
-            return database_papers, None
-
         # Define all possible output directories to check
         possible_dirs = [
             Path(settings.BASE_DIR).parent / 'backend' / 'scripts' / 'out',  # Current location
@@ -672,20 +685,16 @@ class PapersAPIView(APIView):
             Path(settings.BASE_DIR).parent / 'backend' / 'scripts' / 'output' # Another possible location
         ]
         
-        papers = []
         output_dir = None
         
-        # Debug: Print all directories being checked
-        print("Checking for CSV files in the following directories:")
-        for i, dir_path in enumerate(possible_dirs, 1):
+        for dir_path in possible_dirs:
             exists = dir_path.exists()
             has_csv = any(dir_path.glob('*.csv')) if exists else False
-            print(f"{i}. {dir_path} - Exists: {exists}, Has CSV: {has_csv}")
+            logger.debug("CSV directory %s - exists: %s, has CSV: %s", dir_path, exists, has_csv)
             
             if exists and not output_dir:  # Only set output_dir once
                 if has_csv:
                     output_dir = dir_path
-                    print(f"Found CSV files in: {output_dir}")
         
         if not output_dir:
             # If no directory with CSVs found, try to create the default directory
@@ -693,215 +702,143 @@ class PapersAPIView(APIView):
             try:
                 default_dir.mkdir(parents=True, exist_ok=True)
                 output_dir = default_dir
-                print(f"Created and using default directory: {output_dir}")
+                logger.info("Created default output directory %s", output_dir)
             except Exception as e:
                 error_msg = f'No valid output directory found with CSV files and could not create default directory: {str(e)}'
-                print(error_msg)
+                logger.error(error_msg)
                 return [], error_msg
         
-        print(f"Using output directory: {output_dir}")
+        logger.debug("Using output directory %s", output_dir)
         
         # Look for the most recent summary or clustering CSV file
         try:
             # First try to find summary files
             summary_files = list(output_dir.glob('*summary*.csv'))
-            print(f"Found {len(summary_files)} summary files")
             
             # If no summary files, look for clustering files
             if not summary_files:
-                print("No summary files found, looking for clustering files")
                 summary_files = list(output_dir.glob('*topics*.csv')) + list(output_dir.glob('*kmeans*.csv'))
-                print(f"Found {len(summary_files)} clustering files")
                 
                 # If still no files, look for any CSV files
                 if not summary_files:
-                    print("No clustering files found, looking for any CSV files")
                     summary_files = list(output_dir.glob('*.csv'))
-                    print(f"Found {len(summary_files)} CSV files")
                     
                     if not summary_files:
-                        # List all files in the directory for debugging
-                        all_files = list(output_dir.glob('*'))
-                        print(f"All files in {output_dir}:")
-                        for f in all_files:
-                            print(f"- {f.name} (size: {f.stat().st_size} bytes, modified: {f.stat().st_mtime})")
-                        
                         error_msg = f'No CSV files found in {output_dir}.'
-                        print(error_msg)
+                        logger.warning(error_msg)
                         return [], error_msg
             
             # Sort files by modification time (newest first)
             summary_files = sorted(summary_files, key=os.path.getmtime, reverse=True)
-            print(f"Using file: {summary_files[0]}")
+            logger.debug("Using papers CSV %s", summary_files[0])
             
-            try:
-                import pandas as pd
-                print(f"Reading CSV file: {summary_files[0]}")
-                df = pd.read_csv(summary_files[0])
-                
-                if df.empty:
-                    error_msg = f'CSV file {summary_files[0]} is empty.'
-                    print(error_msg)
-                    return [], error_msg
-                
-                # Convert DataFrame to list of dicts with appropriate field mapping
-                papers = []
-                print(f"Processing {len(df)} papers from {summary_files[0].name}")
-                
-                # Get all column names for debugging
-                all_columns = df.columns.tolist()
-                print(f"Available columns in CSV: {all_columns}")
-                
-                for idx, row in df.iterrows():
-                    try:
-                        # Extract data with fallbacks for different column naming conventions
-                        paper_id = str(row.get('id', row.get('ID', row.get('paper_id', str(idx)))))
-                        title = row.get('Title', row.get('title', 'Untitled'))
-                        if pd.isna(title):
-                            title = 'Untitled'
-                        
-                        # Try to extract abstract from various possible column names
-                        abstract = ''
-                        possible_abstract_columns = ['Abstract', 'abstract', 'Summary', 'summary', 'paper_abstract', 'Abstract_processed']
-                        
-                        for col in possible_abstract_columns:
-                            if col in row and pd.notna(row[col]) and str(row[col]).strip():
-                                abstract = str(row[col]).strip()
-                                if len(abstract) > 0:
-                                    break
-                        
-                        # Extract Month and Year from the row if available
-                        month = row.get('Month', row.get('month', None))
-                        year = row.get('Year', row.get('year', None))
-                        
-                        # If Month/Year not directly available, try to extract from published date
-                        published_date = row.get('Published', row.get('published', row.get('Date', '')))
-                        if pd.notna(published_date) and (month is None or year is None):
-                            try:
-                                from datetime import datetime
-                                date_obj = datetime.strptime(str(published_date), '%Y-%m-%d')
-                                if month is None:
-                                    month = date_obj.strftime('%B')  # Full month name
-                                if year is None:
-                                    year = date_obj.year
-                            except (ValueError, AttributeError):
-                                pass
-                        
-                        cluster_value = row.get('Cluster', row.get('cluster', -1))
-                        topic_label = row.get('Topic Label', row.get('topic_label', None))
-                        topic_keywords = row.get('Topic Keywords', row.get('topic_keywords', ''))
-                        topic_confidence = row.get('Topic Confidence', row.get('topic_confidence', None))
-
-                        paper = {
-                            'id': paper_id,
-                            'title': title,
-                            'authors': row.get('Authors', row.get('authors', 'Unknown Author')),
-                            'abstract': abstract,
-                            'published': published_date,
-                            'cluster': int(float(cluster_value)),
-                            'cluster_label': str(topic_label).strip() if topic_label and pd.notna(topic_label) else f"Cluster {cluster_value}",
-                            'topic_label': str(topic_label).strip() if topic_label and pd.notna(topic_label) else f"Cluster {cluster_value}",
-                            'topic_keywords': str(topic_keywords).strip() if topic_keywords and pd.notna(topic_keywords) else '',
-                            'topic_confidence': float(topic_confidence) if topic_confidence and pd.notna(topic_confidence) else None,
-                            'url': f"https://arxiv.org/abs/{paper_id}" if 'id' in row or 'ID' in row else '#',
-                            'categories': row.get('Categories', row.get('categories', '')),
-                            'Month': month,
-                            'Year': year,
-                            '_original': {col: str(row[col]) for col in df.columns if pd.notna(row[col]) and str(row[col]).strip()}
-                        }
-                        
-                        # Clean string fields
-                        for key in ['title', 'authors', 'abstract', 'published', 'categories']:
-                            if key in paper and paper[key] is not None:
-                                paper[key] = str(paper[key]).strip()
-                        
-                        papers.append(paper)
-                        
-                    except Exception as e:
-                        print(f"Error processing row {idx}: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
-                        continue
-                
-                print(f"Successfully processed {len(papers)} papers")
-                if papers:
-                    print(f"First paper: {papers[0]['title']}")
-                    print(f"Abstract preview: {papers[0]['abstract'][:100]}..." if papers[0]['abstract'] else "No abstract available")
-                
-                return papers, None
-                
-            except Exception as e:
-                error_msg = f'Error reading or processing CSV file {summary_files[0]}: {str(e)}'
-                print(error_msg)
-                import traceback
-                traceback.print_exc()
-                return [], error_msg
-                
+            path = summary_files[0]
+            file_stat = path.stat()
+            key = ('papers_csv', str(path), file_stat.st_mtime_ns, file_stat.st_size)
+            return cached_results(key, lambda: self.read_papers_csv(path))
+
         except Exception as e:
             error_msg = f'Error in get_papers_data: {str(e)}'
-            print(error_msg)
-            import traceback
-            traceback.print_exc()
+            logger.exception(error_msg)
             return [], error_msg
-            
-        # If we get here, we couldn't find or process any files
-        return [], 'No valid paper data found in any CSV files'
-                
-        return papers, None
     
-    def get_total_available_papers(self):
-        """Get the total number of papers available from ArXiv extraction logs."""
+    def read_papers_csv(self, path):
+        """Parse one exported CSV into paper dicts; returns (papers, error)."""
         try:
-            import os
-            import glob
-            from pathlib import Path
-            
-            # Look for log files in the scripts/logs directory
-            logs_dir = Path(settings.BASE_DIR) / 'scripts' / 'logs'
-            print(f"Looking for logs in: {logs_dir}")
-            print(f"Logs dir exists: {logs_dir.exists()}")
-            
-            if not logs_dir.exists():
-                print(f"Logs directory does not exist: {logs_dir}")
-                return None
-            
-            # Find the most recent log file
-            log_files = glob.glob(str(logs_dir / 'arxiv_extractor_*.log'))
-            print(f"Found log files: {log_files}")
-            
-            if not log_files:
-                print("No log files found")
-                return None
-            
-            # Sort by modification time and get the most recent
-            latest_log = max(log_files, key=os.path.getmtime)
-            print(f"Latest log file: {latest_log}")
-            
-            total_available = 0
-            with open(latest_log, 'r') as f:
-                for line in f:
-                    if 'Got first page:' in line and 'total results' in line:
-                        print(f"Found line: {line.strip()}")
-                        # Extract the total number from lines like:
-                        # "Got first page: 100 of 381 total results"
+            import pandas as pd
+            logger.info("Reading papers CSV %s", path)
+            df = pd.read_csv(path)
+
+            if df.empty:
+                error_msg = f'CSV file {path} is empty.'
+                logger.warning(error_msg)
+                return [], error_msg
+
+            # Convert DataFrame to list of dicts with appropriate field mapping
+            papers = []
+            logger.debug("Processing %d papers from %s, columns: %s", len(df), path.name, df.columns.tolist())
+
+            for idx, row in df.iterrows():
+                try:
+                    # Extract data with fallbacks for different column naming conventions
+                    paper_id = str(row.get('id', row.get('ID', row.get('paper_id', str(idx)))))
+                    title = row.get('Title', row.get('title', 'Untitled'))
+                    if pd.isna(title):
+                        title = 'Untitled'
+
+                    # Try to extract abstract from various possible column names
+                    abstract = ''
+                    possible_abstract_columns = ['Abstract', 'abstract', 'Summary', 'summary', 'paper_abstract', 'Abstract_processed']
+
+                    for col in possible_abstract_columns:
+                        if col in row and pd.notna(row[col]) and str(row[col]).strip():
+                            abstract = str(row[col]).strip()
+                            if len(abstract) > 0:
+                                break
+
+                    # Extract Month and Year from the row if available
+                    month = row.get('Month', row.get('month', None))
+                    year = row.get('Year', row.get('year', None))
+
+                    # If Month/Year not directly available, try to extract from published date
+                    published_date = row.get('Published', row.get('published', row.get('Date', '')))
+                    if pd.notna(published_date) and (month is None or year is None):
                         try:
-                            parts = line.split('of')
-                            if len(parts) == 2:
-                                total_part = parts[1].strip().split()[0]
-                                total_available = int(total_part)  # Use the latest total found
-                                print(f"Found total: {total_part}")
-                        except (ValueError, IndexError) as e:
-                            print(f"Error parsing line: {e}")
-                            continue
-            
-            print(f"Final total available: {total_available}")
-            return total_available if total_available > 0 else None
-            
+                            from datetime import datetime
+                            date_obj = datetime.strptime(str(published_date), '%Y-%m-%d')
+                            if month is None:
+                                month = date_obj.strftime('%B')  # Full month name
+                            if year is None:
+                                year = date_obj.year
+                        except (ValueError, AttributeError):
+                            pass
+
+                    cluster_value = row.get('Cluster', row.get('cluster', -1))
+                    topic_label = row.get('Topic Label', row.get('topic_label', None))
+                    topic_keywords = row.get('Topic Keywords', row.get('topic_keywords', ''))
+                    topic_confidence = row.get('Topic Confidence', row.get('topic_confidence', None))
+
+                    paper = {
+                        'id': paper_id,
+                        'title': title,
+                        'authors': row.get('Authors', row.get('authors', 'Unknown Author')),
+                        'abstract': abstract,
+                        'published': published_date,
+                        'cluster': int(float(cluster_value)),
+                        'cluster_label': str(topic_label).strip() if topic_label and pd.notna(topic_label) else f"Cluster {cluster_value}",
+                        'topic_label': str(topic_label).strip() if topic_label and pd.notna(topic_label) else f"Cluster {cluster_value}",
+                        'topic_keywords': str(topic_keywords).strip() if topic_keywords and pd.notna(topic_keywords) else '',
+                        'topic_confidence': float(topic_confidence) if topic_confidence and pd.notna(topic_confidence) else None,
+                        'url': f"https://arxiv.org/abs/{paper_id}" if 'id' in row or 'ID' in row else '#',
+                        'categories': row.get('Categories', row.get('categories', '')),
+                        'Month': month,
+                        'Year': year,
+                        '_original': {col: str(row[col]) for col in df.columns if pd.notna(row[col]) and str(row[col]).strip()}
+                    }
+
+                    # Clean string fields
+                    for key in ['title', 'authors', 'abstract', 'published', 'categories']:
+                        if key in paper and paper[key] is not None:
+                            paper[key] = str(paper[key]).strip()
+
+                    papers.append(paper)
+
+                except Exception as e:
+                    logger.exception("Error processing row %s of %s", idx, path.name)
+                    continue
+
+            logger.info("Processed %d papers from %s", len(papers), path.name)
+
+            return papers, None
+
         except Exception as e:
-            print(f"Error reading total available papers from logs: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+            error_msg = f'Error reading or processing CSV file {path}: {str(e)}'
+            logger.exception(error_msg)
+            return [], error_msg
+
+    def get_total_available_papers(self):
+        """arXiv's total result count for the latest search, stored on its SearchJob at fetch time."""
+        return SearchJob.get_total_available_papers()
 
     def clean_data(self, data):
         """
@@ -928,7 +865,12 @@ class PapersAPIView(APIView):
         Query Parameters:
             page: Page number (default: 1)
             page_size: Number of items per page (default: 20, max: 100)
-            get_latest_log_info: If true, return latest log info instead of papers
+            cursor: next_cursor from the previous page; pages by keyset instead of page number
+            search, cluster, year, month: Optional filters
+            job: SearchJob id to read instead of the latest completed search
+            get_latest_log_info: If true, return the latest search's arXiv total instead of papers
+        The timeline and categories of a completed search follow the cluster,
+        year and month filters but not the search query.
         """
         try:
             # Check if this is a request for latest log info
@@ -942,39 +884,74 @@ class PapersAPIView(APIView):
             # Get pagination parameters
             page = int(request.query_params.get('page', 1))
             page_size = min(int(request.query_params.get('page_size', 20)), 100)  # Cap at 100 items per page
+            if page < 1 or page_size < 1:
+                raise ValueError('page and page_size must be positive')
             
-            # Get all papers data
-            papers, error = self.get_papers_data()
-            if error and not papers:
-                return Response({
-                    'pagination': {
-                        'current_page': page,
-                        'page_size': page_size,
-                        'total_pages': 1,
-                        'total_items': 0,
-                        'has_next': False,
-                        'has_previous': False,
-                        'total_available_from_arxiv': None
-                    },
-                    'papers': [],
-                    'clustering': {
-                        'available': False,
-                        'error': error,
-                        'stats': {}
-                    }
-                })
+            job_id = request.query_params.get('job', '').strip()
+            if job_id:
+                # A reused or attached search's job, which may no longer be the latest
+                try:
+                    latest_job = SearchJob.objects.filter(pk=int(job_id)).first()
+                except ValueError:
+                    return Response({'error': 'job must be a SearchJob id'}, status=status.HTTP_400_BAD_REQUEST)
+                if latest_job is None:
+                    return Response({'error': f'SearchJob {job_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+                if latest_job.status != 'completed':
+                    return Response(
+                        {'error': f'SearchJob {job_id} is {latest_job.status}', 'status': latest_job.status},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+            else:
+                latest_job = SearchJob.objects.filter(status='completed').order_by('-created_at').first()
+            if latest_job is not None:
+                # Filter, order and paginate the search's papers in SQL
+                papers, pagination = self.get_database_page(latest_job, request, page, page_size)
+            else:
+                # No completed search yet: fall back to the CSV exports
+                papers, error = self.get_papers_data()
+                if error and not papers:
+                    return Response({
+                        'pagination': {
+                            'current_page': page,
+                            'page_size': page_size,
+                            'total_pages': 1,
+                            'total_items': 0,
+                            'has_next': False,
+                            'has_previous': False,
+                            'total_available_from_arxiv': None
+                        },
+                        'papers': [],
+                        'clustering': {
+                            'available': False,
+                            'error': error,
+                            'stats': {}
+                        }
+                    })
+                
+                # Calculate pagination
+                total_papers = len(papers)
+                total_pages = (total_papers + page_size - 1) // page_size
+                start_idx = (page - 1) * page_size
+                end_idx = start_idx + page_size
+                # Copies, so merging clustering data leaves the cached rows untouched
+                papers = [dict(paper) for paper in papers[start_idx:end_idx]]
+                pagination = {
+                    'current_page': page,
+                    'page_size': page_size,
+                    'total_pages': total_pages,
+                    'total_items': total_papers,
+                    'has_next': page < total_pages,
+                    'has_previous': page > 1,
+                    'next_cursor': None,
+                }
             
-            # Get clustering results (for all papers)
-            clustering_results, clustering_error = self.get_clustering_results()
+            # Get clustering results (for all papers, cached per job or CSV file)
+            clustering_results, clustering_error = self.get_clustering_results(latest_job)
             
-            # Apply clustering data to all papers if available
+            # Apply clustering data to this page's papers if available
             if clustering_results and not clustering_error:
-                # Create a mapping of paper titles to clustering data for merging
-                clustering_map = {
-                    item['title'].lower().strip(): item 
-                    for item in clustering_results.get('data', [])
-                    if 'title' in item
-                }
+                # Precomputed mapping of paper titles to clustering data
+                clustering_map = clustering_results['by_title']
                 
                 # Add clustering data to papers
                 for paper in papers:
@@ -990,30 +967,15 @@ class PapersAPIView(APIView):
                             }
                         })
             
-            # Calculate pagination
-            total_papers = len(papers)
-            total_pages = (total_papers + page_size - 1) // page_size
-            start_idx = (page - 1) * page_size
-            end_idx = start_idx + page_size
-            
-            # Get paginated papers
-            paginated_papers = papers[start_idx:end_idx]
-            
-            # Get total available papers from ArXiv logs
-            total_available_from_arxiv = self.get_total_available_papers()
+            # Total available papers on arXiv for the search being read
+            pagination['total_available_from_arxiv'] = (
+                latest_job.total_available if latest_job is not None else self.get_total_available_papers()
+            )
             
             # Prepare response data
             response_data = {
-                'pagination': {
-                    'current_page': page,
-                    'page_size': page_size,
-                    'total_pages': total_pages,
-                    'total_items': total_papers,
-                    'has_next': page < total_pages,
-                    'has_previous': page > 1,
-                    'total_available_from_arxiv': total_available_from_arxiv
-                },
-                'papers': paginated_papers,
+                'pagination': pagination,
+                'papers': papers,
                 'clustering': {
                     'available': clustering_results is not None,
                     'error': clustering_error,
@@ -1030,6 +992,13 @@ class PapersAPIView(APIView):
                     'num_clusters': clustering_results.get('stats', {}).get('num_clusters', 0)
                 })
             
+            # Timeline and categories for the filtered papers, from the job's aggregates
+            if latest_job is not None:
+                filters = self.get_filters(request)
+                aggregates = self.get_aggregates(latest_job)
+                response_data['timeline'] = aggregates.timeline(**filters)
+                response_data['categories'] = aggregates.categories(**filters)
+
             # Clean the data to handle NaN/Inf values
             cleaned_data = self.clean_data(response_data)
             
@@ -1042,8 +1011,7 @@ class PapersAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            import traceback
-            traceback.print_exc()  # Print full traceback to console
+            logger.exception("Failed to retrieve papers")
             return Response(
                 {'error': f'Failed to retrieve papers: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
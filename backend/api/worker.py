@@ -0,0 +1,31 @@
+"""Status client for the pipeline worker pool (scripts/pipeline_worker.py); jobs are queued in the database."""
+import os
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+WORKER_HOST = os.environ.get("LITE_WORKER_HOST", "127.0.0.1")
+WORKER_PORT = int(os.environ.get("LITE_WORKER_PORT", "8765"))
+# Messages are pickled, so the socket is only opened with a secret shared with the worker.
+WORKER_AUTHKEY = os.environ.get("LITE_WORKER_AUTHKEY", "").encode("utf-8")
+
+
+def send_to_worker(message):
+    """Send one message to the worker and return its reply, or None if it is not running or no key is set."""
+    if not WORKER_AUTHKEY:
+        return None
+    try:
+        conn = Client((WORKER_HOST, WORKER_PORT), authkey=WORKER_AUTHKEY)
+    except (AuthenticationError, OSError):
+        return None
+    try:
+        conn.send(message)
+        return conn.recv()
+    except (EOFError, OSError):
+        return None
+    finally:
+        conn.close()
+
+
+def get_worker_status():
+    """Return the worker's queue and warm/cold startup metrics."""
+    return send_to_worker({"action": "status"})
@@ -42,6 +42,11 @@ DATABASES = {
     )
 }
 
+# Full-text search (api/search.py). On Postgres, migration 0011 adds a weighted
+# tsvector column built with this text search configuration and a GIN index on
+# it; changing the configuration needs that column rebuilt. SQLite uses FTS5.
+LITE_SEARCH_CONFIG = os.environ.get('LITE_SEARCH_CONFIG', 'english')
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 STATIC_URL = '/static/'
@@ -0,0 +1,157 @@
+"""
+Recall and latency benchmark for the IVF index behind /api/papers/semantic/.
+
+Holds out --queries vectors, finds their exact top k by brute-force cosine
+over the rest, then builds the IVF index from api/ann.py and reports recall@k
+and per-query latency for each nprobe, next to the exact search latency and
+the memory taken by float32 vectors versus int8 codes. Exits non-zero when
+recall at --nprobe-target is below --min-recall.
+
+Usage:
+    python scripts/ann_benchmark.py --embeddings synthetic --size 1000000
+    python scripts/ann_benchmark.py --embeddings stored --nprobe 4,16,64 --output out/ann_benchmark.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, os.pardir))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from api.ann import IVFQuantizer, default_nlist, inverted_lists, ivf_search, top_k
+from api.embeddings import embedding_backend, embedding_cache_name, embedding_model_name
+
+
+def stored_vectors(model_name: str) -> np.ndarray:
+    """Newest stored PaperEmbedding vector of every paper for model_name."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+    from api.models import PaperEmbedding
+
+    rows = (
+        PaperEmbedding.objects.filter(model_name=model_name)
+        .order_by("arxiv_id", "-id")
+        .values_list("arxiv_id", "vector")
+    )
+    vectors, previous = [], None
+    for arxiv_id, vector in rows.iterator(chunk_size=2000):
+        if arxiv_id != previous:
+            vectors.append(np.frombuffer(bytes(vector), dtype=np.float32))
+            previous = arxiv_id
+    return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+
+def synthetic_vectors(size: int, dims: int, seed: int = 0) -> np.ndarray:
+    """Normalized vectors scattered around sqrt(size) topic centres, like real abstracts."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(1, int(np.sqrt(size))), dims)).astype(np.float32)
+    X = np.empty((size, dims), dtype=np.float32)
+    for start in range(0, size, 65536):
+        count = min(65536, size - start)
+        block = centres[rng.integers(len(centres), size=count)] + 1.5 * rng.normal(size=(count, dims))
+        X[start:start + count] = block
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return X
+
+
+def exact_top_k(X: np.ndarray, queries: np.ndarray, k: int) -> list:
+    return [top_k(X @ query, k) for query in queries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure IVF recall and latency against exact search")
+    parser.add_argument("--embeddings", choices=("stored", "synthetic"), default="stored")
+    parser.add_argument("--model", help="PaperEmbedding model name (default: LITE_EMBEDDING_MODEL with its backend)")
+    parser.add_argument("--size", type=int, default=200000, help="Synthetic corpus size (default: 200000)")
+    parser.add_argument("--dims", type=int, default=384, help="Synthetic vector dimensions (default: 384)")
+    parser.add_argument("--queries", type=int, default=200, help="Held-out query vectors (default: 200)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, help="IVF lists (default: about 4 * sqrt(n))")
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32,64,128", help="Comma-separated nprobe values to measure")
+    parser.add_argument("--rerank", type=int, default=int(os.environ.get("LITE_ANN_RERANK", "4")),
+                        help="Candidates re-scored exactly, as a multiple of k (default: LITE_ANN_RERANK or 4)")
+    parser.add_argument("--nprobe-target", type=int, default=int(os.environ.get("LITE_ANN_NPROBE", "32")),
+                        help="nprobe checked against --min-recall (default: LITE_ANN_NPROBE or 32)")
+    parser.add_argument("--min-recall", type=float, default=0.9,
+                        help="Fail when recall@k at --nprobe-target is below this (default: 0.9)")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.embeddings == "stored":
+        model_name = args.model or embedding_cache_name(embedding_model_name(), embedding_backend())
+        X = stored_vectors(model_name)
+    else:
+        model_name = "synthetic"
+        X = synthetic_vectors(args.size, args.dims)
+    if len(X) <= args.queries + args.k:
+        sys.exit("Not enough vectors; run the pipeline first or use --embeddings synthetic.")
+
+    rng = np.random.default_rng(1)
+    held_out = np.zeros(len(X), dtype=bool)
+    held_out[rng.choice(len(X), args.queries, replace=False)] = True
+    queries, X = X[held_out], np.ascontiguousarray(X[~held_out])
+
+    started = time.perf_counter()
+    truth = exact_top_k(X, queries, args.k)
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    started = time.perf_counter()
+    quantizer = IVFQuantizer.train(X, nlist=args.nlist)
+    train_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    order, offsets = inverted_lists(quantizer.assign(X), quantizer.nlist)
+    vectors = X[order]
+    codes = quantizer.encode(vectors)
+    add_seconds = time.perf_counter() - started
+
+    results = []
+    for nprobe in [int(value) for value in args.nprobe.split(",") if value.strip()]:
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            rows, _ = ivf_search(quantizer, codes, offsets, query, args.k, nprobe, vectors=vectors, rerank=args.rerank)
+            latencies.append((time.perf_counter() - started) * 1000)
+            recalls.append(len(np.intersect1d(order[rows], expected)) / len(expected))
+        results.append({
+            "nprobe": nprobe,
+            "recall_at_k": round(float(np.mean(recalls)), 4),
+            "latency_ms_mean": round(float(np.mean(latencies)), 3),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+        })
+
+    report = {
+        "model": model_name,
+        "vectors": len(X),
+        "dimensions": X.shape[1],
+        "queries": len(queries),
+        "k": args.k,
+        "nlist": quantizer.nlist,
+        "default_nlist": default_nlist(len(X)),
+        "rerank": args.rerank,
+        "train_seconds": round(train_seconds, 2),
+        "add_seconds": round(add_seconds, 2),
+        "float32_mb": round(X.nbytes / 2**20, 1),
+        "int8_codes_mb": round(codes.nbytes / 2**20, 1),
+        "exact_latency_ms": round(exact_ms, 3),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    target = next((row for row in results if row["nprobe"] == args.nprobe_target), None)
+    if target is not None and target["recall_at_k"] < args.min_recall:
+        sys.exit(f"Recall@{args.k} {target['recall_at_k']} at nprobe {args.nprobe_target} is below --min-recall {args.min_recall}")
+
+
+if __name__ == "__main__":
+    main()
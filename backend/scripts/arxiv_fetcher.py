@@ -0,0 +1,199 @@
+"""
+Concurrent arXiv fetching for the topic-modeling pipeline.
+
+All queries produced by generate_queries() are pipelined over a small thread
+pool. The threads share one pooled HTTP session and one token-bucket rate
+limiter, so the combined request rate still respects arXiv's API terms, and
+they stop together as soon as enough unique relevant papers are collected.
+
+Point LITE_ARXIV_API_URL at a local Atom feed server to exercise the fetcher
+without touching export.arxiv.org.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import arxiv
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedSession(requests.Session):
+    """requests.Session that takes a token from a shared bucket before every request."""
+
+    def __init__(self, bucket: TokenBucket, pool_size: int = 4):
+        super().__init__()
+        self.bucket = bucket
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        self.bucket.acquire()
+        return super().request(method, url, *args, **kwargs)
+
+
+class CountingClient(arxiv.Client):
+    """arxiv.Client that keeps the total result count arXiv reports on a query's first page."""
+
+    total_results = None
+
+    def _parse_feed(self, url, first_page=True, _try_index=0):
+        feed = super()._parse_feed(url, first_page=first_page, _try_index=_try_index)
+        if first_page and self.total_results is None:
+            header = getattr(feed, "header", None)
+            try:
+                if header is not None:
+                    self.total_results = int(header.total_results)
+                else:
+                    # arxiv < 3 returns the raw feedparser dict.
+                    self.total_results = int(feed.feed.opensearch_totalresults)
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return feed
+
+
+def build_client(session: requests.Session, page_size: int = 100, num_retries: int = 3) -> CountingClient:
+    """arxiv.Client that defers pacing to the shared session instead of its own delay."""
+    client = CountingClient(page_size=page_size, delay_seconds=0, num_retries=num_retries)
+    client._session = session
+    api_url = os.environ.get("LITE_ARXIV_API_URL")
+    if api_url:
+        client.query_url_format = api_url.split("?")[0] + "?{}"
+    return client
+
+
+def fetch_papers(
+    queries: List[str],
+    max_papers: int,
+    is_match: Callable[[object], bool],
+    key_for: Callable[[object], str],
+) -> Tuple[list, dict]:
+    """Run all queries concurrently and return (papers, metrics).
+
+    Papers are de-duplicated with `key_for` and filtered with `is_match`; every
+    query stops once `max_papers` papers have been accepted across all of them.
+    Per-query metrics record the newest and oldest submissions seen, whether
+    the query returned every result arXiv has for it (`complete`) or stopped
+    early, the keys of every relevant result, including ones another query
+    already accepted, and the total result count arXiv reported;
+    `total_available` sums those counts.
+    """
+    workers = max(1, min(len(queries), int(os.environ.get("LITE_FETCH_WORKERS", "4"))))
+    bucket = TokenBucket(
+        rate=float(os.environ.get("LITE_ARXIV_REQUESTS_PER_SECOND", "1")),
+        capacity=float(os.environ.get("LITE_ARXIV_BURST", "2")),
+    )
+    session = RateLimitedSession(bucket, pool_size=workers)
+
+    lock = threading.Lock()
+    done = threading.Event()
+    papers = []
+    seen = set()
+    metrics = {"total_seen": 0, "skipped_duplicates": 0, "skipped_irrelevant": 0, "queries": {}}
+
+    def run_query(query: str):
+        if done.is_set():
+            return
+        started_at = time.perf_counter()
+        accepted = fetched = 0
+        newest = oldest = None
+        exhausted = False
+        matched_ids = []
+        client = build_client(session)
+        search = arxiv.Search(
+            query=query,
+            max_results=min(1000, max_papers * 2),  # Fetch up to twice the limit to account for filtering
+            sort_by=arxiv.SortCriterion.SubmittedDate,
+            sort_order=arxiv.SortOrder.Descending,
+        )
+        logging.info("Query: %s", query)
+        try:
+            for result in client.results(search):
+                if done.is_set():
+                    break
+                fetched += 1
+                relevant = is_match(result)
+                published = getattr(result, "published", None)
+                if published and (newest is None or published > newest):
+                    newest = published
+                if published and (oldest is None or published < oldest):
+                    oldest = published
+                with lock:
+                    if done.is_set():
+                        break
+                    metrics["total_seen"] += 1
+                    key = key_for(result)
+                    if relevant:
+                        matched_ids.append(key)
+                    if key in seen:
+                        metrics["skipped_duplicates"] += 1
+                        continue
+                    seen.add(key)
+                    if not relevant:
+                        metrics["skipped_irrelevant"] += 1
+                        continue
+                    papers.append(result)
+                    accepted += 1
+                    if len(papers) % 10 == 0:
+                        logging.info(f"Collected {len(papers)}/{max_papers} relevant unique papers (current query: {query})")
+                    if len(papers) >= max_papers:
+                        logging.info(f"Reached maximum paper limit of {max_papers}, stopping search")
+                        done.set()
+            else:
+                exhausted = True
+        except arxiv.HTTPError as http_err:
+            logging.error(f"HTTP error for query '{query}': {http_err}")
+        except arxiv.UnexpectedEmptyPageError:
+            logging.warning(f"Unexpected empty page for query: {query}")
+        except Exception as exc:
+            logging.error(f"Unexpected error for query '{query}': {exc}")
+        finally:
+            with lock:
+                metrics["queries"][query] = {
+                    "accepted": accepted,
+                    "newest_submitted": newest,
+                    "oldest_submitted": oldest,
+                    # Stopped early, or capped below arXiv's result count: older results were never seen.
+                    "complete": exhausted and (
+                        fetched < search.max_results or (client.total_results or 0) <= fetched
+                    ),
+                    "matched_ids": matched_ids,
+                    "total_results": client.total_results,
+                    "seconds": round(time.perf_counter() - started_at, 3),
+                }
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="arxiv-fetch") as pool:
+            list(pool.map(run_query, queries))
+    finally:
+        session.close()
+
+    metrics["total_available"] = sum(q["total_results"] or 0 for q in metrics["queries"].values()) or None
+    return papers[:max_papers], metrics
@@ -1,15 +1,19 @@
+import time
+
+# Measured so the first run in a process can report its cold-start cost.
+_IMPORT_STARTED_AT = time.perf_counter()
+
 import os
 import re
 import csv
 import json
 import logging
-import glob
+import hashlib
 import sys
 from datetime import datetime
 import warnings
-import time
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Tuple, Optional, Set
 import requests
 import arxiv
@@ -17,13 +21,23 @@ import numpy as np
 import matplotlib.pyplot as plt
 from dotenv import load_dotenv
 from sentence_transformers import SentenceTransformer
+from joblib import Parallel, delayed
 from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering
 from sklearn.metrics import silhouette_score
 from sklearn.manifold import TSNE
 from sklearn.decomposition import PCA
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 import umap
 import hdbscan                     
+import joblib
+
+from arxiv_fetcher import fetch_papers
+from embedding_pool import encode_sharded
+from kmeans_sweep import cosine_silhouette, fit_kmeans_candidate
+from stage_profiler import StageProfiler
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED_AT
 
 warnings.filterwarnings("ignore", category=UserWarning, module="sentence_transformers")
 
@@ -34,26 +48,76 @@ load_dotenv(os.path.join(BACKEND_DIR, ".env"))
 if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
-# The function loads the configuration and adds dynamic date range
-def load_config() -> dict:
-    # Find config.json in the parent directory of the scripts folder
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    base_dir = os.path.abspath(os.path.join(script_dir, os.pardir))
-    cfg_path = os.path.join(base_dir, "config.json")
-    
-    # Load the config
-    with open(cfg_path, "r", encoding="utf-8") as f:
-        config = json.load(f)
-    
-    # Calculate dynamic dates
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=365)  # One year ago
-    
-    # Update config with dynamic dates in YYYY-MM-DD format
-    config['start_date'] = start_date.strftime("%Y-%m-%d")
-    config['end_date'] = end_date.strftime("%Y-%m-%d")
-    
-    logging.info(f"Using dynamic date range: {config['start_date']} to {config['end_date']}")
+from api.embeddings import EMBEDDING_BACKENDS, embedding_backend, embedding_cache_name, load_embedding_model
+from api.fingerprint import clean_keywords, fingerprint_settings, search_config, search_fingerprint
+
+# Embedding models stay loaded for the lifetime of the process, so a resident
+# worker (scripts/pipeline_worker.py) only pays the load cost once.
+_EMBEDDING_MODELS = {}
+_IMPORTS_CHARGED = False
+
+
+def get_embedding_model(model_name: str, backend: str = "torch") -> Tuple[SentenceTransformer, float, bool]:
+    """Return (model, load_seconds, warm) for the requested SentenceTransformer and backend."""
+    model = _EMBEDDING_MODELS.get((model_name, backend))
+    if model is not None:
+        return model, 0.0, True
+    load_started = time.perf_counter()
+    model = load_embedding_model(model_name, backend)
+    _EMBEDDING_MODELS[(model_name, backend)] = model
+    return model, time.perf_counter() - load_started, False
+
+
+def warm_up(model_name: Optional[str] = None) -> dict:
+    """Load the embedding model ahead of the first job and report the startup cost."""
+    global _IMPORTS_CHARGED
+    model_name = model_name or os.environ.get("LITE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    backend = embedding_backend()
+    disabled = os.environ.get("LITE_DISABLE_EMBEDDINGS", "0").strip() == "1"
+    # Low-memory deployments never encode, so the model is not loaded at all.
+    load_seconds = 0.0 if disabled else get_embedding_model(model_name, backend)[1]
+    _IMPORTS_CHARGED = True
+    return {
+        "embedding_model": model_name,
+        "embedding_backend": backend,
+        "embeddings_disabled": disabled,
+        "import_seconds": round(IMPORT_SECONDS, 3),
+        "model_load_seconds": round(load_seconds, 3),
+    }
+
+def load_config(search_job_id: Optional[int] = None) -> dict:
+    """
+    Load the search configuration for one run.
+
+    Jobs queued by the API carry their own configuration on the SearchJob row;
+    command-line runs without a job read config.json next to the scripts folder
+    and search the year up to today. `settings` holds the effective tuning
+    settings: this process's environment with the search's overrides applied.
+    A queued job also carries the fingerprint stored on it at enqueue time.
+    """
+    if search_job_id:
+        if not setup_django():
+            raise RuntimeError(f"SearchJob {search_job_id} needs the database, but Django is not available")
+        from api.models import SearchJob
+
+        job = SearchJob.objects.get(pk=search_job_id)
+        config = dict(job.config or {})
+        if not config:
+            # Jobs queued before configurations were stored on the row.
+            config = search_config(job.query.split(", "), job.optional_keywords.split(", "))
+        # The API fingerprinted the search with its own environment when it queued
+        # the job; find_reusable_job matches on that value, so the run keeps it.
+        config["fingerprint"] = job.fingerprint
+        config["fingerprint_components"] = (job.metadata or {}).get("fingerprint")
+    else:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        base_dir = os.path.abspath(os.path.join(script_dir, os.pardir))
+        with open(os.path.join(base_dir, "config.json"), "r", encoding="utf-8") as f:
+            file_config = json.load(f)
+        config = search_config(file_config.get("must_include", []), file_config.get("optional_keywords", []))
+
+    config["settings"] = fingerprint_settings(overrides=config.get("parameters"))
+    logging.info(f"Using date range: {config['start_date']} to {config['end_date']}")
     return config
 
 # The function takes start and end date strings and returns a date range in YYYYMMDDHHMM TO YYYYMMDDHHMM format
@@ -78,19 +142,6 @@ def format_date_range(start: Optional[str], end: Optional[str]) -> Optional[str]
         logging.error(f"Error parsing date range: {exc}")
         return None
 
-# The function generates search queries with the primary and secondary focus keyword lists by first listing individually, then in combinations
-# It returns a list of queries
-def clean_keywords(keywords: List[str]) -> List[str]:
-    seen: Set[str] = set()
-    cleaned = []
-    for keyword in keywords:
-        keyword = re.sub(r"\s+", " ", str(keyword).strip().lower())
-        if keyword and keyword not in seen:
-            seen.add(keyword)
-            cleaned.append(keyword)
-    return cleaned
-
-
 def paper_key(paper) -> str:
     return getattr(paper, "entry_id", "") or getattr(paper, "title", "").strip().lower()
 
@@ -103,6 +154,8 @@ def paper_arxiv_id(paper) -> str:
     return paper_key(paper)[:100]
 
 
+# The function generates search queries with the primary and secondary focus keyword lists by first listing individually, then in combinations
+# It returns a list of queries
 def generate_queries(must: List[str], opt: List[str], start=None, end=None) -> List[str]:
     queries = []
 
@@ -127,28 +180,243 @@ def generate_queries(must: List[str], opt: List[str], start=None, end=None) -> L
         queries = [f"{q} AND submittedDate:{dr}" for q in queries]
     return list(dict.fromkeys(queries))
 
-# This function computes the silhouette score
-def cosine_silhouette(X: np.ndarray, labels: np.ndarray) -> Optional[float]:
-    if len(set(labels)) > 1 and len(X) > len(set(labels)):
-        return silhouette_score(X, labels, metric="cosine")
-    return None
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def uncovered_ranges(start: str, end: str, watermark) -> List[Tuple[str, str]]:
+    """Parts of the [start, end] window a query's watermark does not cover, as YYYY-MM-DD pairs.
+
+    A watermark covers covered_from through newest_submitted. Only the part
+    before it and the part since its newest submission are fetched, both
+    clamped to the window, so a past end date never yields an inverted range.
+    """
+    if not (watermark and watermark.newest_submitted and watermark.covered_from):
+        return [(start, end)]
+    covered_from = watermark.covered_from.strftime("%Y-%m-%d")
+    newest = watermark.newest_submitted.strftime("%Y-%m-%d")
+    ranges = []
+    if start < covered_from:
+        prefix_end = min(end, (watermark.covered_from - timedelta(days=1)).strftime("%Y-%m-%d"))
+        ranges.append((start, prefix_end))
+        if prefix_end == end:
+            return ranges
+    ranges.append((min(max(newest, start), end), end))
+    return ranges
+
+
+def plan_queries(must: List[str], opt: List[str], start=None, end=None) -> Tuple[dict, dict]:
+    """Return ({dated query: normalized query}, {normalized query: QueryWatermark}).
+
+    Queries harvested before only ask arXiv for the parts of the date window
+    their watermark does not cover; the rest use the full window.
+    """
+    base_queries = generate_queries(must, opt)
+    watermarks = {}
+    if os.environ.get("LITE_INCREMENTAL_FETCH", "1") == "1" and setup_django():
+        from api.models import QueryWatermark
+        try:
+            by_hash = {query_hash(q): q for q in base_queries}
+            for watermark in QueryWatermark.objects.filter(query_hash__in=by_hash):
+                watermarks[by_hash[watermark.query_hash]] = watermark
+        except Exception as exc:
+            logging.warning("Could not load query watermarks: %s", exc)
+
+    planned = {}
+    for base in base_queries:
+        if not (start and end):
+            planned[base] = base
+            continue
+        ranges = uncovered_ranges(start, end, watermarks.get(base))
+        if ranges != [(start, end)]:
+            logging.info("Incremental fetch of %s for query: %s", ", ".join(f"{s} to {e}" for s, e in ranges), base)
+        for range_start, range_end in ranges:
+            planned[f"{base} AND submittedDate:{format_date_range(range_start, range_end)}"] = base
+    return planned, watermarks
 
 
-def extract_keywords(abstracts: List[str], labels: np.ndarray, n_kw=4) -> dict:
+def result_from_record(record) -> arxiv.Result:
+    """Rebuild an arxiv.Result from a stored Paper row so it can join a fresh harvest."""
+    published = datetime.combine(record.published_date, datetime.min.time(), tzinfo=timezone.utc)
+    categories = [c for c in re.split(r"[;,\s\[\]']+", record.categories or "") if c]
+    return arxiv.Result(
+        entry_id=record.url or f"https://arxiv.org/abs/{record.arxiv_id}",
+        updated=published,
+        published=published,
+        title=record.title,
+        authors=[arxiv.Result.Author(name) for name in (record.authors or "").split("; ") if name],
+        summary=record.abstract,
+        primary_category=categories[0] if categories else "",
+        categories=categories,
+    )
+
+
+def merge_stored_papers(papers: list, watermarks: dict, start, end, max_papers: int, must: List[str], opt: List[str]) -> Set[str]:
+    """Top up a delta harvest with papers earlier runs matched on the same queries.
+
+    Returns the arXiv ids still inside the date window, which are the ones
+    worth remembering on the watermarks.
+    """
+    stored_ids = list({arxiv_id for watermark in watermarks.values() for arxiv_id in watermark.arxiv_ids})
+    if not stored_ids:
+        return set()
+    from api.models import Paper
+
+    records = []
+    for offset in range(0, len(stored_ids), 500):
+        chunk = Paper.objects.filter(arxiv_id__in=stored_ids[offset:offset + 500], published_date__isnull=False)
+        if start:
+            chunk = chunk.filter(published_date__gte=start)
+        if end:
+            chunk = chunk.filter(published_date__lte=end)
+        records.extend(chunk)
+    records.sort(key=lambda record: record.published_date, reverse=True)
+
+    seen = {paper_arxiv_id(p) for p in papers}
+    reused = 0
+    for record in records:
+        if len(papers) >= max_papers:
+            break
+        if record.arxiv_id in seen:
+            continue
+        result = result_from_record(record)
+        if not is_relevant(result, must, opt):
+            continue
+        seen.add(record.arxiv_id)
+        papers.append(result)
+        reused += 1
+    logging.info("Reused %s previously harvested papers from the database", reused)
+    return {record.arxiv_id for record in records}
+
+
+def harvested_dates(stats: dict, range_start: str, range_end: str):
+    """(first, last) dates of a query run's range that were fetched in full, or None.
+
+    A complete run covers its whole range. Results arrive newest first, so a
+    run that stopped early covers only the days after the oldest submission
+    it saw; that day itself may have been cut off part way.
+    """
+    first = datetime.strptime(range_start, "%Y-%m-%d").date()
+    last = datetime.strptime(range_end, "%Y-%m-%d").date()
+    if not stats.get("complete"):
+        if not stats.get("oldest_submitted"):
+            return None
+        first = max(first, stats["oldest_submitted"].date() + timedelta(days=1))
+    return (first, last) if first <= last else None
+
+
+def covered_dates(watermark, harvested: List[Tuple]):
+    """The contiguous date range, ending latest, covered by a watermark plus newly harvested ranges."""
+    ranges = list(harvested)
+    if watermark.covered_from and watermark.newest_submitted:
+        ranges.append((watermark.covered_from, watermark.newest_submitted.date()))
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return max(merged, key=lambda dates: dates[1]) if merged else None
+
+
+def update_query_watermarks(planned: dict, watermarks: dict, query_metrics: dict, kept_ids: Set[str], start=None, end=None):
+    """Advance each query's high-water mark and remember the papers it matched.
+
+    Only papers inside the [start, end] window are remembered, and the
+    watermark's covered range only grows by the dates a run actually fetched:
+    a query that stopped at max_papers or at arXiv's result cap covers just
+    the days after the oldest submission it saw, so a later, larger harvest
+    still fetches the older part.
+    """
+    from api.models import QueryWatermark
+
+    fetched, harvested = {}, {}
+    for query, base in planned.items():
+        fetched.setdefault(base, [])
+        harvested.setdefault(base, [])
+    for base in fetched:
+        # plan_queries dated each base query with these ranges, in this order.
+        ranges = uncovered_ranges(start, end, watermarks.get(base)) if start and end else [None]
+        queries = [query for query, planned_base in planned.items() if planned_base == base]
+        for query, dates in zip(queries, ranges):
+            stats = query_metrics.get(query)
+            if not stats:
+                continue
+            fetched[base].append(stats)
+            covered = harvested_dates(stats, *dates) if dates else None
+            if covered:
+                harvested[base].append(covered)
+    fetched = {base: runs for base, runs in fetched.items() if runs}
+    window_end = datetime.strptime(end, "%Y-%m-%d").replace(hour=23, minute=59, second=59, tzinfo=timezone.utc) if end else None
+    for base, runs in fetched.items():
+        watermark = watermarks.get(base) or QueryWatermark(query_hash=query_hash(base), query=base)
+        covered = covered_dates(watermark, harvested[base]) if start and end else None
+        newest = [stats["newest_submitted"] for stats in runs if stats.get("newest_submitted")]
+        if watermark.newest_submitted:
+            newest.append(watermark.newest_submitted)
+        watermark.newest_submitted = max(newest) if newest else None
+        if window_end and watermark.newest_submitted and watermark.newest_submitted > window_end:
+            watermark.newest_submitted = window_end
+        if covered and watermark.newest_submitted:
+            # Never claim newer submissions than the covered range reaches, or the gap is skipped.
+            covered_end = datetime.combine(covered[1], datetime.max.time().replace(microsecond=0), tzinfo=timezone.utc)
+            watermark.newest_submitted = min(watermark.newest_submitted, covered_end)
+        watermark.covered_from = covered[0] if covered else None
+        matched = [arxiv_id for stats in runs for arxiv_id in stats.get("matched_ids", [])]
+        previous = [arxiv_id for arxiv_id in watermark.arxiv_ids if arxiv_id in kept_ids]
+        watermark.arxiv_ids = list(dict.fromkeys(matched + previous))
+        watermark.save()
+
+
+def build_term_matrix(abstracts: List[str]) -> Tuple[CountVectorizer, sparse.csr_matrix]:
+    """Tokenize the corpus once into a sparse document-term count matrix."""
+    vect = CountVectorizer(
+        stop_words="english",
+        ngram_range=(1, 2),
+        min_df=2 if len(abstracts) >= 1000 else 1,
+    )
+    return vect, vect.fit_transform(abstracts)
+
+
+def extract_keywords(abstracts: List[str], labels: np.ndarray, n_kw=4, term_matrix=None) -> dict:
+    """Top class-based TF-IDF (c-TF-IDF) terms for every cluster in one vectorized pass.
+
+    Document counts are summed per cluster with a sparse indicator matmul, then
+    weighted by how rare each term is across clusters. Pass the result of
+    build_term_matrix() as `term_matrix` to reuse an existing tokenization.
+    """
+    labels = np.asarray(labels)
+    cluster_ids, inverse = np.unique(labels, return_inverse=True)
+    try:
+        vect, counts = term_matrix or build_term_matrix(abstracts)
+    except ValueError:
+        # Empty vocabulary, e.g. abstracts made only of stop words
+        return {cid: ["outlier"] if cid == -1 else [] for cid in cluster_ids}
+
+    indicator = sparse.csr_matrix(
+        (np.ones(len(labels)), (inverse, np.arange(len(labels)))),
+        shape=(len(cluster_ids), len(labels)),
+    )
+    class_counts = (indicator @ counts).astype(np.float64)
+    words_per_class = np.asarray(class_counts.sum(axis=1)).ravel()
+    term_totals = np.asarray(class_counts.sum(axis=0)).ravel()
+    idf = np.log1p(words_per_class.mean() / np.maximum(term_totals, 1))
+    scores = (sparse.diags(1 / np.maximum(words_per_class, 1)) @ class_counts @ sparse.diags(idf)).tocsr()
+    vocab = vect.get_feature_names_out()
+
     out = {}
-    for cid in sorted(set(labels)):
+    for row, cid in enumerate(cluster_ids):
         if cid == -1:
             out[cid] = ["outlier"]
             continue
-        docs = [abstracts[i] for i, l in enumerate(labels) if l == cid]
-        if not docs:
-            out[cid] = []
-            continue
-        vect = TfidfVectorizer(stop_words="english", max_features=200, ngram_range=(1, 2))
-        tfidf = vect.fit_transform(docs)
-        scores = tfidf.sum(axis=0).A1
-        idxs = scores.argsort()[-n_kw:][::-1]
-        out[cid] = [vect.get_feature_names_out()[i] for i in idxs]
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        data, cols = scores.data[start:end], scores.indices[start:end]
+        if len(data) > n_kw:
+            top = np.argpartition(-data, n_kw)[:n_kw]
+            top = top[np.argsort(-data[top], kind="stable")]
+        else:
+            top = np.argsort(-data, kind="stable")
+        out[cid] = [vocab[cols[i]] for i in top if data[i] > 0]
     return out
 
 
@@ -167,6 +435,125 @@ def polish_topic_labels_with_groq(topic_keywords: dict) -> dict:
     api_key = os.environ.get("GROQ_API_KEY")
     if not api_key:
         return {}
+    topics = {
+        str(topic_id): keywords
+        for topic_id, keywords in topic_keywords.items()
+        if topic_id != -1 and keywords
+    }
+    if not topics:
+        return {}
+
+    prompt = (
+        "Create short 2-5 word academic research topic labels from these keyword lists. "
+        "Return only compact JSON where keys are topic IDs and values are labels.\n"
+        f"{json.dumps(topics)}"
+    )
+
+    try:
+        response = requests.post(
+            "https://api.groq.com/openai/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": os.environ.get("GROQ_TOPIC_MODEL", "llama-3.1-8b-instant"),
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.2,
+                "max_tokens": 300,
+            },
+            timeout=20,
+        )
+        response.raise_for_status()
+        content = response.json()["choices"][0]["message"]["content"].strip()
+        match = re.search(r"\{.*\}", content, re.S)
+        if not match:
+            return {}
+        return {int(k): str(v) for k, v in json.loads(match.group(0)).items()}
+    except Exception as exc:
+        logging.warning("Groq topic labeling skipped: %s", exc)
+        return {}
+
+
+def setup_django() -> bool:
+    """Configure Django so the pipeline can use the api models; False if unavailable."""
+    try:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+        import django
+        django.setup()
+        return True
+    except Exception as exc:
+        logging.warning("Django setup failed: %s", exc)
+        return False
+
+
+def paper_content_hash(paper) -> str:
+    text = f"{(paper.title or '').strip()}\n{(paper.summary or '').strip()}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_with_cache(model, model_name: str, papers, abstracts: List[str]) -> Tuple[np.ndarray, dict]:
+    """Encode abstracts, reusing vectors stored in PaperEmbedding and encoding only misses.
+
+    Cache entries are keyed by (arXiv id, hash of title + summary, model name), so an
+    edited abstract or a different model never returns a stale vector.
+    """
+    use_cache = os.environ.get("LITE_EMBEDDING_CACHE", "1") == "1" and setup_django()
+    if not use_cache:
+        X, encode_report = encode_sharded(model, abstracts)
+        return X, {"hits": 0, "misses": len(abstracts), "encode": encode_report}
+
+    from api.models import PaperEmbedding
+
+    keys = [(paper_arxiv_id(p), paper_content_hash(p)) for p in papers]
+    arxiv_ids = [arxiv_id for arxiv_id, _ in keys]
+    cached = {}
+    try:
+        # Chunked like the other id lookups, so the IN list stays under SQLite's variable limit.
+        for start in range(0, len(arxiv_ids), 500):
+            rows = PaperEmbedding.objects.filter(
+                model_name=model_name,
+                arxiv_id__in=arxiv_ids[start:start + 500],
+            ).values_list("arxiv_id", "content_hash", "vector")
+            for arxiv_id, content_hash, vector in rows:
+                cached[(arxiv_id, content_hash)] = np.frombuffer(bytes(vector), dtype=np.float32)
+    except Exception as exc:
+        logging.warning("Embedding cache lookup failed: %s", exc)
+
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    encoded = None
+    encode_report = None
+    if missing:
+        encoded, encode_report = encode_sharded(model, [abstracts[i] for i in missing])
+        try:
+            PaperEmbedding.objects.bulk_create(
+                [
+                    PaperEmbedding(
+                        arxiv_id=keys[i][0],
+                        content_hash=keys[i][1],
+                        model_name=model_name,
+                        dimensions=encoded.shape[1],
+                        vector=encoded[row].tobytes(),
+                    )
+                    for row, i in enumerate(missing)
+                ],
+                batch_size=500,
+                ignore_conflicts=True,
+            )
+        except Exception as exc:
+            logging.warning("Embedding cache write failed: %s", exc)
+
+    dims = encoded.shape[1] if encoded is not None else len(next(iter(cached.values())))
+    X = np.empty((len(abstracts), dims), dtype=np.float32)
+    for i, key in enumerate(keys):
+        if key in cached:
+            X[i] = cached[key]
+    if encoded is not None:
+        X[missing] = encoded
+
+    stats = {"hits": len(abstracts) - len(missing), "misses": len(missing), "encode": encode_report}
+    logging.info("Embedding cache: %s hits, %s misses", stats["hits"], stats["misses"])
+    return X, stats
 
 
 def persist_results_to_database(
@@ -178,154 +565,320 @@ def persist_results_to_database(
     cfg,
     metrics,
     processing_seconds,
+    search_job_id=None,
 ):
+    """Bulk-upsert one run's papers, topics and assignments and return the SearchJob id.
+
+    Rows are written in chunks of LITE_DB_BATCH_SIZE, each in its own short
+    transaction, so SQLite's write lock is released between chunks and API
+    readers are never blocked for the whole run. The job stays in `processing`
+    until every chunk is written, so readers never see a half-saved result.
+    When search_job_id names the job the API queued, that row is filled in
+    instead of creating a new one.
+    """
+    if not setup_django():
+        logging.warning("Database persistence skipped: Django is not available")
+        return None
     try:
-        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
-        import django
-        django.setup()
         from django.db import transaction
+        from django.utils import timezone as django_timezone
+        from api.aggregates import store_job_aggregates
         from api.models import Paper, PaperTopic, SearchJob, Topic
     except Exception as exc:
         logging.warning("Database persistence skipped: %s", exc)
         return None
 
+    batch_size = max(1, int(os.environ.get("LITE_DB_BATCH_SIZE", "500")))
+    labels = np.asarray(labels)
+    cluster_ids, cluster_counts = np.unique(labels, return_counts=True)
     must_query = ", ".join(cfg.get("must_include", []))
     optional_query = ", ".join(cfg.get("optional_keywords", []))
+    settings = cfg.get("settings") or fingerprint_settings()
 
-    with transaction.atomic():
-        search_job = SearchJob.objects.create(
-            query=must_query,
-            optional_keywords=optional_query,
-            status="completed",
-            papers_scanned=metrics.get("total_seen", 0),
-            papers_matched=len(papers),
-            duplicates_skipped=metrics.get("skipped_duplicates", 0),
-            irrelevant_skipped=metrics.get("skipped_irrelevant", 0),
-            topics_found=len(set(labels) - {-1}),
-            outliers_found=int(np.sum(np.array(labels) == -1)),
-            processing_seconds=processing_seconds,
-            metadata={
-                "embedding_model": os.environ.get("LITE_EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
-                "clustering_mode": os.environ.get("LITE_CLUSTERING_MODE", "hdbscan"),
-            },
-        )
+    job_fields = dict(
+        query=must_query,
+        optional_keywords=optional_query,
+        fingerprint=metrics.get("fingerprint", ""),
+        status="processing",
+        papers_scanned=metrics.get("total_seen", 0),
+        total_available=metrics.get("total_available"),
+        papers_matched=len(papers),
+        duplicates_skipped=metrics.get("skipped_duplicates", 0),
+        irrelevant_skipped=metrics.get("skipped_irrelevant", 0),
+        topics_found=len(set(cluster_ids.tolist()) - {-1}),
+        outliers_found=int(np.sum(labels == -1)),
+        processing_seconds=processing_seconds,
+        metadata={
+            "embedding_model": settings["embedding_model"],
+            "embedding_backend": settings["embedding_backend"].lower(),
+            "clustering_mode": settings["clustering_mode"],
+            "fingerprint": metrics.get("fingerprint_components"),
+            "startup": metrics.get("startup", {}),
+            "embedding_cache": metrics.get("embedding_cache", {}),
+            "incremental": metrics.get("incremental", {}),
+            "arxiv_total_results": metrics.get("arxiv_total_results", {}),
+            "clustering": {k: v for k, v in metrics.get("clustering", {}).items() if k != "topic_model"},
+            "topic_model": metrics.get("clustering", {}).get("topic_model"),
+        },
+    )
+    if metrics.get("note"):
+        job_fields["metadata"]["note"] = metrics["note"]
+    search_job = SearchJob.objects.filter(pk=search_job_id).first() if search_job_id else None
+    if search_job is None:
+        search_job = SearchJob.objects.create(**job_fields)
+    else:
+        job_fields["metadata"] = {**(search_job.metadata or {}), **job_fields["metadata"]}
+        for field, value in job_fields.items():
+            setattr(search_job, field, value)
+        search_job.save()
 
-        topic_records = {}
-        for cluster_id in sorted(set(labels)):
-            keywords = topic_keywords.get(cluster_id, [])
-            topic_records[cluster_id] = Topic.objects.create(
+    try:
+        Topic.objects.bulk_create([
+            Topic(
                 search_job=search_job,
                 cluster_id=int(cluster_id),
-                label=topic_labels.get(cluster_id) or title_from_keywords(keywords),
-                keywords="; ".join(keywords),
-                paper_count=int(np.sum(np.array(labels) == cluster_id)),
+                label=topic_labels.get(cluster_id) or title_from_keywords(topic_keywords.get(cluster_id, [])),
+                keywords="; ".join(topic_keywords.get(cluster_id, [])),
+                paper_count=int(count),
                 is_outlier=cluster_id == -1,
             )
+            for cluster_id, count in zip(cluster_ids.tolist(), cluster_counts.tolist())
+        ])
+        topic_records = {topic.cluster_id: topic for topic in Topic.objects.filter(search_job=search_job)}
 
-        for index, (paper, label) in enumerate(zip(papers, labels)):
-            published = getattr(paper, "published", None)
-            arxiv_id = paper_arxiv_id(paper)
-            author_names = "; ".join([str(a.name) for a in paper.authors]) if paper.authors else ""
-            categories = getattr(paper, "categories", None) or getattr(paper, "primary_category", "") or ""
-            confidence = probabilities[index] if probabilities is not None and index < len(probabilities) else None
-            paper_obj, _ = Paper.objects.update_or_create(
-                arxiv_id=arxiv_id,
-                defaults={
-                    "title": paper.title.strip(),
-                    "abstract": paper.summary.strip(),
-                    "authors": author_names,
-                    "published_date": published.date() if published else None,
-                    "year": published.year if published else None,
-                    "month": published.strftime("%B") if published else None,
-                    "categories": categories,
-                    "url": getattr(paper, "entry_id", "") or f"https://arxiv.org/abs/{arxiv_id}",
-                    "cluster": int(label),
-                    "metadata": {
+        update_fields = [
+            "title", "abstract", "authors", "published_date", "year", "month",
+            "categories", "url", "cluster", "metadata", "updated_at",
+        ]
+        for start in range(0, len(papers), batch_size):
+            chunk = range(start, min(start + batch_size, len(papers)))
+            now = django_timezone.now()
+            paper_rows = []
+            for index in chunk:
+                paper = papers[index]
+                label = int(labels[index])
+                published = getattr(paper, "published", None)
+                arxiv_id = paper_arxiv_id(paper)
+                author_names = "; ".join([str(a.name) for a in paper.authors]) if paper.authors else ""
+                categories = getattr(paper, "categories", None) or getattr(paper, "primary_category", "") or ""
+                paper_rows.append(Paper(
+                    arxiv_id=arxiv_id,
+                    title=paper.title.strip(),
+                    abstract=paper.summary.strip(),
+                    authors=author_names,
+                    published_date=published.date() if published else None,
+                    year=published.year if published else None,
+                    month=published.strftime("%B") if published else None,
+                    categories=categories,
+                    url=getattr(paper, "entry_id", "") or f"https://arxiv.org/abs/{arxiv_id}",
+                    cluster=label,
+                    metadata={
                         "topic_label": topic_records[label].label,
                         "topic_keywords": topic_records[label].keywords,
                         "search_job_id": search_job.id,
                     },
-                },
-            )
-            PaperTopic.objects.update_or_create(
-                paper=paper_obj,
-                search_job=search_job,
-                defaults={
-                    "topic": topic_records[label],
-                    "confidence": float(confidence) if confidence is not None else None,
-                },
-            )
+                    created_at=now,
+                    updated_at=now,
+                ))
+
+            with transaction.atomic():
+                Paper.objects.bulk_create(
+                    paper_rows,
+                    update_conflicts=True,
+                    unique_fields=["arxiv_id"],
+                    update_fields=update_fields,
+                )
+                paper_ids = dict(
+                    Paper.objects.filter(arxiv_id__in=[row.arxiv_id for row in paper_rows])
+                    .values_list("arxiv_id", "id")
+                )
+                assignments = []
+                for row, index in zip(paper_rows, chunk):
+                    confidence = probabilities[index] if probabilities is not None and index < len(probabilities) else None
+                    assignments.append(PaperTopic(
+                        paper_id=paper_ids[row.arxiv_id],
+                        topic=topic_records[int(labels[index])],
+                        search_job=search_job,
+                        confidence=float(confidence) if confidence is not None else None,
+                        published_date=row.published_date,
+                    ))
+                PaperTopic.objects.bulk_create(assignments, ignore_conflicts=True)
+        # Totals, timeline and categories the papers endpoint serves, computed once before readers see the job.
+        store_job_aggregates(search_job.id)
+    except Exception as exc:
+        SearchJob.objects.filter(pk=search_job.pk).update(
+            status="failed", error_message=str(exc), updated_at=django_timezone.now()
+        )
+        raise
 
+    SearchJob.objects.filter(pk=search_job.pk).update(status="completed", updated_at=django_timezone.now())
     logging.info("Saved %s papers and %s topics to database for SearchJob %s", len(papers), len(topic_records), search_job.id)
     return search_job.id
 
-    topics = {
-        str(topic_id): keywords
-        for topic_id, keywords in topic_keywords.items()
-        if topic_id != -1 and keywords
-    }
-    if not topics:
-        return {}
 
-    prompt = (
-        "Create short 2-5 word academic research topic labels from these keyword lists. "
-        "Return only compact JSON where keys are topic IDs and values are labels.\n"
-        f"{json.dumps(topics)}"
-    )
+def mark_search_job(search_job_id: Optional[int], **fields):
+    """Update the status (and any other fields) of the SearchJob the API queued for this run."""
+    if not search_job_id or not setup_django():
+        return
+    try:
+        from django.utils import timezone as django_timezone
+        from api.models import SearchJob
+
+        SearchJob.objects.filter(pk=search_job_id).update(updated_at=django_timezone.now(), **fields)
+    except Exception as exc:
+        logging.warning("Could not update SearchJob %s: %s", search_job_id, exc)
+
 
+def emit_job_event(search_job_id: Optional[int], event: str, data: dict):
+    """Append a progress event for the SearchJob; /api/jobs/<id>/events streams them to clients."""
+    if not search_job_id or not setup_django():
+        return
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": os.environ.get("GROQ_TOPIC_MODEL", "llama-3.1-8b-instant"),
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.2,
-                "max_tokens": 300,
-            },
-            timeout=20,
+        from api.models import SearchJobEvent
+
+        SearchJobEvent.objects.create(search_job_id=search_job_id, event=event, data=data)
+    except Exception as exc:
+        logging.warning("Could not record %s event for SearchJob %s: %s", event, search_job_id, exc)
+
+
+def emit_final_event(search_job_id: Optional[int]):
+    """Emit the job's terminal event ("completed" or "failed") with its final counts."""
+    if not search_job_id or not setup_django():
+        return
+    try:
+        from api.models import SearchJob
+
+        job = SearchJob.objects.get(pk=search_job_id)
+    except Exception as exc:
+        logging.warning("Could not read SearchJob %s for its final event: %s", search_job_id, exc)
+        return
+    emit_job_event(search_job_id, job.status, {
+        "job_id": job.id,
+        "status": job.status,
+        "papers_scanned": job.papers_scanned,
+        "papers_matched": job.papers_matched,
+        "topics_found": job.topics_found,
+        "outliers_found": job.outliers_found,
+        "processing_seconds": job.processing_seconds,
+        "error": job.error_message,
+    })
+
+
+def save_job_profile(search_job_id: int, profile: dict):
+    """Store the per-stage profile under SearchJob.metadata['profile'] once persistence has finished."""
+    try:
+        from api.models import SearchJob
+
+        search_job = SearchJob.objects.get(pk=search_job_id)
+        search_job.metadata = {**(search_job.metadata or {}), "profile": profile}
+        search_job.save(update_fields=["metadata", "updated_at"])
+    except Exception as exc:
+        logging.warning("Could not save the profile for SearchJob %s: %s", search_job_id, exc)
+
+
+def update_semantic_index(model_name: str):
+    """Add the vectors stored by this run to the semantic search index (api/semantic.py)."""
+    try:
+        from api.semantic import update_index
+
+        meta = update_index(model_name)
+        logging.info(
+            "Semantic index: %d segment(s), %s",
+            len(meta["segments"]),
+            "IVF lists" if meta.get("quantizer") else "exact search",
         )
-        response.raise_for_status()
-        content = response.json()["choices"][0]["message"]["content"].strip()
-        match = re.search(r"\{.*\}", content, re.S)
-        if not match:
-            return {}
-        return {int(k): str(v) for k, v in json.loads(match.group(0)).items()}
     except Exception as exc:
-        logging.warning("Groq topic labeling skipped: %s", exc)
-        return {}
+        logging.warning("Semantic index update failed: %s", exc)
+
+
+def store_related(search_job_id: int, papers, X: np.ndarray, model_name: str):
+    """Store each paper's nearest neighbours, within the job and across the corpus (api/related.py).
+
+    With LITE_EMBEDDING_CACHE=0 no vectors are stored and there is no semantic
+    index, so only the within-job lists are computed, from the in-memory X.
+    """
+    try:
+        from api.models import Paper
+        from api.related import store_related_papers
+
+        arxiv_ids = [paper_arxiv_id(p) for p in papers]
+        paper_ids = {}
+        for start in range(0, len(arxiv_ids), 500):
+            paper_ids.update(
+                Paper.objects.filter(arxiv_id__in=arxiv_ids[start:start + 500]).values_list("arxiv_id", "id")
+            )
+        rows = [i for i, arxiv_id in enumerate(arxiv_ids) if arxiv_id in paper_ids]
+        counts = store_related_papers(
+            search_job_id,
+            [paper_ids[arxiv_ids[i]] for i in rows],
+            X[rows],
+            model_name,
+            across_corpus=os.environ.get("LITE_EMBEDDING_CACHE", "1") == "1",
+        )
+        logging.info(
+            "Related papers: %d within the job, %d across the corpus, %d older lists updated",
+            counts["job_rows"],
+            counts["global_rows"],
+            counts["older_papers_updated"],
+        )
+    except Exception as exc:
+        logging.warning("Could not store related papers for SearchJob %s: %s", search_job_id, exc)
+
 
 # This function runs KMeans clustering from cluster numbers 2-10, returning the cluster number with the highest silhouette score
-def run_clustering_models(X: np.ndarray) -> Tuple[str, np.ndarray, float]:
-    # Only KMeans is used; find the best k (2-10) by silhouette score
-    best_k = None
-    best_labels = None
-    best_score = -1
-    for k in range(2, min(11, len(X))):
-        km = KMeans(n_clusters=k, random_state=42, n_init="auto")
-        lbl = km.fit_predict(X)
-        sil = cosine_silhouette(X, lbl)
-        if sil is not None and sil > best_score:
-            best_k = k
-            best_labels = lbl
-            best_score = sil
-    if best_labels is None:
+def run_clustering_models(X: np.ndarray, report: Optional[dict] = None) -> Tuple[str, np.ndarray, float]:
+    """Sweep k=2..10 and keep the best silhouette score.
+
+    Candidates are fitted in parallel over LITE_KMEANS_JOBS processes. Inputs with
+    at least LITE_MINIBATCH_THRESHOLD rows use MiniBatchKMeans, and silhouette
+    scores are sampled (see cosine_silhouette). Per-k timings are logged and,
+    when `report` is given, stored under report["kmeans_sweep"].
+    """
+    n_jobs = int(os.environ.get("LITE_KMEANS_JOBS", "1"))
+    sample_size = int(os.environ.get("LITE_SILHOUETTE_SAMPLE", "2000"))
+    minibatch = len(X) >= int(os.environ.get("LITE_MINIBATCH_THRESHOLD", "10000"))
+    candidates = Parallel(n_jobs=n_jobs)(
+        delayed(fit_kmeans_candidate)(X, k, sample_size, minibatch)
+        for k in range(2, min(11, len(X)))
+    )
+
+    best = None
+    for candidate in candidates:
+        logging.info(
+            "KMeans k=%s: silhouette=%s, fit %.2fs, silhouette %.2fs",
+            candidate["k"],
+            "n/a" if candidate["silhouette"] is None else f"{candidate['silhouette']:.3f}",
+            candidate["fit_seconds"],
+            candidate["silhouette_seconds"],
+        )
+        if candidate["silhouette"] is not None and (best is None or candidate["silhouette"] > best["silhouette"]):
+            best = candidate
+    if report is not None:
+        report["kmeans_sweep"] = [
+            {key: value for key, value in candidate.items() if key != "labels"}
+            for candidate in candidates
+        ]
+        report["kmeans_minibatch"] = minibatch
+    if best is None:
         raise ValueError("No valid clustering found (silhouette score could not be computed for any k)")
-    return f"kmeans_k{best_k}", best_labels, best_score
+    return f"kmeans_k{best['k']}", best["labels"], best["silhouette"]
 
 
-def run_topic_model(X: np.ndarray) -> Tuple[str, np.ndarray, float, Optional[np.ndarray]]:
-    min_cluster_size = int(os.environ.get("LITE_MIN_TOPIC_SIZE", "5"))
-    min_samples = int(os.environ.get("LITE_MIN_TOPIC_SAMPLES", "2"))
-    clusterer = hdbscan.HDBSCAN(
+def build_topic_clusterer(min_cluster_size: Optional[int] = None, min_samples: Optional[int] = None) -> hdbscan.HDBSCAN:
+    if min_cluster_size is None:
+        min_cluster_size = int(os.environ.get("LITE_MIN_TOPIC_SIZE", "5"))
+    if min_samples is None:
+        min_samples = int(os.environ.get("LITE_MIN_TOPIC_SAMPLES", "2"))
+    return hdbscan.HDBSCAN(
         min_cluster_size=max(2, min_cluster_size),
         min_samples=max(1, min_samples),
         metric="euclidean",
         prediction_data=True,
     )
+
+
+def run_topic_model(X: np.ndarray, clusterer: Optional[hdbscan.HDBSCAN] = None) -> Tuple[str, np.ndarray, float, Optional[np.ndarray]]:
+    clusterer = clusterer or build_topic_clusterer()
     labels = clusterer.fit_predict(X)
     topic_count = len(set(labels) - {-1})
     if topic_count >= 2:
@@ -335,6 +888,139 @@ def run_topic_model(X: np.ndarray) -> Tuple[str, np.ndarray, float, Optional[np.
     probabilities = getattr(clusterer, "probabilities_", None)
     return f"hdbscan_topics_{topic_count}", labels, score, probabilities
 
+
+def save_topic_model(reducer, clusterer, model_dir: str) -> str:
+    """Pickle a fitted UMAP reducer and HDBSCAN clusterer for later incremental runs."""
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, f"topic_model_{datetime.now():%Y%m%d_%H%M%S_%f}.joblib")
+    joblib.dump({"reducer": reducer, "clusterer": clusterer}, path)
+    return path
+
+
+def load_previous_topic_model(cfg: dict, embedding_model: str) -> Optional[dict]:
+    """Find the newest completed job for the same search with a saved topic model."""
+    if os.environ.get("LITE_INCREMENTAL_TOPICS", "1") != "1" or not setup_django():
+        return None
+    from api.models import PaperTopic, SearchJob
+
+    try:
+        job = (
+            SearchJob.objects.filter(
+                status="completed",
+                query=", ".join(cfg.get("must_include", [])),
+                optional_keywords=", ".join(cfg.get("optional_keywords", [])),
+                metadata__topic_model__path__isnull=False,
+                metadata__embedding_model=embedding_model,
+            )
+            .order_by("-created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        saved = joblib.load(job.metadata["topic_model"]["path"])
+    except Exception as exc:
+        logging.warning("Saved topic model unavailable, refitting: %s", exc)
+        return None
+
+    assignments = {
+        arxiv_id: (cluster_id, confidence)
+        for arxiv_id, cluster_id, confidence in PaperTopic.objects.filter(search_job=job)
+        .values_list("paper__arxiv_id", "topic__cluster_id", "confidence")
+        .iterator(chunk_size=2000)
+    }
+    return {"job_id": job.id, "info": job.metadata["topic_model"], "assignments": assignments, **saved}
+
+
+def prune_topic_models(search_job_id: int):
+    """Delete topic model files superseded by this job's model for the same search.
+
+    Runs once the job's row has committed as completed. Only the file the newest
+    completed job for the same search and embedding model references is kept,
+    since that is the one load_previous_topic_model() will pick.
+    """
+    if not setup_django():
+        return
+    try:
+        from api.models import SearchJob
+
+        job = SearchJob.objects.get(pk=search_job_id, status="completed")
+        paths = list(
+            SearchJob.objects.filter(
+                status="completed",
+                query=job.query,
+                optional_keywords=job.optional_keywords,
+                metadata__embedding_model=(job.metadata or {}).get("embedding_model"),
+                metadata__topic_model__path__isnull=False,
+            )
+            .order_by("-created_at")
+            .values_list("metadata__topic_model__path", flat=True)
+        )
+        superseded = set(paths[1:]) - set(paths[:1])
+    except Exception as exc:
+        logging.warning("Could not prune topic models for SearchJob %s: %s", search_job_id, exc)
+        return
+    for path in superseded:
+        try:
+            os.remove(path)
+            logging.info("Removed superseded topic model %s", path)
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logging.warning("Could not remove topic model %s: %s", path, exc)
+
+
+def assign_topics_incrementally(X: np.ndarray, papers, previous: Optional[dict]):
+    """Label papers with a saved topic model instead of refitting UMAP and HDBSCAN.
+
+    Papers the previous job already assigned keep their topic; only new papers
+    are projected with umap.transform and labelled with approximate_predict.
+    Returns None (meaning: refit) when the share of new papers the saved model
+    calls outliers exceeds LITE_TOPIC_DRIFT_THRESHOLD.
+    """
+    if previous is None:
+        return None
+    known = previous["assignments"]
+    ids = [paper_arxiv_id(p) for p in papers]
+    labels = np.full(len(papers), -1, dtype=int)
+    probabilities = np.zeros(len(papers), dtype=float)
+    for index, arxiv_id in enumerate(ids):
+        if arxiv_id in known:
+            labels[index] = known[arxiv_id][0]
+            probabilities[index] = known[arxiv_id][1] or 0.0
+
+    new_index = [index for index, arxiv_id in enumerate(ids) if arxiv_id not in known]
+    drift = 0.0
+    if new_index:
+        projected = previous["reducer"].transform(X[new_index])
+        new_labels, strengths = hdbscan.approximate_predict(previous["clusterer"], projected)
+        drift = float(np.mean(new_labels == -1))
+        threshold = float(os.environ.get("LITE_TOPIC_DRIFT_THRESHOLD", "0.3"))
+        if drift > threshold:
+            logging.info("Topic drift %.2f exceeds %.2f; refitting the topic model.", drift, threshold)
+            return None
+        labels[new_index] = new_labels
+        probabilities[new_index] = strengths
+
+    topic_count = len(set(labels.tolist()) - {-1})
+    if topic_count < 2:
+        return None
+    score = cosine_silhouette(X[labels != -1], labels[labels != -1]) or 0
+    logging.info(
+        "Assigned %s new papers with the topic model from SearchJob %s (drift %.2f)",
+        len(new_index),
+        previous["job_id"],
+        drift,
+    )
+    info = {
+        **previous["info"],
+        "mode": "incremental",
+        "source_job_id": previous["job_id"],
+        "new_papers": len(new_index),
+        "drift": round(drift, 3),
+    }
+    return f"hdbscan_topics_{topic_count}_incremental", labels, score, probabilities, info
+
+
 # This function checks the paper's title and abstract for required or optional keywords
 def is_relevant(paper, must: List[str], opt: List[str]) -> bool:
     """Check if a paper is relevant based on must-have and optional keywords.
@@ -382,25 +1068,62 @@ def is_relevant(paper, must: List[str], opt: List[str]) -> bool:
     
     return is_relevant
 
+def output_tag(search_job_id: Optional[int]) -> str:
+    """Part of a log or CSV file name that says which run wrote it."""
+    return f"job{search_job_id}" if search_job_id else "cli"
+
+
+def in_flight_job_ids() -> Optional[Set[int]]:
+    """Ids of queued and processing SearchJobs, or None when the database cannot be read."""
+    if not setup_django():
+        return None
+    try:
+        from api.models import SearchJob
+
+        return set(SearchJob.objects.filter(status__in=("queued", "processing")).values_list("id", flat=True))
+    except Exception as exc:
+        logging.warning("Could not list running jobs: %s", exc)
+        return None
+
+
+def remove_previous_outputs(directory: str, prefix: str, suffix: str, search_job_id: Optional[int], keep: str):
+    """Delete earlier logs or CSVs that no other running search still writes to.
+
+    File names carry output_tag(). Files of other queued or processing jobs
+    are left alone, so concurrent jobs in the worker pool never delete each
+    other's files; command-line runs only clean up command-line files. When
+    the job table cannot be read, only this run's own files are removed.
+    """
+    own = f"_{output_tag(search_job_id)}_"
+    running = in_flight_job_ids()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not (name.startswith(prefix) and name.endswith(suffix)) or path == keep:
+            continue
+        if own not in name:
+            match = re.search(r"_job(\d+)_", name)
+            if running is None or "_cli_" in name or (match and int(match.group(1)) in running):
+                continue
+        try:
+            os.remove(path)
+            logging.info("Removed old file: %s", name)
+        except OSError as exc:
+            logging.warning("Failed to remove old file %s: %s", name, exc)
+
+
 # This function saves a csv file with columns of Title, Abstract, Authors, Month, Year, and Cluster
-def save_csv(papers, labels, name, out_dir, topic_labels=None, topic_keywords=None, probabilities=None):
+def save_csv(papers, labels, name, out_dir, topic_labels=None, topic_keywords=None, probabilities=None, search_job_id=None):
     # Month names mapping
     MONTH_NAMES = [
         "January", "February", "March", "April", "May", "June",
         "July", "August", "September", "October", "November", "December"
     ]
     
-    # Remove old CSV files with the same pattern
-    for old_file in os.listdir(out_dir):
-        if old_file.startswith("arxiv_with_authors_") and old_file.endswith(".csv"):
-            try:
-                os.remove(os.path.join(out_dir, old_file))
-                logging.info("Removed old CSV file: %s", old_file)
-            except Exception as e:
-                logging.warning("Failed to remove old CSV file %s: %s", old_file, str(e))
-    
-    # Create new CSV file
-    path = os.path.join(out_dir, f"arxiv_with_authors_{name}_{datetime.now():%Y%m%d_%H%M%S}.csv")
+    # Create new CSV file, named after the run so concurrent jobs keep their own
+    path = os.path.join(
+        out_dir, f"arxiv_with_authors_{name}_{output_tag(search_job_id)}_{datetime.now():%Y%m%d_%H%M%S}.csv"
+    )
+    remove_previous_outputs(out_dir, "arxiv_with_authors_", ".csv", search_job_id, keep=path)
     with open(path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         # Add Month and Year columns to the header
@@ -433,18 +1156,53 @@ def save_csv(papers, labels, name, out_dir, topic_labels=None, topic_keywords=No
     logging.info("CSV with authors, month names, and year saved → %s", path)
 
 
-def main():
+def close_log_files():
+    """Detach and close the root logger's file handlers, so a finished run's log file is released."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.FileHandler):
+            root.removeHandler(handler)
+            handler.close()
+
+
+def main(search_job_id: Optional[int] = None):
+    """Run one search. Results land on search_job_id (or LITE_SEARCH_JOB_ID) when the API queued a job."""
+    search_job_id = search_job_id or int(os.environ.get("LITE_SEARCH_JOB_ID") or 0) or None
+    mark_search_job(search_job_id, status="processing")
+    emit_job_event(search_job_id, "processing", {"job_id": search_job_id})
+    try:
+        run_search(search_job_id)
+    except Exception as exc:
+        mark_search_job(search_job_id, status="failed", error_message=str(exc))
+        raise
+    finally:
+        emit_final_event(search_job_id)
+        # A resident worker runs many jobs; each one's log file is closed when it ends.
+        close_log_files()
+
+
+def run_search(search_job_id: Optional[int] = None):
+    global _IMPORTS_CHARGED
     started_at = time.perf_counter()
+    # Only the first run in a fresh process pays for the heavy imports.
+    startup = {"import_seconds": 0.0 if _IMPORTS_CHARGED else round(IMPORT_SECONDS, 3)}
+    _IMPORTS_CHARGED = True
     # Load configuration
-    cfg = load_config()
+    cfg = load_config(search_job_id)
+    settings = cfg["settings"]
     must_kw = clean_keywords(cfg.get("must_include", []))
     opt_kw = clean_keywords(cfg.get("optional_keywords", []))
     start_d, end_d = cfg.get("start_date"), cfg.get("end_date")
+    if cfg.get("fingerprint"):
+        fingerprint, fingerprint_components = cfg["fingerprint"], cfg.get("fingerprint_components")
+    else:
+        fingerprint, fingerprint_components = search_fingerprint(must_kw, opt_kw, start_d, end_d, settings)
     
     # Set up directories
     BASE_DIR = os.environ.get("ARXIV_EXTRACTOR_BASE_DIR", os.getcwd())
     LOG_DIR = os.path.join(BASE_DIR, "logs")
     OUT_DIR = os.path.join(BASE_DIR, "out")
+    MODEL_DIR = os.path.join(BASE_DIR, "models")
     
     os.makedirs(LOG_DIR, exist_ok=True)
     os.makedirs(OUT_DIR, exist_ok=True)
@@ -458,24 +1216,17 @@ def main():
         os.makedirs(LOG_DIR, exist_ok=True, mode=0o755)
         print(f"Using alternative log directory: {LOG_DIR}")
     
-    # Configure logging with a timestamped log file
-    log_file = os.path.join(LOG_DIR, f"arxiv_extractor_{datetime.now():%Y%m%d_%H%M%S}.log")
+    # Configure logging with a timestamped log file named after the run
+    log_file = os.path.join(LOG_DIR, f"arxiv_extractor_{output_tag(search_job_id)}_{datetime.now():%Y%m%d_%H%M%S}.log")
     
-    # Remove old log files before creating a new one
+    # Remove old log files that no running search still writes to
     try:
-        log_files = glob.glob(os.path.join(LOG_DIR, "arxiv_extractor_*.log"))
-        for old_log in log_files:
-            if old_log != log_file:  # Don't remove the new log file we're about to create
-                try:
-                    os.remove(old_log)
-                    logging.info(f"Removed old log file: {os.path.basename(old_log)}")
-                except OSError as e:
-                    print(f"Error removing log file {old_log}: {e}")
+        remove_previous_outputs(LOG_DIR, "arxiv_extractor_", ".log", search_job_id, keep=log_file)
     except Exception as e:
         print(f"Error during log cleanup: {e}")
     
-    # Clear existing log handlers
-    logging.getLogger().handlers = []
+    # Close the handlers of any earlier run; basicConfig(force=True) below replaces the rest
+    close_log_files()
     
     # Set up file handler
     file_handler = logging.FileHandler(log_file, encoding='utf-8')
@@ -496,8 +1247,8 @@ def main():
     logging.info(f"Log file: {log_file}")
     print(f"Logging to file: {log_file}")  # Always print log file location to console
     
-    # Maximum number of papers to fetch (override via env for low-memory deploys)
-    MAX_PAPERS = int(os.environ.get("LITE_MAX_PAPERS", "100"))
+    # Maximum number of papers to fetch (LITE_MAX_PAPERS, or the search's max_papers)
+    MAX_PAPERS = int(settings["max_papers"])
     
     logging.info("Starting arXiv paper extraction")
     logging.info(f"Must include keywords: {must_kw}")
@@ -507,68 +1258,38 @@ def main():
     logging.info(f"Log file: {log_file}")
     logging.info(f"Maximum papers to fetch: {MAX_PAPERS}")
 
-    client = arxiv.Client(
-        page_size=100,  # Number of results per page
-        delay_seconds=1,  # Delay between API requests
-        num_retries=3    # Number of retries for failed requests
+    # Running counts, attached to every stage event streamed to the client.
+    progress = {}
+    profiler = StageProfiler(
+        listener=lambda event, name, entry: emit_job_event(
+            search_job_id, event, {"stage": name, **entry, "counts": dict(progress)}
+        )
     )
-    papers = []
-    seen_papers: Set[str] = set()
-    total_seen = 0
-    skipped_duplicates = 0
-    skipped_irrelevant = 0
-    
-    for q in generate_queries(must_kw, opt_kw, start_d, end_d):
-        if len(papers) >= MAX_PAPERS:
-            logging.info(f"Reached maximum paper limit of {MAX_PAPERS}, stopping search")
-            break
-            
-        try:
-            logging.info("Query: %s", q)
-            # Calculate remaining papers we can fetch
-            remaining = MAX_PAPERS - len(papers)
-            search = arxiv.Search(
-                query=q,
-                max_results=min(1000, remaining * 2),  # Fetch up to twice the remaining to account for filtering
-                sort_by=arxiv.SortCriterion.SubmittedDate,
-                sort_order=arxiv.SortOrder.Descending
-            )
-            
-            # Process results in chunks to handle pagination
-            batch_count = 0
-            for result in client.results(search):
-                if len(papers) >= MAX_PAPERS:
-                    break
-
-                total_seen += 1
-                key = paper_key(result)
-                if key in seen_papers:
-                    skipped_duplicates += 1
-                    continue
-                seen_papers.add(key)
-
-                if not is_relevant(result, must_kw, opt_kw):
-                    skipped_irrelevant += 1
-                    continue
-
-                papers.append(result)
-                batch_count += 1
-                if batch_count % 10 == 0:  # Log more frequently for better progress tracking
-                    logging.info(f"Collected {len(papers)}/{MAX_PAPERS} relevant unique papers (current query: {q})")
-                    
-                if len(papers) >= MAX_PAPERS:
-                    logging.info(f"Reached maximum paper limit of {MAX_PAPERS}")
-                    break
-                    
-        except arxiv.HTTPError as http_err:
-            logging.error(f"HTTP error for query '{q}': {http_err}")
-            continue
-        except arxiv.UnexpectedEmptyPageError:
-            logging.warning(f"Unexpected empty page for query: {q}")
-            continue
-        except Exception as exc:
-            logging.error(f"Unexpected error for query '{q}': {exc}")
-            continue
+    filter_seconds = []
+
+    def timed_is_relevant(result) -> bool:
+        filter_started = time.perf_counter()
+        relevant = is_relevant(result, must_kw, opt_kw)
+        filter_seconds.append(time.perf_counter() - filter_started)
+        return relevant
+
+    planned_queries, watermarks = plan_queries(must_kw, opt_kw, start_d, end_d)
+    with profiler.stage("fetch") as stage:
+        papers, fetch_metrics = fetch_papers(list(planned_queries), MAX_PAPERS, timed_is_relevant, paper_arxiv_id)
+        stage["items"] = len(papers)
+        progress.update(papers_scanned=fetch_metrics["total_seen"], papers_matched=len(papers))
+    # arXiv's result counts are only known from the first page of each query.
+    mark_search_job(search_job_id, total_available=fetch_metrics["total_available"])
+    # Filtering runs inside the fetch threads, so it is reported as summed time.
+    profiler.record("filter", items=len(filter_seconds), wall_seconds=round(sum(filter_seconds), 3))
+    total_seen = fetch_metrics["total_seen"]
+    skipped_duplicates = fetch_metrics["skipped_duplicates"]
+    skipped_irrelevant = fetch_metrics["skipped_irrelevant"]
+    fresh_count = len(papers)
+    with profiler.stage("merge_stored") as stage:
+        kept_ids = merge_stored_papers(papers, watermarks, start_d, end_d, MAX_PAPERS, must_kw, opt_kw)
+        stage["items"] = len(papers) - fresh_count
+        progress["papers_matched"] = len(papers)
 
     papers.sort(key=lambda p: p.published, reverse=True)
     logging.info(
@@ -579,60 +1300,165 @@ def main():
         skipped_irrelevant,
     )
     if not papers:
-        logging.info("No relevant papers found."); return
+        logging.info("No relevant papers found.")
+        mark_search_job(search_job_id, status="failed", error_message="No relevant papers found.")
+        return
 
     abstracts = [re.sub(r"\s+", " ", p.title + " " + p.summary).strip() for p in papers]
+    with profiler.stage("term_matrix", items=len(abstracts)):
+        try:
+            term_matrix = build_term_matrix(abstracts)
+        except ValueError:
+            term_matrix = None
 
     # Allow disabling embeddings/clustering for low-memory environments (e.g., Render free tier)
-    disable_embeddings = os.environ.get("LITE_DISABLE_EMBEDDINGS", "0") == "1"
+    disable_embeddings = settings["disable_embeddings"] == "1"
     if disable_embeddings:
         best_name = "topics_disabled_k1"
         best_labels = [0 for _ in papers]
-        topic_keywords = extract_keywords(abstracts, np.array(best_labels))
+        topic_keywords = extract_keywords(abstracts, np.array(best_labels), term_matrix=term_matrix)
         topic_labels = {cid: title_from_keywords(words) for cid, words in topic_keywords.items()}
-        save_csv(papers, best_labels, best_name, OUT_DIR, topic_labels, topic_keywords)
+        save_csv(papers, best_labels, best_name, OUT_DIR, topic_labels, topic_keywords, search_job_id=search_job_id)
         print("Embeddings disabled (LITE_DISABLE_EMBEDDINGS=1). Saved single-cluster CSV.")
+        # The papers are still a valid result: store them as one topic so the job completes.
+        persist_results_to_database(
+            papers,
+            np.array(best_labels),
+            topic_labels,
+            topic_keywords,
+            None,
+            cfg,
+            {
+                "total_seen": total_seen,
+                "total_available": fetch_metrics["total_available"],
+                "skipped_duplicates": skipped_duplicates,
+                "skipped_irrelevant": skipped_irrelevant,
+                "fingerprint": fingerprint,
+                "fingerprint_components": fingerprint_components,
+                "startup": startup,
+                "note": "Embeddings disabled (LITE_DISABLE_EMBEDDINGS=1); papers were not clustered.",
+            },
+            time.perf_counter() - started_at,
+            search_job_id=search_job_id,
+        )
         return
 
-    embedding_model = os.environ.get("LITE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-    logging.info("Embedding model: %s", embedding_model)
-    model = SentenceTransformer(embedding_model)
-    X = model.encode(abstracts, show_progress_bar=True, convert_to_numpy=True, normalize_embeddings=True)
+    embedding_model = settings["embedding_model"]
+    backend = embedding_backend()
+    logging.info("Embedding model: %s (%s backend)", embedding_model, backend)
+    with profiler.stage("model_load"):
+        model, model_load_seconds, model_warm = get_embedding_model(embedding_model, backend)
+    startup["model_load_seconds"] = round(model_load_seconds, 3)
+    startup["mode"] = "warm" if model_warm else "cold"
+    logging.info(
+        "Pipeline startup (%s): imports %.2fs, model load %.2fs",
+        startup["mode"],
+        startup["import_seconds"],
+        startup["model_load_seconds"],
+    )
+    with profiler.stage("encode", items=len(abstracts)):
+        X, embedding_cache = encode_with_cache(
+            model, embedding_cache_name(embedding_model, backend), papers, abstracts
+        )
+        progress["papers_embedded"] = len(X)
 
-    X_umap = umap.UMAP(n_components=20, metric='cosine', random_state=42).fit_transform(X)
+    clustering_mode = settings["clustering_mode"].lower()
+    clustering_report = {}
+    incremental_topics = None
+    if clustering_mode != "kmeans":
+        with profiler.stage("topic_assign", items=len(papers)):
+            incremental_topics = assign_topics_incrementally(
+                X, papers, load_previous_topic_model(cfg, embedding_model)
+            )
 
-    clustering_mode = os.environ.get("LITE_CLUSTERING_MODE", "hdbscan").lower()
-    if clustering_mode == "kmeans":
-        best_name, best_labels, best_score = run_clustering_models(X_umap)
-        probabilities = None
+    if incremental_topics is not None:
+        best_name, best_labels, best_score, probabilities, clustering_report["topic_model"] = incremental_topics
     else:
-        best_name, best_labels, best_score, probabilities = run_topic_model(X_umap)
-        if len(set(best_labels) - {-1}) < 2:
-            logging.info("HDBSCAN found fewer than 2 topics; falling back to KMeans.")
-            best_name, best_labels, best_score = run_clustering_models(X_umap)
+        with profiler.stage("umap", items=len(X)):
+            reducer = umap.UMAP(n_components=20, metric='cosine', random_state=42)
+            X_umap = reducer.fit_transform(X)
+        if clustering_mode == "kmeans":
+            with profiler.stage("kmeans", items=len(X_umap)):
+                best_name, best_labels, best_score = run_clustering_models(X_umap, clustering_report)
             probabilities = None
+        else:
+            clusterer = build_topic_clusterer(int(settings["min_topic_size"]), int(settings["min_topic_samples"]))
+            with profiler.stage("hdbscan", items=len(X_umap)):
+                best_name, best_labels, best_score, probabilities = run_topic_model(X_umap, clusterer)
+            if len(set(best_labels) - {-1}) < 2:
+                logging.info("HDBSCAN found fewer than 2 topics; falling back to KMeans.")
+                with profiler.stage("kmeans", items=len(X_umap)):
+                    best_name, best_labels, best_score = run_clustering_models(X_umap, clustering_report)
+                probabilities = None
+            else:
+                try:
+                    clustering_report["topic_model"] = {
+                        "path": save_topic_model(reducer, clusterer, MODEL_DIR),
+                        "mode": "refit",
+                        "fitted_papers": len(X),
+                    }
+                except Exception as exc:
+                    logging.warning("Could not save topic model: %s", exc)
 
-    topic_keywords = extract_keywords(abstracts, np.array(best_labels))
-    groq_labels = polish_topic_labels_with_groq(topic_keywords)
+    progress["topics_found"] = len(set(best_labels) - {-1})
+    progress["outliers_found"] = int(np.sum(np.array(best_labels) == -1))
+    with profiler.stage("keywords") as stage:
+        topic_keywords = extract_keywords(abstracts, np.array(best_labels), term_matrix=term_matrix)
+        stage["items"] = len(topic_keywords)
+    with profiler.stage("groq") as stage:
+        groq_labels = polish_topic_labels_with_groq(topic_keywords)
+        stage["items"] = len(groq_labels)
     topic_labels = {
         cid: groq_labels.get(cid) or title_from_keywords(words)
         for cid, words in topic_keywords.items()
     }
-    save_csv(papers, best_labels, best_name, OUT_DIR, topic_labels, topic_keywords, probabilities)
-    persist_results_to_database(
-        papers,
-        np.array(best_labels),
-        topic_labels,
-        topic_keywords,
-        probabilities,
-        cfg,
-        {
-            "total_seen": total_seen,
-            "skipped_duplicates": skipped_duplicates,
-            "skipped_irrelevant": skipped_irrelevant,
-        },
-        time.perf_counter() - started_at,
-    )
+    with profiler.stage("csv", items=len(papers)):
+        save_csv(papers, best_labels, best_name, OUT_DIR, topic_labels, topic_keywords, probabilities, search_job_id=search_job_id)
+    with profiler.stage("persist", items=len(papers)):
+        search_job_id = persist_results_to_database(
+            papers,
+            np.array(best_labels),
+            topic_labels,
+            topic_keywords,
+            probabilities,
+            cfg,
+            {
+                "total_seen": total_seen,
+                "total_available": fetch_metrics["total_available"],
+                "arxiv_total_results": {
+                    query: info["total_results"] for query, info in fetch_metrics["queries"].items()
+                },
+                "skipped_duplicates": skipped_duplicates,
+                "skipped_irrelevant": skipped_irrelevant,
+                "fingerprint": fingerprint,
+                "fingerprint_components": fingerprint_components,
+                "startup": startup,
+                "embedding_cache": embedding_cache,
+                "clustering": clustering_report,
+                "incremental": {
+                    "delta_queries": sum(1 for base in planned_queries.values() if base in watermarks),
+                    "fresh_papers": fresh_count,
+                    "reused_papers": len(papers) - fresh_count,
+                },
+            },
+            time.perf_counter() - started_at,
+            search_job_id=search_job_id,
+        )
+    if search_job_id is not None and os.environ.get("LITE_EMBEDDING_CACHE", "1") == "1":
+        with profiler.stage("semantic_index", items=len(papers)):
+            update_semantic_index(embedding_cache_name(embedding_model, backend))
+    if search_job_id is not None:
+        with profiler.stage("related", items=len(papers)):
+            store_related(search_job_id, papers, X, embedding_cache_name(embedding_model, backend))
+    if search_job_id is not None and clustering_report.get("topic_model"):
+        prune_topic_models(search_job_id)
+    if search_job_id is not None:
+        save_job_profile(search_job_id, profiler.report())
+    if search_job_id is not None and os.environ.get("LITE_INCREMENTAL_FETCH", "1") == "1":
+        try:
+            update_query_watermarks(planned_queries, watermarks, fetch_metrics["queries"], kept_ids, start_d, end_d)
+        except Exception as exc:
+            logging.warning("Could not update query watermarks: %s", exc)
 
     topic_count = len(set(best_labels) - {-1})
     outlier_count = int(np.sum(np.array(best_labels) == -1))
@@ -0,0 +1,231 @@
+"""
+Scaling benchmark for the topic-modeling pipeline.
+
+Generates synthetic corpora with generate_sample_data.generate_corpus() and
+runs each stage of arxiv_kmeans_sbert_umap.py on them offline (no arXiv or
+Groq calls), profiling every stage with StageProfiler. The JSON report lists
+each corpus size and a per-stage scaling exponent between consecutive sizes
+(about 1.0 is linear, about 2.0 quadratic), which shows where the curve bends
+before LITE_MAX_PAPERS is raised.
+
+Usage:
+    python scripts/benchmark_pipeline.py --sizes 1000,10000,100000
+    python scripts/benchmark_pipeline.py --sizes 1000,10000 --embeddings synthetic --stages umap,hdbscan,keywords
+"""
+import os
+import sys
+import json
+import math
+import logging
+import platform
+import argparse
+from datetime import datetime, timezone
+
+import arxiv
+import numpy as np
+import umap
+
+import arxiv_kmeans_sbert_umap as pipeline
+from embedding_pool import encode_sharded
+from generate_sample_data import generate_corpus
+from stage_profiler import StageProfiler
+
+STAGES = ("encode", "umap", "hdbscan", "kmeans", "keywords", "persist")
+BENCHMARK_QUERY = "pipeline benchmark"
+
+
+def corpus_to_results(corpus: list) -> list:
+    """Wrap generated rows as arxiv.Result objects, the shape every pipeline stage expects."""
+    results = []
+    for row in corpus:
+        published = datetime.strptime(row["Published"], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        results.append(arxiv.Result(
+            entry_id=f"https://arxiv.org/abs/{row['id']}",
+            updated=published,
+            published=published,
+            title=row["Title"],
+            authors=[arxiv.Result.Author(name) for name in row["Authors"].split(", ")],
+            summary=row["Abstract"],
+            primary_category="cs.LG",
+            categories=["cs.LG"],
+        ))
+    return results
+
+
+def synthetic_embeddings(true_topics: np.ndarray, dims: int = 384, seed: int = 42) -> np.ndarray:
+    """Normalized topic-centroid-plus-noise vectors, for benchmarking without a model."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(true_topics.max() + 1, dims))
+    X = centroids[true_topics] + rng.normal(scale=0.8, size=(len(true_topics), dims))
+    return (X / np.linalg.norm(X, axis=1, keepdims=True)).astype(np.float32)
+
+
+def persist_and_roll_back(papers, labels, topic_labels, topic_keywords, probabilities):
+    """Run the persist stage inside a transaction that is always rolled back.
+
+    The benchmark's SearchJob and bench.* papers are never committed, so the
+    API never serves them as the latest job and an interrupted run leaves
+    nothing behind. The per-chunk transactions become savepoints.
+    """
+    from django.db import transaction
+
+    cfg = {"must_include": [BENCHMARK_QUERY]}
+    with transaction.atomic():
+        pipeline.persist_results_to_database(
+            papers, labels, topic_labels, topic_keywords, probabilities, cfg, {}, 0.0,
+        )
+        transaction.set_rollback(True)
+
+
+def warm_up_jit(seed: int):
+    """Compile UMAP's and HDBSCAN's numba kernels so the smallest size is not charged for it."""
+    X = synthetic_embeddings(np.arange(300) % 5, seed=seed)
+    pipeline.run_topic_model(umap.UMAP(n_components=20, metric="cosine", random_state=42).fit_transform(X))
+
+
+def run_size(size: int, stages: set, embeddings: str, seed: int) -> dict:
+    corpus = generate_corpus(size, seed=seed)
+    papers = corpus_to_results(corpus)
+    abstracts = [" ".join((p.title + " " + p.summary).split()) for p in papers]
+    true_topics = np.array([int(row["Cluster"]) for row in corpus])
+    profiler = StageProfiler()
+    run = {"papers": size, "true_topics": int(true_topics.max() + 1), "errors": {}}
+
+    def attempt(name, func):
+        try:
+            return func()
+        except Exception as exc:
+            logging.exception("Stage %s failed for %s papers", name, size)
+            run["errors"][name] = str(exc)
+            return None
+
+    if embeddings == "model" and "encode" in stages:
+        model_name = os.environ.get("LITE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        backend = pipeline.embedding_backend()
+        with profiler.stage("model_load"):
+            model, _, _ = pipeline.get_embedding_model(model_name, backend)
+        with profiler.stage("encode", items=size):
+            encoded = attempt("encode", lambda: encode_sharded(model, abstracts))
+        X, run["encode"] = encoded if encoded else (None, None)
+        run["embeddings"] = {"source": "model", "model": model_name, "backend": backend}
+    else:
+        X = synthetic_embeddings(true_topics, seed=seed)
+        run["embeddings"] = {"source": "synthetic", "dimensions": X.shape[1]}
+    if X is None:
+        run.update(profiler.report())
+        return run
+
+    X_umap = X
+    if "umap" in stages:
+        with profiler.stage("umap", items=size):
+            reduced = attempt("umap", lambda: umap.UMAP(n_components=20, metric="cosine", random_state=42).fit_transform(X))
+        X_umap = reduced if reduced is not None else X
+
+    labels, probabilities = None, None
+    if "hdbscan" in stages:
+        with profiler.stage("hdbscan", items=size):
+            result = attempt("hdbscan", lambda: pipeline.run_topic_model(X_umap))
+            if result:
+                _, labels, score, probabilities = result
+                run["hdbscan"] = {
+                    "topics": len(set(labels.tolist()) - {-1}),
+                    "outliers": int(np.sum(labels == -1)),
+                    "silhouette": round(float(score), 4),
+                }
+    if "kmeans" in stages:
+        report = {}
+        with profiler.stage("kmeans", items=size):
+            result = attempt("kmeans", lambda: pipeline.run_clustering_models(X_umap, report))
+        if result:
+            run["kmeans"] = {"model": result[0], "silhouette": round(float(result[2]), 4), **report}
+            if labels is None:
+                labels = result[1]
+    if labels is None:
+        labels = true_topics
+
+    topic_keywords = {}
+    if "keywords" in stages:
+        with profiler.stage("term_matrix", items=size):
+            term_matrix = attempt("term_matrix", lambda: pipeline.build_term_matrix(abstracts))
+        with profiler.stage("keywords", items=size):
+            topic_keywords = attempt(
+                "keywords", lambda: pipeline.extract_keywords(abstracts, np.asarray(labels), term_matrix=term_matrix)
+            ) or {}
+
+    if "persist" in stages and pipeline.setup_django():
+        topic_labels = {cid: pipeline.title_from_keywords(words) for cid, words in topic_keywords.items()}
+        with profiler.stage("persist", items=size):
+            attempt("persist", lambda: persist_and_roll_back(
+                papers, np.asarray(labels), topic_labels, topic_keywords, probabilities,
+            ))
+
+    run.update(profiler.report())
+    return run
+
+
+def scaling_exponents(runs: list) -> dict:
+    """log(t2/t1) / log(n2/n1) per stage for each pair of consecutive sizes."""
+    exponents = {}
+    for smaller, larger in zip(runs, runs[1:]):
+        for name, stage in larger["stages"].items():
+            before = smaller["stages"].get(name, {}).get("wall_seconds")
+            after = stage.get("wall_seconds")
+            if not before or not after or smaller["papers"] == larger["papers"]:
+                continue
+            exponent = math.log(after / before) / math.log(larger["papers"] / smaller["papers"])
+            exponents.setdefault(name, []).append({
+                "from": smaller["papers"],
+                "to": larger["papers"],
+                "exponent": round(exponent, 2),
+            })
+    return exponents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic corpora")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated corpus sizes")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--embeddings", choices=("model", "synthetic"), default="model",
+                        help="Encode with the real model or use synthetic topic vectors (default: model)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Report path (default: scripts/out/benchmark_<timestamp>.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(message)s")
+    sizes = sorted(int(size) for size in args.sizes.split(",") if size.strip())
+    stages = {stage.strip() for stage in args.stages.split(",") if stage.strip()}
+    unknown = stages - set(STAGES)
+    if unknown:
+        sys.exit(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    if stages & {"umap", "hdbscan"}:
+        warm_up_jit(args.seed)
+    runs = []
+    for size in sizes:
+        logging.info("Benchmarking %s papers", size)
+        runs.append(run_size(size, stages, args.embeddings, args.seed))
+        logging.info("%s papers: %.1fs wall, peak RSS %.0f MB", size, runs[-1]["wall_seconds"], runs[-1]["peak_rss_mb"])
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "machine": {
+            "cpu_count": os.cpu_count(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+        },
+        "settings": {key: value for key, value in sorted(os.environ.items()) if key.startswith("LITE_")},
+        "stages": sorted(stages),
+        "runs": runs,
+        "scaling": scaling_exponents(runs),
+    }
+    output = args.output or os.path.join(
+        pipeline.SCRIPT_DIR, "out", f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Parity check and CPU throughput benchmark for the embedding backends.
+
+Encodes the same abstracts with the fp32 model and with a quantized backend
+(see LITE_EMBEDDING_BACKEND), reports per-paper cosine agreement between the two
+and papers/sec for each, and exits non-zero when the mean cosine drops below
+--min-cosine.
+
+Usage:
+    python scripts/embedding_benchmark.py --backend int8 --limit 1000
+    python scripts/embedding_benchmark.py --backend onnx --output out/embedding_benchmark.json
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+
+import numpy as np
+
+from arxiv_kmeans_sbert_umap import EMBEDDING_BACKENDS, SCRIPT_DIR, load_embedding_model, setup_django
+
+
+def load_abstracts(limit: int) -> list:
+    """Abstracts from the Paper table, falling back to the newest pipeline CSV."""
+    if setup_django():
+        from api.models import Paper
+
+        abstracts = list(
+            Paper.objects.exclude(abstract="").order_by("-published_date").values_list("abstract", flat=True)[:limit]
+        )
+        if abstracts:
+            return abstracts
+
+    files = sorted(glob.glob(os.path.join(SCRIPT_DIR, "out", "arxiv_with_authors_*.csv")), key=os.path.getmtime)
+    if not files:
+        return []
+    with open(files[-1], "r", encoding="utf-8", newline="") as f:
+        return [row["Abstract"] for row in csv.DictReader(f) if row.get("Abstract")][:limit]
+
+
+def benchmark_backend(model_name: str, backend: str, abstracts: list, batch_size: int) -> tuple:
+    """Return (normalized embeddings, timing report) for one backend."""
+    load_started = time.perf_counter()
+    model = load_embedding_model(model_name, backend)
+    load_seconds = time.perf_counter() - load_started
+
+    # One small batch first so lazy initialisation is not charged to throughput.
+    model.encode(abstracts[:batch_size], batch_size=batch_size, normalize_embeddings=True)
+    encode_started = time.perf_counter()
+    X = model.encode(abstracts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    encode_seconds = time.perf_counter() - encode_started
+    return X.astype(np.float32), {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "encode_seconds": round(encode_seconds, 3),
+        "papers_per_sec": round(len(abstracts) / max(encode_seconds, 1e-9), 1),
+    }
+
+
+def parity_report(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    """Cosine agreement per paper, plus how often the nearest neighbour is unchanged."""
+    cosines = np.sum(reference * candidate, axis=1)
+    neighbours = []
+    for X in (reference, candidate):
+        sims = X @ X.T
+        np.fill_diagonal(sims, -np.inf)
+        neighbours.append(np.argmax(sims, axis=1))
+    return {
+        "cosine_mean": round(float(cosines.mean()), 5),
+        "cosine_min": round(float(cosines.min()), 5),
+        "cosine_p05": round(float(np.percentile(cosines, 5)), 5),
+        "nearest_neighbour_agreement": round(float(np.mean(neighbours[0] == neighbours[1])), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare an embedding backend against the fp32 model")
+    parser.add_argument("--backend", default=os.environ.get("LITE_EMBEDDING_BACKEND", "int8"),
+                        choices=[b for b in EMBEDDING_BACKENDS if b != "torch"])
+    parser.add_argument("--model", default=os.environ.get("LITE_EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--limit", type=int, default=1000, help="Number of abstracts to encode (default: 1000)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-cosine", type=float, default=0.99,
+                        help="Fail when the mean cosine agreement is below this (default: 0.99)")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    abstracts = load_abstracts(args.limit)
+    if len(abstracts) < 2:
+        sys.exit("No abstracts found; run the pipeline or import_papers first.")
+
+    reference, fp32 = benchmark_backend(args.model, "torch", abstracts, args.batch_size)
+    candidate, quantized = benchmark_backend(args.model, args.backend, abstracts, args.batch_size)
+    report = {
+        "model": args.model,
+        "papers": len(abstracts),
+        "batch_size": args.batch_size,
+        "cpu_count": os.cpu_count(),
+        "fp32": fp32,
+        "candidate": quantized,
+        "speedup": round(quantized["papers_per_sec"] / max(fp32["papers_per_sec"], 1e-9), 2),
+        "parity": parity_report(reference, candidate),
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if report["parity"]["cosine_mean"] < args.min_cosine:
+        sys.exit(f"Mean cosine {report['parity']['cosine_mean']} is below --min-cosine {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Sharded CPU encoding for the topic-modeling pipeline.
+
+Texts are sorted by token length and cut into fixed-size batches, so each batch
+pads to a similar length. With a core budget above one, the batches are spread
+over a pool of forked worker processes that share the parent's model weights
+copy-on-write; each worker runs LITE_EMBEDDING_THREADS_PER_WORKER intra-op
+threads. The parent keeps OMP_NUM_THREADS=1 (set by the API and the resident
+worker), which is also what keeps forking after a previous encode safe.
+
+Kept free of Django and the pipeline's heavy imports so it can be reused by
+the benchmark scripts.
+"""
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Set in the parent right before the pool forks; workers inherit it.
+_MODEL = None
+
+
+def embedding_cores() -> int:
+    """Core budget from LITE_EMBEDDING_CORES; 0 or a negative value uses every core."""
+    cores = int(os.environ.get("LITE_EMBEDDING_CORES", "1"))
+    return cores if cores > 0 else (os.cpu_count() or 1)
+
+
+def token_lengths(model, texts: List[str]) -> List[int]:
+    """Token count per text using the model's tokenizer, or whitespace words as a fallback."""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        try:
+            max_length = getattr(model, "max_seq_length", None) or 512
+            encoded = tokenizer(list(texts), add_special_tokens=True, truncation=True, max_length=max_length)
+            return [len(ids) for ids in encoded["input_ids"]]
+        except Exception as exc:
+            logging.debug("Tokenizer length lookup failed, using word counts: %s", exc)
+    return [len(text.split()) + 2 for text in texts]
+
+
+def length_batches(lengths: List[int], batch_size: int) -> List[np.ndarray]:
+    """Index batches over texts sorted by length, longest first."""
+    order = np.argsort(-np.asarray(lengths), kind="stable")
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def padding_efficiency(lengths: np.ndarray, batches: List[np.ndarray]) -> float:
+    """Share of the padded token grid that holds real tokens."""
+    padded = sum(int(lengths[batch].max()) * len(batch) for batch in batches)
+    return float(lengths.sum()) / max(padded, 1)
+
+
+def _init_worker(threads: int):
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _encode_batch(texts: List[str]) -> Tuple[np.ndarray, float]:
+    started_at = time.perf_counter()
+    X = _MODEL.encode(
+        texts,
+        batch_size=len(texts),
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+    return X.astype(np.float32), time.perf_counter() - started_at
+
+
+def encode_sharded(
+    model,
+    texts: List[str],
+    cores: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    threads_per_worker: Optional[int] = None,
+) -> Tuple[np.ndarray, dict]:
+    """Encode texts in length-bucketed batches over `cores` CPU cores.
+
+    Returns (normalized float32 embeddings in input order, report). The report
+    records the pool shape, overall papers/sec, padding efficiency with and
+    without bucketing, and papers/sec for every batch.
+    """
+    global _MODEL
+    cores = cores or embedding_cores()
+    batch_size = batch_size or int(os.environ.get("LITE_EMBEDDING_BATCH_SIZE", "64"))
+    threads_per_worker = max(1, threads_per_worker or int(os.environ.get("LITE_EMBEDDING_THREADS_PER_WORKER", "1")))
+
+    started_at = time.perf_counter()
+    lengths = np.asarray(token_lengths(model, texts))
+    batches = length_batches(lengths, batch_size)
+    workers = max(1, min(len(batches), cores // threads_per_worker))
+    batch_texts = [[texts[i] for i in batch] for batch in batches]
+
+    _MODEL = model
+    try:
+        if workers == 1:
+            results = [_encode_batch(chunk) for chunk in batch_texts]
+        else:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+                initargs=(threads_per_worker,),
+            )
+            with pool:
+                results = list(pool.map(_encode_batch, batch_texts))
+    finally:
+        _MODEL = None
+
+    dims = results[0][0].shape[1]
+    X = np.empty((len(texts), dims), dtype=np.float32)
+    batch_rates = []
+    for number, (batch, (embeddings, seconds)) in enumerate(zip(batches, results), 1):
+        X[batch] = embeddings
+        batch_rates.append(round(len(batch) / max(seconds, 1e-9), 1))
+        logging.debug(
+            "Embedding batch %s/%s: %s papers, %s tokens, %.1f papers/sec",
+            number, len(batches), len(batch), int(lengths[batch].max()), batch_rates[-1],
+        )
+
+    seconds = time.perf_counter() - started_at
+    unsorted = [np.arange(i, min(i + batch_size, len(texts))) for i in range(0, len(texts), batch_size)]
+    report = {
+        "cores": cores,
+        "workers": workers,
+        "threads_per_worker": threads_per_worker,
+        "batch_size": batch_size,
+        "batches": len(batches),
+        "seconds": round(seconds, 3),
+        "papers_per_sec": round(len(texts) / max(seconds, 1e-9), 1),
+        "padding_efficiency": round(padding_efficiency(lengths, batches), 3),
+        "unsorted_padding_efficiency": round(padding_efficiency(lengths, unsorted), 3),
+        "batch_papers_per_sec": batch_rates,
+    }
+    logging.info(
+        "Encoded %s papers in %.2fs (%.1f papers/sec, %s workers x %s threads, padding efficiency %.2f)",
+        len(texts), seconds, report["papers_per_sec"], workers, threads_per_worker, report["padding_efficiency"],
+    )
+    return X, report
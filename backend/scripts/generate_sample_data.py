@@ -4,7 +4,9 @@ This creates a CSV file with sample paper data that matches the expected format.
 """
 import os
 import csv
-from datetime import datetime
+import random
+import argparse
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # Define the output directory
@@ -65,7 +67,86 @@ sample_papers = [
     }
 ]
 
-def generate_sample_csv():
+# Vocabulary for synthetic corpora: a shared pool of academic filler plus one
+# seed area per topic, so generated abstracts cluster the way real ones do.
+COMMON_WORDS = (
+    "we propose method approach results show model performance data paper novel framework "
+    "experiments demonstrate existing state art significantly improve evaluate analysis based "
+    "learning training task tasks proposed using also new problem study benchmark compared "
+    "efficient robust large scale real world challenging outperforms baseline baselines achieves"
+).split()
+TOPIC_SEEDS = [
+    "language transformer text translation token corpus summarization dialogue",
+    "image vision convolutional segmentation detection pixel object camera",
+    "reinforcement policy agent reward environment exploration control trajectory",
+    "graph node edge network message passing relational embedding",
+    "quantum qubit circuit entanglement gate hamiltonian noise error",
+    "protein molecule drug binding chemical structure folding biology",
+    "speech audio acoustic speaker recognition waveform spectrogram sound",
+    "privacy federated differential attack adversarial security defense client",
+    "robot manipulation grasping locomotion sensor navigation planning motion",
+    "medical clinical patient diagnosis health imaging disease hospital",
+    "optimization gradient convergence stochastic convex descent bound rate",
+    "recommendation user item ranking click preference retrieval search",
+    "causal inference treatment effect counterfactual confounding observational estimator",
+    "time series forecasting temporal sequence anomaly sensor prediction horizon",
+    "generative diffusion sampling score denoising synthesis latent autoencoder",
+    "code program software bug compiler repository synthesis developer",
+    "climate weather satellite earth ocean atmospheric simulation carbon",
+    "fairness bias demographic ethical social harm audit discrimination",
+    "hardware accelerator memory energy chip inference latency edge",
+    "theorem proof logic symbolic reasoning formal verification solver",
+]
+FIRST_NAMES = "Alice Bob Carol David Eva Frank Grace Hiro Ines Jun Kofi Lena Mei Nia Omar Priya Rui Sara Tomas Yara".split()
+LAST_NAMES = "Smith Chen Garcia Kumar Novak Okafor Rossi Sato Silva Tanaka Wang Weber Kim Ivanova Haddad Nguyen".split()
+
+
+def generate_corpus(count, topics=20, seed=42):
+    """
+    Generate `count` synthetic papers with a realistic shape for benchmarks.
+
+    Topic sizes follow a power law, abstract lengths are log-normal (median
+    about 150 words), word frequencies are Zipf-like within each topic and
+    submissions grow over a three-year window. Rows use the same fields as
+    sample_papers, with the true topic in 'Cluster'.
+    """
+    rng = random.Random(seed)
+    topics = max(1, min(topics, len(TOPIC_SEEDS)))
+    topic_weights = [1 / (rank + 1) ** 0.8 for rank in range(topics)]
+    vocabularies = []
+    for topic in range(topics):
+        words = TOPIC_SEEDS[topic].split()
+        words += [f"{words[i % len(words)]}{suffix}" for i, suffix in enumerate(("s", "ing", "ed", "ity", "al", "ive") * 6)]
+        vocabularies.append((words, [1 / (rank + 1) for rank in range(len(words))]))
+    common_weights = [1 / (rank + 1) ** 0.7 for rank in range(len(COMMON_WORDS))]
+    end = datetime(2025, 12, 31)
+
+    papers = []
+    for index in range(count):
+        topic = rng.choices(range(topics), weights=topic_weights)[0]
+        words, weights = vocabularies[topic]
+        length = int(min(400, max(40, rng.lognormvariate(5.0, 0.35))))
+        topical = rng.choices(words, weights=weights, k=int(length * 0.4))
+        filler = rng.choices(COMMON_WORDS, weights=common_weights, k=length - len(topical))
+        body = topical + filler
+        rng.shuffle(body)
+        title_words = rng.choices(words, weights=weights, k=rng.randint(4, 9))
+        published = end - timedelta(days=int(1095 * rng.random() ** 1.5))
+        authors = ", ".join(
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(rng.randint(1, 6))
+        )
+        papers.append({
+            'id': f'bench.{index:07d}',
+            'Title': ' '.join(title_words).capitalize(),
+            'Abstract': ' '.join(body).capitalize() + '.',
+            'Authors': authors,
+            'Published': published.strftime('%Y-%m-%d'),
+            'Cluster': str(topic),
+        })
+    return papers
+
+
+def generate_sample_csv(count=None):
     """Generate a sample CSV file with paper data."""
     # Create a timestamp for the filename
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -77,13 +158,15 @@ def generate_sample_csv():
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
         writer.writeheader()
-        for paper in sample_papers:
+        for paper in (generate_corpus(count) if count else sample_papers):
             writer.writerow(paper)
     
     print(f"Generated sample data file: {filename}")
     return filename
 
 if __name__ == "__main__":
-    csv_file = generate_sample_csv()
+    parser = argparse.ArgumentParser(description="Generate sample paper data")
+    parser.add_argument('--count', type=int, help='Generate this many synthetic papers instead of the 5 samples')
+    csv_file = generate_sample_csv(parser.parse_args().count)
     print(f"Sample data has been generated at: {csv_file}")
     print("You can now use the /api/papers/ endpoint to view the sample data.")
@@ -0,0 +1,52 @@
+"""
+KMeans model selection helpers for the topic-modeling pipeline.
+
+Kept free of the pipeline's heavy imports (torch, umap, hdbscan) so that
+joblib worker processes can unpickle fit_kmeans_candidate cheaply.
+"""
+import os
+import time
+from typing import Optional
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+
+# This function computes the silhouette score, estimated on a random sample above
+# LITE_SILHOUETTE_SAMPLE points since the exact score needs O(n^2) distances
+def cosine_silhouette(X: np.ndarray, labels: np.ndarray, sample_size: Optional[int] = None) -> Optional[float]:
+    if sample_size is None:
+        sample_size = int(os.environ.get("LITE_SILHOUETTE_SAMPLE", "2000"))
+    if len(set(labels)) > 1 and len(X) > len(set(labels)):
+        try:
+            return silhouette_score(
+                X,
+                labels,
+                metric="cosine",
+                sample_size=sample_size if 0 < sample_size < len(X) else None,
+                random_state=42,
+            )
+        except ValueError:
+            # A sample can miss all but one cluster
+            return None
+    return None
+
+
+def fit_kmeans_candidate(X: np.ndarray, k: int, sample_size: int, minibatch: bool) -> dict:
+    """Fit one k of the KMeans sweep and score it; runs inside a worker process."""
+    fit_started = time.perf_counter()
+    if minibatch:
+        km = MiniBatchKMeans(n_clusters=k, random_state=42, n_init="auto", batch_size=4096)
+    else:
+        km = KMeans(n_clusters=k, random_state=42, n_init="auto")
+    labels = km.fit_predict(X)
+    silhouette_started = time.perf_counter()
+    score = cosine_silhouette(X, labels, sample_size)
+    return {
+        "k": k,
+        "labels": labels,
+        "silhouette": None if score is None else float(score),
+        "fit_seconds": round(silhouette_started - fit_started, 3),
+        "silhouette_seconds": round(time.perf_counter() - silhouette_started, 3),
+    }
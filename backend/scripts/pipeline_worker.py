@@ -0,0 +1,237 @@
+"""
+Pipeline worker pool for the LITE backend.
+
+Loads torch, sklearn, umap, hdbscan and the SentenceTransformer model once
+(the model is skipped when LITE_DISABLE_EMBEDDINGS=1), then forks LITE_PIPELINE_WORKERS processes (default 1) that share the loaded
+weights copy-on-write. Each process claims queued SearchJob rows from the
+database (see api/jobs.py) and runs arxiv_kmeans_sbert_umap.main() for them,
+so at most LITE_PIPELINE_WORKERS searches run at once however many the API
+accepts. The parent answers status requests from the API over a local socket
+and restarts worker processes that die.
+
+Run it next to the web process:
+    cd backend
+    python scripts/pipeline_worker.py
+"""
+import os
+import sys
+import time
+import socket
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, os.pardir))
+CACHE_DIR = os.path.join(BACKEND_DIR, ".cache")
+
+WORKER_HOST = os.environ.get("LITE_WORKER_HOST", "127.0.0.1")
+WORKER_PORT = int(os.environ.get("LITE_WORKER_PORT", "8765"))
+# multiprocessing.connection unpickles what it receives, so the status socket
+# is only opened when a secret is configured.
+WORKER_AUTHKEY = os.environ.get("LITE_WORKER_AUTHKEY", "").encode("utf-8")
+POOL_SIZE = max(1, int(os.environ.get("LITE_PIPELINE_WORKERS", "1")))
+POLL_SECONDS = float(os.environ.get("LITE_QUEUE_POLL_SECONDS", "1"))
+
+# Runtime defaults for the pipeline; they must be in place before numba/torch
+# are imported.
+os.environ.setdefault("MPLCONFIGDIR", os.path.join(CACHE_DIR, "matplotlib"))
+os.environ.setdefault("HF_HOME", os.path.join(CACHE_DIR, "huggingface"))
+os.environ.setdefault("TRANSFORMERS_CACHE", os.path.join(CACHE_DIR, "huggingface"))
+os.environ.setdefault("HF_HUB_CACHE", os.path.join(CACHE_DIR, "huggingface"))
+os.environ.setdefault("HF_HUB_DISABLE_XET", "1")
+os.environ.setdefault("ARXIV_EXTRACTOR_BASE_DIR", SCRIPT_DIR)
+os.environ.setdefault("KMP_USE_SHM", "0")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("NUMBA_NUM_THREADS", "1")
+os.environ.setdefault("NUMBA_THREADING_LAYER", "workqueue")
+os.environ.setdefault("PYTHONUNBUFFERED", "1")
+
+# Default to low-memory mode on Render unless explicitly overridden
+if os.environ.get("RENDER") or os.environ.get("RENDER_SERVICE_ID"):
+    os.environ.setdefault("LITE_DISABLE_EMBEDDINGS", "1")
+    os.environ.setdefault("LITE_MAX_PAPERS", "50")
+
+os.makedirs(os.environ["MPLCONFIGDIR"], exist_ok=True)
+os.makedirs(os.environ["HF_HOME"], exist_ok=True)
+
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import arxiv_kmeans_sbert_umap as pipeline
+
+
+def send_heartbeats(job_id: int, worker_id: str, done: threading.Event):
+    """Refresh the claimed job's heartbeat until it finishes, so other pools leave it alone."""
+    from django.db import connection
+    from api.jobs import beat_job, job_heartbeat_seconds
+
+    try:
+        while not done.wait(job_heartbeat_seconds()):
+            try:
+                if not beat_job(job_id, worker_id):
+                    return
+            except Exception as exc:
+                logging.warning("Could not refresh the heartbeat of SearchJob %s: %s", job_id, exc)
+    finally:
+        connection.close()
+
+
+def claim_jobs(slot: int):
+    """Worker process body: claim queued jobs one at a time and run them in-process."""
+    from django.db import close_old_connections
+    from api.jobs import claim_next_job
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{slot}"
+    while True:
+        close_old_connections()
+        try:
+            job_id = claim_next_job(worker_id)
+        except Exception as exc:
+            logging.warning("Worker %s could not poll the job queue: %s", slot, exc)
+            job_id = None
+        if job_id is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        logging.info("Worker %s claimed SearchJob %s", slot, job_id)
+        done = threading.Event()
+        threading.Thread(
+            target=send_heartbeats, args=(job_id, worker_id, done), name=f"heartbeat-{job_id}", daemon=True
+        ).start()
+        try:
+            pipeline.main(job_id)
+        except Exception:
+            logging.exception("Pipeline job %s failed", job_id)
+        finally:
+            done.set()
+
+
+class PipelineWorker:
+    """Fixed-size pool of job-claiming processes plus a status socket for the API."""
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.pool_size = pool_size
+        self.processes = {}
+        self.restarts = 0
+        self.startup = {}
+
+    def warm_up(self):
+        self.startup = pipeline.warm_up()
+        if self.startup["embeddings_disabled"]:
+            logging.info(
+                "Worker warm: imports %.2fs, embeddings disabled; model not loaded",
+                self.startup["import_seconds"],
+            )
+            return
+        logging.info(
+            "Worker warm: imports %.2fs, model load %.2fs (%s)",
+            self.startup["import_seconds"],
+            self.startup["model_load_seconds"],
+            self.startup["embedding_model"],
+        )
+
+    def start_process(self, slot: int):
+        from django.db import connections
+
+        # Children must open their own database connections.
+        connections.close_all()
+        process = multiprocessing.get_context("fork").Process(
+            target=claim_jobs, args=(slot,), name=f"pipeline-{slot}"
+        )
+        process.start()
+        self.processes[slot] = process
+
+    def fail_interrupted_jobs(self):
+        """Fail jobs whose worker, in this pool or any other, stopped sending heartbeats."""
+        from django.db import close_old_connections
+        from api.jobs import fail_interrupted_jobs
+
+        close_old_connections()
+        try:
+            interrupted = fail_interrupted_jobs()
+        except Exception as exc:
+            logging.warning("Could not check for interrupted jobs: %s", exc)
+            return
+        if interrupted:
+            logging.warning("Marked %s interrupted jobs as failed", interrupted)
+
+    def supervise(self):
+        while True:
+            time.sleep(5)
+            self.fail_interrupted_jobs()
+            for slot, process in list(self.processes.items()):
+                if not process.is_alive():
+                    logging.warning("Worker %s exited with code %s; restarting", slot, process.exitcode)
+                    self.restarts += 1
+                    self.start_process(slot)
+
+    def status(self):
+        from django.db import close_old_connections
+        from api.jobs import queue_stats
+        from api.models import SearchJob
+
+        close_old_connections()
+        last_job = SearchJob.objects.filter(status__in=("completed", "failed")).order_by("-updated_at").first()
+        return {
+            "status": "ok",
+            "startup": self.startup,
+            "pool_size": self.pool_size,
+            "alive_workers": sum(process.is_alive() for process in self.processes.values()),
+            "restarts": self.restarts,
+            **queue_stats(),
+            "last_job": {
+                "id": last_job.id,
+                "status": last_job.status,
+                "seconds": last_job.processing_seconds,
+            } if last_job else {},
+        }
+
+    def handle(self, conn):
+        try:
+            message = conn.recv()
+            action = message.get("action") if isinstance(message, dict) else None
+            if action == "status":
+                conn.send(self.status())
+            else:
+                conn.send({"status": "error", "error": f"Unknown action: {action}"})
+        except (EOFError, OSError) as exc:
+            logging.warning("Worker connection dropped: %s", exc)
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        if not pipeline.setup_django():
+            raise SystemExit("Django is not available; the worker pool needs the job table.")
+        self.fail_interrupted_jobs()
+        self.warm_up()
+        for slot in range(self.pool_size):
+            self.start_process(slot)
+        if not WORKER_AUTHKEY:
+            logging.warning("LITE_WORKER_AUTHKEY is not set; the status socket is disabled")
+            try:
+                self.supervise()
+            finally:
+                for process in self.processes.values():
+                    process.terminate()
+        threading.Thread(target=self.supervise, name="pipeline-supervisor", daemon=True).start()
+        with Listener((WORKER_HOST, WORKER_PORT), authkey=WORKER_AUTHKEY) as listener:
+            logging.info(
+                "Pipeline worker pool of %s listening on %s:%s", self.pool_size, WORKER_HOST, WORKER_PORT
+            )
+            try:
+                while True:
+                    try:
+                        conn = listener.accept()
+                    except Exception as exc:
+                        logging.warning("Rejected worker connection: %s", exc)
+                        continue
+                    self.handle(conn)
+            finally:
+                for process in self.processes.values():
+                    process.terminate()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(message)s")
+    PipelineWorker().serve_forever()
@@ -0,0 +1,91 @@
+"""
+Per-stage profiling for the topic-modeling pipeline.
+
+Each stage records wall time, CPU time (this process plus any worker
+processes it waited on), an item count and peak RSS. On Linux the peak is
+reset at the start of every stage through /proc/self/clear_refs, so a stage
+reports its own high-water mark even inside the long-lived pipeline worker;
+elsewhere the process-lifetime peak from getrusage is reported instead.
+"""
+import os
+import time
+import resource
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+_PROC_STATUS = "/proc/self/status"
+_PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open(_PROC_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open(_PROC_STATUS) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if os.uname().sysname == "Darwin" else maxrss / 1024
+
+
+def _cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class StageProfiler:
+    """Collects one entry per pipeline stage, in the order the stages ran.
+
+    `listener(event, name, entry)` is called with "stage_started" and
+    "stage_completed" around every profiled stage, e.g. to publish progress.
+    """
+
+    def __init__(self, listener: Optional[Callable[[str, str, dict], None]] = None):
+        self.listener = listener
+        self.stages = {}
+        self.started_at = time.perf_counter()
+        self.cpu_started_at = _cpu_seconds()
+
+    @contextmanager
+    def stage(self, name: str, items: Optional[int] = None):
+        """Profile the body of a `with` block; set entry["items"] inside it if the count is known later."""
+        entry = {"items": items}
+        if self.listener:
+            self.listener("stage_started", name, {"items": items})
+        per_stage_peak = _reset_peak_rss()
+        wall_started, cpu_started = time.perf_counter(), _cpu_seconds()
+        try:
+            yield entry
+        finally:
+            entry.update({
+                "wall_seconds": round(time.perf_counter() - wall_started, 3),
+                "cpu_seconds": round(_cpu_seconds() - cpu_started, 3),
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+                "peak_rss_scope": "stage" if per_stage_peak else "process",
+            })
+            self.record(name, **entry)
+            if self.listener:
+                self.listener("stage_completed", name, self.stages[name])
+
+    def record(self, name: str, **values):
+        """Add or overwrite a stage measured elsewhere, e.g. time spent inside fetch threads."""
+        self.stages[name] = {"items": values.pop("items", None), **values}
+
+    def report(self) -> dict:
+        return {
+            "wall_seconds": round(time.perf_counter() - self.started_at, 3),
+            "cpu_seconds": round(_cpu_seconds() - self.cpu_started_at, 3),
+            "peak_rss_mb": round(max([s.get("peak_rss_mb") or 0 for s in self.stages.values()] or [0]), 1),
+            "stages": self.stages,
+        }